@@ -0,0 +1,117 @@
+# Copyright (c) 2025 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Microbenchmark of the Base64 input handling of the pipeline handlers.
+
+Compares the previous handling (full decode for type sniffing, PIL decoding
+followed by an RGB to BGR copy) with the current one (header sniffing, OpenCV
+decoding straight from the buffer) on noise PNGs of roughly 1, 10 and 50 MB.
+Requires OpenCV, e.g.
+
+    python benchmarks/bench_input_decoding.py --sizes_mb 1 10 50
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import puremagic
+from PIL import Image as PILImage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from paddleocr_mcp.pipelines import (  # noqa: E402
+    _decode_image,
+    _infer_file_type_from_base64,
+)
+
+
+def _previous_sniff(base64_data: str) -> Optional[str]:
+    mime = puremagic.from_string(base64.b64decode(base64_data), mime=True)
+    if mime.startswith("image/"):
+        return "image"
+    elif mime == "application/pdf":
+        return "pdf"
+    return None
+
+
+def _previous_decode(base64_data: str) -> np.ndarray:
+    image_bytes = base64.b64decode(base64_data)
+    _previous_sniff(base64_data)
+    image_pil = PILImage.open(io.BytesIO(image_bytes))
+    image_arr = np.array(image_pil.convert("RGB"))
+    return np.ascontiguousarray(image_arr[..., ::-1])
+
+
+def _current_decode(base64_data: str) -> np.ndarray:
+    _infer_file_type_from_base64(base64_data)
+    return _decode_image(base64.b64decode(base64_data))
+
+
+def _make_input(size_mb: int) -> str:
+    # noise does not compress, so the PNG is about as large as the pixels
+    side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (side, side, 3), dtype=np.uint8)
+    with io.BytesIO() as buffer:
+        PILImage.fromarray(pixels).save(buffer, format="PNG", compress_level=1)
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _measure(func: Callable[[str], Any], data: str, repeats: int) -> Dict[str, float]:
+    times: List[float] = []
+    for _ in range(repeats):
+        st = time.perf_counter()
+        func(data)
+        times.append(time.perf_counter() - st)
+    # OpenCV allocations are not traced, the peak covers the Python side
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time": min(times) * 1000, "peak": peak / (1024 * 1024)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes_mb", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = {
+        "sniff (previous)": _previous_sniff,
+        "sniff (current)": _infer_file_type_from_base64,
+        "decode (previous)": _previous_decode,
+        "decode (current)": _current_decode,
+    }
+    for size_mb in args.sizes_mb:
+        data = _make_input(size_mb)
+        assert np.array_equal(_previous_decode(data), _current_decode(data))
+        print(f"{size_mb} MB input ({len(data) / (1024 * 1024):.1f} MB as Base64)")
+        for name, func in cases.items():
+            stats = _measure(func, data, args.repeats)
+            print(
+                f"{name:>20}: {stats['time']:9.2f} ms | "
+                f"traced peak {stats['peak']:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
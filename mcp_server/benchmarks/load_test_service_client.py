@@ -0,0 +1,176 @@
+# Copyright (c) 2025 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load test of the service mode HTTP client against a local stand-in server.
+
+Compares a new `httpx.AsyncClient` per request (the previous behavior) with
+the pooled client of a started pipeline handler. The stand-in server sleeps
+`--handshake_ms` once per new connection to model the TCP/TLS handshake of a
+remote service and `--service_ms` per request to model inference, e.g.
+
+    python benchmarks/load_test_service_client.py --requests 500 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from paddleocr_mcp.pipelines import create_pipeline_handler  # noqa: E402
+
+_RESPONSE = json.dumps(
+    {
+        "result": {
+            "ocrResults": [
+                {
+                    "prunedResult": {
+                        "rec_texts": ["PaddleOCR"],
+                        "rec_scores": [0.99],
+                        "rec_boxes": [[0, 0, 100, 20]],
+                    }
+                }
+            ]
+        }
+    }
+).encode("utf-8")
+
+
+def _make_server(handshake_ms: float, service_ms: float) -> ThreadingHTTPServer:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            time.sleep(handshake_ms / 1000)
+            super().setup()
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(service_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(_RESPONSE)))
+            self.end_headers()
+            self.wfile.write(_RESPONSE)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    class _Server(ThreadingHTTPServer):
+        daemon_threads = True
+        # the default backlog of 5 drops connection bursts
+        request_queue_size = 1024
+
+    return _Server(("127.0.0.1", 0), _Handler)
+
+
+async def _per_request_client(url: str, payload: Dict[str, Any]) -> None:
+    timeout = httpx.Timeout(connect=30.0, read=60.0, write=30.0, pool=30.0)
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        response = await client.post(url, json=payload)
+        response.raise_for_status()
+        response.json()
+
+
+async def _run(
+    call: Callable[[], Awaitable[Any]], requests: int, concurrency: int
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def _one() -> None:
+        async with semaphore:
+            st = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - st)
+
+    st = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(requests)))
+    wall_time = time.perf_counter() - st
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "throughput": requests / wall_time,
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = _make_server(args.handshake_ms, args.service_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    file_data = base64.b64encode(os.urandom(args.payload_kb * 1024)).decode("ascii")
+
+    results = {}
+    payload = {"file": file_data, "fileType": 1}
+    results["per-request client"] = await _run(
+        lambda: _per_request_client(f"{server_url}/ocr", payload),
+        args.requests,
+        args.concurrency,
+    )
+
+    handler = create_pipeline_handler(
+        "OCR",
+        "self_hosted",
+        pipeline_config=None,
+        device=None,
+        server_url=server_url,
+        aistudio_access_token=None,
+        qianfan_api_key=None,
+        timeout=60,
+        http_max_connections=args.max_connections,
+        http_max_keepalive_connections=args.max_connections,
+    )
+    async with handler:
+        results["pooled client"] = await _run(
+            lambda: handler._call_service(file_data, "image", None),
+            args.requests,
+            args.concurrency,
+        )
+    server.shutdown()
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"handshake {args.handshake_ms} ms, service {args.service_ms} ms"
+    )
+    for name, stats in results.items():
+        print(
+            f"{name:>20}: p50 {stats['p50']:8.2f} ms | p99 {stats['p99']:8.2f} ms | "
+            f"{stats['throughput']:8.1f} req/s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--handshake_ms", type=float, default=20.0)
+    parser.add_argument("--service_ms", type=float, default=5.0)
+    parser.add_argument("--payload_kb", type=int, default=64)
+    parser.add_argument("--max_connections", type=int, default=32)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,12 @@ import sys
 from fastmcp import FastMCP
 
 from .pipelines import create_pipeline_handler
+from .tracing import (
+    JsonLinesExporter,
+    add_exporter,
+    get_registry,
+    start_metrics_server,
+)
 
 
 def _parse_args() -> argparse.Namespace:
@@ -73,6 +79,86 @@ def _parse_args() -> argparse.Namespace:
         default=os.getenv("PADDLEOCR_MCP_DEVICE"),
         help="Device to run inference on.",
     )
+    parser.add_argument(
+        "--engine_replicas",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_ENGINE_REPLICAS", "1")),
+        help="Number of engine instances serving requests concurrently (for local mode).",
+    )
+    parser.add_argument(
+        "--max_batch_size",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_MAX_BATCH_SIZE", "1")),
+        help="Maximum number of concurrent image requests coalesced into one engine call; 1 disables batching (for local mode).",
+    )
+    parser.add_argument(
+        "--batch_window_ms",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_BATCH_WINDOW_MS", "10")),
+        help="Milliseconds an engine waits for further requests to fill a batch (for local mode).",
+    )
+    parser.add_argument(
+        "--max_pending_requests",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_MAX_PENDING_REQUESTS", "0")),
+        help="Maximum number of queued or running requests, 0 means no limit (for local mode).",
+    )
+    parser.add_argument(
+        "--admission_timeout",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_ADMISSION_TIMEOUT", "30")),
+        help="Seconds a request waits for a free slot before it is rejected (for local mode).",
+    )
+    parser.add_argument(
+        "--max_pages",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_MAX_PAGES", "0")),
+        help="Maximum number of pages processed per document; 0 means no limit.",
+    )
+
+    # Result cache configuration
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_CACHE_SIZE", "64")),
+        help="Number of results kept in the in-memory result cache; 0 disables it.",
+    )
+    parser.add_argument(
+        "--cache_memory_mb",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_CACHE_MEMORY_MB", "256")),
+        help="Total size in MB of the results kept in memory.",
+    )
+    parser.add_argument(
+        "--cache_path",
+        default=os.getenv("PADDLEOCR_MCP_CACHE_PATH"),
+        help="SQLite file of the on-disk result cache (disabled if not set).",
+    )
+    parser.add_argument(
+        "--cache_disk_mb",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_CACHE_DISK_MB", "1024")),
+        help="Total size in MB of the results kept on disk.",
+    )
+    parser.add_argument(
+        "--cache_ttl",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_CACHE_TTL", "3600")),
+        help="Seconds after which cached results expire; 0 keeps them until evicted.",
+    )
+
+    # Observability configuration
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_METRICS_PORT", "0")),
+        help="Port of a separate endpoint serving the metrics in the Prometheus text format; 0 disables it (in HTTP mode they are also served at `/metrics`).",
+    )
+    parser.add_argument(
+        "--trace_file",
+        default=os.getenv("PADDLEOCR_MCP_TRACE_FILE"),
+        help="File that the tracing spans of every request are appended to as JSON lines.",
+    )
 
     # Service mode configuration
     parser.add_argument(
@@ -96,6 +182,42 @@ def _parse_args() -> argparse.Namespace:
         default=int(os.getenv("PADDLEOCR_MCP_TIMEOUT", "60")),
         help="HTTP read timeout in seconds for API requests to the underlying server.",
     )
+    parser.add_argument(
+        "--http_max_connections",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_HTTP_MAX_CONNECTIONS", "100")),
+        help="Maximum number of concurrent connections to the underlying server.",
+    )
+    parser.add_argument(
+        "--http_max_keepalive_connections",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        help="Maximum number of idle connections kept alive for reuse.",
+    )
+    parser.add_argument(
+        "--http_keepalive_expiry",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_HTTP_KEEPALIVE_EXPIRY", "30")),
+        help="Seconds after which idle connections are closed.",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=os.getenv("PADDLEOCR_MCP_HTTP2", "").lower() in ("1", "true", "yes"),
+        help="Use HTTP/2 for requests to the underlying server (requires `httpx[http2]`).",
+    )
+    parser.add_argument(
+        "--max_retries",
+        type=int,
+        default=int(os.getenv("PADDLEOCR_MCP_MAX_RETRIES", "2")),
+        help="Retries of requests that did not reach the server (connection error, connect or pool timeout) or got a 429/503 response.",
+    )
+    parser.add_argument(
+        "--retry_backoff",
+        type=float,
+        default=float(os.getenv("PADDLEOCR_MCP_RETRY_BACKOFF", "0.5")),
+        help="Base delay in seconds of the exponential backoff between retries.",
+    )
 
     args = parser.parse_args()
     return args
@@ -151,6 +273,11 @@ async def async_main() -> None:
 
     _validate_args(args)
 
+    if args.trace_file:
+        add_exporter(JsonLinesExporter(args.trace_file))
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port, host=args.host)
+
     try:
         pipeline_handler = create_pipeline_handler(
             args.pipeline,
@@ -161,6 +288,23 @@ async def async_main() -> None:
             aistudio_access_token=args.aistudio_access_token,
             qianfan_api_key=args.qianfan_api_key,
             timeout=args.timeout,
+            http_max_connections=args.http_max_connections,
+            http_max_keepalive_connections=args.http_max_keepalive_connections,
+            http_keepalive_expiry=args.http_keepalive_expiry,
+            http2=args.http2,
+            max_retries=args.max_retries,
+            retry_backoff=args.retry_backoff,
+            engine_replicas=args.engine_replicas,
+            max_batch_size=args.max_batch_size,
+            batch_window=args.batch_window_ms / 1000,
+            max_pending_requests=args.max_pending_requests,
+            admission_timeout=args.admission_timeout,
+            cache_size=args.cache_size,
+            cache_memory_mb=args.cache_memory_mb,
+            cache_path=args.cache_path,
+            cache_disk_mb=args.cache_disk_mb,
+            cache_ttl=args.cache_ttl,
+            max_pages=args.max_pages,
         )
     except Exception as e:
         print(f"Failed to create the pipeline handler: {e}", file=sys.stderr)
@@ -182,6 +326,16 @@ async def async_main() -> None:
 
         pipeline_handler.register_tools(mcp)
 
+        if args.http and hasattr(mcp, "custom_route"):
+            from starlette.responses import PlainTextResponse
+
+            @mcp.custom_route("/metrics", methods=["GET"])
+            async def _metrics(request):
+                return PlainTextResponse(
+                    get_registry().to_prometheus(),
+                    media_type="text/plain; version=0.0.4; charset=utf-8",
+                )
+
         if args.http:
             await mcp.run_async(
                 transport="streamable-http",
@@ -13,10 +13,9 @@
 # limitations under the License.
 
 # TODO:
-# 1. Reuse `httpx` client.
-# 2. Use `contextvars` to manage MCP context objects.
-# 3. Implement structured logging, log stack traces, and log operation timing.
-# 4. Report progress for long-running operations.
+# 1. Use `contextvars` to manage MCP context objects.
+# 2. Implement structured logging, log stack traces, and log operation timing.
+# 3. Report progress for long-running operations in service mode.
 
 import abc
 import asyncio
@@ -24,10 +23,21 @@ import base64
 import io
 import json
 import re
+import time
 from pathlib import PurePath
-from queue import Queue
-from threading import Thread
-from typing import Any, Callable, Dict, List, NoReturn, Optional, Type, Union
+from queue import Empty, Queue
+from threading import Event, Thread
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    NoReturn,
+    Optional,
+    Type,
+    Union,
+)
 from urllib.parse import urlparse
 
 import httpx
@@ -38,6 +48,9 @@ from mcp.types import ImageContent, TextContent
 from PIL import Image as PILImage
 from typing_extensions import Literal, Self, assert_never
 
+from .result_cache import ResultCache, make_cache_key
+from .tracing import current_span, get_registry, record_span, span
+
 try:
     from paddleocr import PaddleOCR, PaddleOCRVL, PPStructureV3
 
@@ -48,6 +61,29 @@ except ImportError:
 
 OutputMode = Literal["simple", "detailed"]
 
+# Inference requests are not idempotent, so only failures where the server
+# did not take the request are retried: no connection, no free pooled
+# connection, rate limiting and an unavailable server. Read and write errors,
+# 502 and 504 can mean that the server is already running the job.
+_RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_RETRY_STATUS_CODES = frozenset({429, 503})
+_MAX_RETRY_AFTER = 60.0
+
+# Enough leading bytes for the magic numbers of images and PDFs.
+_SNIFF_HEADER_SIZE = 4096
+
+# Page notifications carry a preview only, the text itself is in the result.
+_PAGE_PREVIEW_CHARS = 60
+
+
+def _format_page_notice(page_no: int, text: str) -> str:
+    """Describe a processed page by its length and the start of its text."""
+    preview = " ".join(text.split())
+    if len(preview) > _PAGE_PREVIEW_CHARS:
+        preview = preview[: _PAGE_PREVIEW_CHARS - 3] + "..."
+    notice = f"Page {page_no}: {len(text)} characters"
+    return f"{notice}: {preview}" if preview else notice
+
 
 def _is_file_path(s: str) -> bool:
     try:
@@ -70,7 +106,7 @@ def _is_url(s: str) -> bool:
 
 
 def _infer_file_type_from_bytes(data: bytes) -> Optional[str]:
-    mime = puremagic.from_string(data, mime=True)
+    mime = puremagic.from_string(data[:_SNIFF_HEADER_SIZE], mime=True)
     if mime.startswith("image/"):
         return "image"
     elif mime == "application/pdf":
@@ -78,6 +114,121 @@ def _infer_file_type_from_bytes(data: bytes) -> Optional[str]:
     return None
 
 
+def _parse_page_range(
+    page_range: Optional[str], max_pages: int = 0
+) -> tuple[int, Optional[int]]:
+    """Parse a 1-based, inclusive page range such as "5", "3-10" or "3-".
+
+    Args:
+        page_range: Page range, `None` or "" selects all pages.
+        max_pages: Maximum number of pages to process (0 means no limit).
+
+    Returns:
+        The first page and the last page (`None` for the end of the document).
+    """
+    first_page, last_page = 1, None
+    if page_range and page_range.strip():
+        match = re.fullmatch(r"\s*(\d+)\s*(-\s*(\d*)\s*)?", page_range)
+        if not match:
+            raise ValueError(f"Invalid page range {repr(page_range)}")
+        first_page = int(match.group(1))
+        if match.group(2) is None:
+            last_page = first_page
+        elif match.group(3):
+            last_page = int(match.group(3))
+        if first_page < 1 or (last_page is not None and last_page < first_page):
+            raise ValueError(f"Invalid page range {repr(page_range)}")
+    if max_pages > 0:
+        limit = first_page + max_pages - 1
+        last_page = limit if last_page is None else min(last_page, limit)
+    return first_page, last_page
+
+
+def _strip_data_url(s: str) -> str:
+    if s.startswith("data:"):
+        return s.split(",", 1)[1]
+    return s
+
+
+def _infer_file_type_from_base64(base64_data: str) -> Optional[str]:
+    # Only a header slice is decoded; 4 Base64 characters encode 3 bytes.
+    header = base64_data[: _SNIFF_HEADER_SIZE // 3 * 4]
+    return _infer_file_type_from_bytes(base64.b64decode(header))
+
+
+def _decode_image(data: bytes) -> np.ndarray:
+    """Decode an encoded image into a BGR array.
+
+    OpenCV decodes straight from the input buffer into the BGR layout used by
+    the engines, without an intermediate PIL image or RGB array.
+
+    Args:
+        data: Encoded image.
+
+    Returns:
+        The decoded image.
+    """
+    # OpenCV comes with the local PaddleOCR installation
+    import cv2
+
+    image = cv2.imdecode(
+        np.frombuffer(data, dtype=np.uint8),
+        cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION,
+    )
+    if image is not None:
+        return image
+    # formats that OpenCV cannot read, e.g. GIF
+    with PILImage.open(io.BytesIO(data)) as image_pil:
+        image_arr = np.array(image_pil.convert("RGB"))
+    return np.ascontiguousarray(image_arr[..., ::-1])
+
+
+class _LazyImage:
+    """Image of a local result that is JPEG and Base64 encoded on first use.
+
+    Pickling stores the encoded image. Handlers only cache results with their
+    images when the images are returned, so the encoding is not wasted.
+    """
+
+    __slots__ = ("_image", "_data")
+
+    def __init__(self, image: PILImage.Image) -> None:
+        self._image: Optional[PILImage.Image] = image
+        self._data: Optional[str] = None
+
+    def to_base64(self) -> str:
+        if self._data is None:
+            with io.BytesIO() as buffer:
+                self._image.save(buffer, format="JPEG")
+                self._data = base64.b64encode(buffer.getvalue()).decode("ascii")
+            self._image = None
+        return self._data
+
+    def __getstate__(self) -> str:
+        return self.to_base64()
+
+    def __setstate__(self, state: str) -> None:
+        self._image = None
+        self._data = state
+
+
+def _prune_local_result(result: Any) -> Any:
+    """Drop the keys that the service also drops from its `prunedResult`."""
+    if isinstance(result, dict):
+        return {
+            k: _prune_local_result(v)
+            for k, v in result.items()
+            if k not in ("input_path", "page_index")
+        }
+    if isinstance(result, list):
+        return [_prune_local_result(item) for item in result]
+    return result
+
+
+def _image_to_base64(image: Union[str, _LazyImage]) -> str:
+    return image.to_base64() if isinstance(image, _LazyImage) else image
+
+
 def get_str_with_max_len(obj: object, max_len: int) -> str:
     s = str(obj)
     if len(s) > max_len:
@@ -86,50 +237,262 @@ def get_str_with_max_len(obj: object, max_len: int) -> str:
         return s
 
 
+class _WorkItem:
+    __slots__ = ("func", "args", "kwargs", "fut", "batchable", "submitted", "stats")
+
+    def __init__(
+        self,
+        func: Callable,
+        args: tuple,
+        kwargs: Dict[str, Any],
+        fut: asyncio.Future,
+        batchable: bool,
+    ) -> None:
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.fut = fut
+        self.batchable = batchable
+        self.submitted = time.monotonic()
+        self.stats: Dict[str, Any] = {}
+
+
+def _predict(engine: Any, input_: Any, **kwargs: Any) -> Any:
+    return engine.predict(input_, **kwargs)
+
+
+_END_OF_PAGES = object()
+
+
+def _predict_pages(
+    engine: Any,
+    input_: Any,
+    emit: Callable[[Any], None],
+    stop: Event,
+    first_page: int,
+    last_page: Optional[int],
+    **kwargs: Any,
+) -> None:
+    pages = engine.predict_iter(input_, **kwargs)
+    try:
+        for page_no, page in enumerate(pages, 1):
+            # checked between pages, so a cancelled request frees the engine
+            # after the page that is currently inferred
+            if stop.is_set():
+                break
+            if page_no >= first_page:
+                emit((page_no, page))
+            if last_page is not None and page_no >= last_page:
+                break
+    finally:
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
+
+
 class _EngineWrapper:
-    def __init__(self, engine: Any) -> None:
-        self._engine = engine
+    """Runs engine calls on a pool of engine replicas, one worker thread each.
+
+    Concurrent `predict` calls on decoded images with the same arguments are
+    coalesced into one batched engine call (the engines accept lists of
+    inputs) when `max_batch_size` is larger than 1. At most `max_pending`
+    calls may be queued or running; further calls wait up to
+    `admission_timeout` seconds for a free slot and are rejected afterwards.
+    """
+
+    def __init__(
+        self,
+        engines: List[Any],
+        max_batch_size: int = 1,
+        batch_window: float = 0.01,
+        max_pending: int = 0,
+        admission_timeout: float = 30.0,
+    ) -> None:
+        self._engines = engines
+        self._max_batch_size = max(1, max_batch_size)
+        self._batch_window = batch_window
+        self._admission_timeout = admission_timeout
+        self._pending = asyncio.Semaphore(max_pending) if max_pending > 0 else None
         self._queue: Queue = Queue()
         self._closed = False
         self._loop = asyncio.get_running_loop()
-        self._thread = Thread(target=self._worker, daemon=False)
-        self._thread.start()
+        self._threads = [
+            Thread(target=self._worker, args=(i, engine), daemon=False)
+            for i, engine in enumerate(engines)
+        ]
+        for thread in self._threads:
+            thread.start()
 
     @property
     def engine(self) -> Any:
-        return self._engine
+        return self._engines[0]
 
     async def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run `func(engine, *args, **kwargs)` on a free engine replica."""
+        result, _ = await self._submit(func, args, kwargs, batchable=False)
+        return result
+
+    async def predict(self, input_: Any, **kwargs: Any) -> tuple[Any, Dict[str, Any]]:
+        """Run `engine.predict` and return the result and the call statistics
+        (queue wait in seconds, batch size and engine replica)."""
+        batchable = self._max_batch_size > 1 and isinstance(input_, np.ndarray)
+        return await self._submit(_predict, (input_,), kwargs, batchable=batchable)
+
+    async def predict_pages(
+        self,
+        input_: Any,
+        first_page: int = 1,
+        last_page: Optional[int] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[tuple[int, Any]]:
+        """Run `engine.predict_iter` and yield `(page number, result)` pairs as
+        soon as the pages are inferred.
+
+        Pages before `first_page` still go through the engine, inference stops
+        after `last_page`. Closing the iterator early or cancelling the task
+        that consumes it stops the engine after the current page. The call
+        statistics are stored into `stats` once the engine has finished.
+        """
+        pages: asyncio.Queue = asyncio.Queue()
+        stop = Event()
+
+        def _emit(item: Any) -> None:
+            self._loop.call_soon_threadsafe(pages.put_nowait, item)
+
+        task = asyncio.ensure_future(
+            self._submit(
+                _predict_pages,
+                (input_, _emit, stop, first_page, last_page),
+                kwargs,
+                batchable=False,
+            )
+        )
+        # queued after all pages since the worker emits them before it
+        # completes the call
+        task.add_done_callback(lambda _: pages.put_nowait(_END_OF_PAGES))
+        try:
+            while True:
+                item = await pages.get()
+                if item is _END_OF_PAGES:
+                    break
+                yield item
+            _, item_stats = await task
+            if stats is not None:
+                stats.update(item_stats)
+        finally:
+            stop.set()
+            if not task.done():
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _submit(
+        self, func: Callable, args: tuple, kwargs: Dict[str, Any], batchable: bool
+    ) -> tuple[Any, Dict[str, Any]]:
         if self._closed:
             raise RuntimeError("Engine wrapper has already been closed")
-        fut = self._loop.create_future()
-        self._queue.put((func, args, kwargs, fut))
-        return await fut
+        if self._pending is not None:
+            try:
+                await asyncio.wait_for(
+                    self._pending.acquire(), timeout=self._admission_timeout
+                )
+            except asyncio.TimeoutError:
+                raise RuntimeError(
+                    "The server is busy, too many requests are waiting for the "
+                    "OCR engine. Please retry later."
+                ) from None
+        try:
+            fut = self._loop.create_future()
+            item = _WorkItem(func, args, kwargs, fut, batchable)
+            self._queue.put(item)
+            result = await fut
+            return result, item.stats
+        finally:
+            if self._pending is not None:
+                self._pending.release()
 
     async def close(self) -> None:
         if not self._closed:
-            self._queue.put(None)
-            await self._loop.run_in_executor(None, self._thread.join)
             self._closed = True
-
-    def _worker(self) -> None:
-        while not self._closed:
-            item = self._queue.get()
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                await self._loop.run_in_executor(None, thread.join)
+
+    def _set_result(self, fut: asyncio.Future, result: Any) -> None:
+        if not fut.done():
+            fut.set_result(result)
+
+    def _set_exception(self, fut: asyncio.Future, exc: BaseException) -> None:
+        if not fut.done():
+            fut.set_exception(exc)
+
+    def _worker(self, replica: int, engine: Any) -> None:
+        deferred: List[Optional[_WorkItem]] = []
+        while True:
+            item = deferred.pop(0) if deferred else self._queue.get()
             if item is None:
                 break
-            func, args, kwargs, fut = item
+            batch = [item]
+            if item.batchable:
+                deadline = time.monotonic() + self._batch_window
+                while len(batch) < self._max_batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        other = self._queue.get(timeout=timeout)
+                    except Empty:
+                        break
+                    if (
+                        other is not None
+                        and other.batchable
+                        and other.kwargs == item.kwargs
+                    ):
+                        batch.append(other)
+                    else:
+                        deferred.append(other)
+                        break
+            self._run_batch(replica, engine, batch)
+
+    def _run_batch(self, replica: int, engine: Any, batch: List[_WorkItem]) -> None:
+        start = time.monotonic()
+        for item in batch:
+            item.stats = {
+                "queue_wait": start - item.submitted,
+                "batch_size": len(batch),
+                "replica": replica,
+            }
+        if len(batch) > 1:
             try:
-                result = func(*args, **kwargs)
-                self._loop.call_soon_threadsafe(fut.set_result, result)
-            except Exception as e:
-                self._loop.call_soon_threadsafe(fut.set_exception, e)
-            finally:
-                self._queue.task_done()
+                outputs = list(
+                    engine.predict([item.args[0] for item in batch], **batch[0].kwargs)
+                )
+                if len(outputs) != len(batch):
+                    raise RuntimeError("Unexpected number of batch results")
+            except Exception:
+                # the pipeline does not support this batch, run the calls one
+                # by one instead
+                for item in batch:
+                    item.stats["batch_size"] = 1
+                    self._run_batch(replica, engine, [item])
+                return
+            for item, output in zip(batch, outputs):
+                self._loop.call_soon_threadsafe(self._set_result, item.fut, [output])
+            return
+        item = batch[0]
+        try:
+            result = item.func(engine, *item.args, **item.kwargs)
+            self._loop.call_soon_threadsafe(self._set_result, item.fut, result)
+        except Exception as e:
+            self._loop.call_soon_threadsafe(self._set_exception, item.fut, e)
 
 
 class PipelineHandler(abc.ABC):
     """Abstract base class for pipeline handlers."""
 
+    # Key of the per-page results in service responses.
+    _service_pages_key: Optional[str] = None
+
     def __init__(
         self,
         pipeline: str,
@@ -140,6 +503,23 @@ class PipelineHandler(abc.ABC):
         aistudio_access_token: Optional[str],
         qianfan_api_key: Optional[str],
         timeout: Optional[int],
+        http_max_connections: int = 100,
+        http_max_keepalive_connections: int = 20,
+        http_keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        engine_replicas: int = 1,
+        max_batch_size: int = 1,
+        batch_window: float = 0.01,
+        max_pending_requests: int = 0,
+        admission_timeout: float = 30.0,
+        cache_size: int = 64,
+        cache_memory_mb: float = 256,
+        cache_path: Optional[str] = None,
+        cache_disk_mb: float = 1024,
+        cache_ttl: Optional[float] = 3600,
+        max_pages: int = 0,
     ) -> None:
         """Initialize the pipeline handler.
 
@@ -152,6 +532,36 @@ class PipelineHandler(abc.ABC):
             aistudio_access_token: AI Studio access token.
             qianfan_api_key: Qianfan API key.
             timeout: Read timeout in seconds for HTTP requests.
+            http_max_connections: Maximum number of concurrent HTTP connections.
+            http_max_keepalive_connections: Maximum number of idle connections
+                kept alive in the pool.
+            http_keepalive_expiry: Seconds after which idle connections are closed.
+            http2: Whether to use HTTP/2 (requires `httpx[http2]`).
+            max_retries: How often a request is retried that did not reach the
+                server (connection error, connect or pool timeout) or was
+                answered with 429 or 503.
+            retry_backoff: Base delay in seconds of the exponential backoff
+                between retries.
+            engine_replicas: Number of local engine instances serving requests
+                concurrently.
+            max_batch_size: Maximum number of concurrent image requests that
+                are coalesced into one engine call (1 disables batching).
+            batch_window: Seconds a local engine waits for further requests to
+                fill a batch.
+            max_pending_requests: Maximum number of local requests that may be
+                queued or running (0 means no limit).
+            admission_timeout: Seconds a request waits for a free slot before
+                it is rejected when `max_pending_requests` is reached.
+            cache_size: Number of results kept in memory (0 disables the
+                memory tier).
+            cache_memory_mb: Total size in MB of the results kept in memory.
+            cache_path: SQLite file of the on-disk result cache (`None`
+                disables the disk tier).
+            cache_disk_mb: Total size in MB of the results kept on disk.
+            cache_ttl: Seconds after which cached results expire (`None` or 0
+                keeps them until they are evicted).
+            max_pages: Maximum number of pages processed per document (0 means
+                no limit).
         """
         self._pipeline = pipeline
         if ppocr_source == "local":
@@ -167,12 +577,37 @@ class PipelineHandler(abc.ABC):
         self._aistudio_access_token = aistudio_access_token
         self._qianfan_api_key = qianfan_api_key
         self._timeout = timeout or 60
+        self._http_limits = httpx.Limits(
+            max_connections=http_max_connections,
+            max_keepalive_connections=http_max_keepalive_connections,
+            keepalive_expiry=http_keepalive_expiry,
+        )
+        self._http2 = http2
+        self._max_retries = max(0, max_retries)
+        self._retry_backoff = retry_backoff
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._engine_replicas = max(1, engine_replicas)
+        self._max_batch_size = max_batch_size
+        self._batch_window = batch_window
+        self._max_pending_requests = max_pending_requests
+        self._admission_timeout = admission_timeout
+        self._result_cache = ResultCache(
+            max_memory_entries=cache_size,
+            max_memory_bytes=int(cache_memory_mb * 1024 * 1024),
+            disk_path=cache_path,
+            max_disk_bytes=int(cache_disk_mb * 1024 * 1024),
+            ttl=cache_ttl,
+        )
+        self._max_pages = max(0, max_pages)
 
         if self._mode == "local":
             if not LOCAL_OCR_AVAILABLE:
                 raise RuntimeError("PaddleOCR is not locally available")
             try:
-                self._engine = self._create_local_engine()
+                self._engines = [
+                    self._create_local_engine() for _ in range(self._engine_replicas)
+                ]
+                self._engine = self._engines[0]
             except Exception as e:
                 raise RuntimeError(
                     f"Failed to create PaddleOCR engine: {str(e)}"
@@ -183,7 +618,15 @@ class PipelineHandler(abc.ABC):
     async def start(self) -> None:
         if self._status == "initialized":
             if self._mode == "local":
-                self._engine_wrapper = _EngineWrapper(self._engine)
+                self._engine_wrapper = _EngineWrapper(
+                    self._engines,
+                    max_batch_size=self._max_batch_size,
+                    batch_window=self._batch_window,
+                    max_pending=self._max_pending_requests,
+                    admission_timeout=self._admission_timeout,
+                )
+            else:
+                self._http_client = self._create_http_client()
             self._status = "started"
         elif self._status == "started":
             pass
@@ -198,12 +641,70 @@ class PipelineHandler(abc.ABC):
         elif self._status == "started":
             if self._mode == "local":
                 await self._engine_wrapper.close()
+            elif self._http_client is not None:
+                await self._http_client.aclose()
+                self._http_client = None
+            self._result_cache.close()
             self._status = "stopped"
         elif self._status == "stopped":
             pass
         else:
             assert_never(self._status)
 
+    def _create_http_client(self) -> httpx.AsyncClient:
+        # One client per handler lifecycle, so that concurrent and consecutive
+        # requests reuse pooled connections instead of paying for a TCP/TLS
+        # handshake each time.
+        timeout = httpx.Timeout(connect=30.0, read=self._timeout, write=30.0, pool=30.0)
+        try:
+            return httpx.AsyncClient(
+                timeout=timeout, limits=self._http_limits, http2=self._http2
+            )
+        except ImportError as e:
+            raise RuntimeError(
+                "HTTP/2 support requires the `h2` package, install `httpx[http2]`"
+            ) from e
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            raise RuntimeError("HTTP client has not been initialized")
+        return self._http_client
+
+    async def _send_http_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request with the shared client, retrying requests not taken.
+
+        Args:
+            method: HTTP method.
+            url: Request URL.
+            **kwargs: Additional arguments for `httpx.AsyncClient.request`.
+
+        Returns:
+            The successful response.
+        """
+        client = self._get_http_client()
+        attempt = 0
+        while True:
+            delay = self._retry_backoff * 2**attempt
+            try:
+                response = await client.request(method, url, **kwargs)
+            except _RETRY_EXCEPTIONS:
+                if attempt >= self._max_retries:
+                    raise
+            else:
+                if (
+                    response.status_code not in _RETRY_STATUS_CODES
+                    or attempt >= self._max_retries
+                ):
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, min(float(retry_after), _MAX_RETRY_AFTER))
+            await asyncio.sleep(delay)
+            attempt += 1
+
     async def __aenter__(self) -> Self:
         await self.start()
         return self
@@ -298,15 +799,107 @@ class PipelineHandler(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    async def _log_completion_stats(self, result: Dict[str, Any], ctx: Context) -> None:
+    async def _log_completion_stats(
+        self,
+        result: Dict[str, Any],
+        ctx: Context,
+        engine_stats: Optional[Dict[str, Any]] = None,
+    ) -> None:
         """Log statistics after processing completion.
 
         Args:
             result: Processing result.
             ctx: MCP context.
+            engine_stats: Queue wait, batch size and engine replica of a local
+                engine call.
         """
         raise NotImplementedError
 
+    def _format_engine_stats(self, engine_stats: Optional[Dict[str, Any]]) -> str:
+        if not engine_stats:
+            return ""
+        return (
+            f" (queue wait: {engine_stats['queue_wait'] * 1000:.1f} ms, "
+            f"batch size: {engine_stats['batch_size']}, "
+            f"engine: {engine_stats['replica']})"
+        )
+
+    def _format_cache_stats(self) -> str:
+        if not self._result_cache.enabled:
+            return ""
+        stats = self._result_cache.stats()
+        return (
+            f" [result cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"hit rate {stats['hit_rate']:.0%}]"
+        )
+
+    def _get_cache_key(
+        self,
+        input_data: str,
+        file_type: Optional[str],
+        infer_kwargs: Dict[str, Any],
+        pages: tuple[int, Optional[int]] = (1, None),
+        format_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """Compute the result cache key of a request.
+
+        The key covers the input bytes and everything that changes the result,
+        so that a hit can skip decoding and inference entirely. Base64 input is
+        hashed as is, without decoding it. URLs are not cached since the
+        resource behind them may change.
+
+        Args:
+            input_data: Input data (file path, URL, or Base64).
+            file_type: File type passed by the client.
+            infer_kwargs: Arguments for performing pipeline inference.
+            pages: First and last page to process.
+            format_kwargs: Arguments for formatting the output, since they
+                decide what `_get_cacheable_result` keeps.
+
+        Returns:
+            The cache key, or `None` if the request should not be cached.
+        """
+        if not self._result_cache.enabled or _is_url(input_data):
+            return None
+        if _is_base64(input_data):
+            if input_data.startswith("data:"):
+                input_data = input_data.split(",", 1)[1]
+            data = input_data.encode("ascii")
+        elif _is_file_path(input_data):
+            try:
+                with open(input_data, "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+        else:
+            return None
+        params = {
+            "pipeline": self._pipeline,
+            "ppocr_source": self._ppocr_source,
+            "mode": self._mode,
+            "pipeline_config": self._pipeline_config,
+            "server_url": self._server_url,
+            "file_type": file_type,
+            "infer_kwargs": infer_kwargs,
+            "pages": pages,
+            "format_kwargs": format_kwargs or {},
+        }
+        return make_cache_key(data, params)
+
+    def _get_cacheable_result(
+        self, result: Dict[str, Any], **format_kwargs: Any
+    ) -> Dict[str, Any]:
+        """Return what the result cache stores of a parsed result.
+
+        Args:
+            result: Parsed result, as passed to `_format_output`.
+            **format_kwargs: Arguments for formatting the output.
+
+        Returns:
+            The result without the parts that this output does not use.
+        """
+        return result
+
     @abc.abstractmethod
     async def _format_output(
         self,
@@ -330,12 +923,76 @@ class PipelineHandler(abc.ABC):
 
     async def _predict_with_local_engine(
         self, processed_input: Union[str, np.ndarray], ctx: Context, **kwargs: Any
-    ) -> Dict:
+    ) -> tuple[Any, Dict[str, Any]]:
         if not hasattr(self, "_engine_wrapper"):
             raise RuntimeError("Engine wrapper has not been initialized")
-        return await self._engine_wrapper.call(
-            self._engine_wrapper.engine.predict, processed_input, **kwargs
-        )
+        return await self._engine_wrapper.predict(processed_input, **kwargs)
+
+    async def _predict_pages_with_local_engine(
+        self,
+        processed_input: str,
+        ctx: Context,
+        first_page: int = 1,
+        last_page: Optional[int] = None,
+        **kwargs: Any,
+    ) -> tuple[List[Any], Dict[str, Any]]:
+        """Infer a document page by page, reporting each page as it completes.
+
+        Every page is sent as a progress notification, with a log message that
+        gives its length and the start of its text; the full text is only part
+        of the result. If the request is cancelled, the engine stops after the
+        current page.
+
+        Args:
+            processed_input: File path or URL of the document.
+            ctx: MCP context.
+            first_page: First page to process (1-based).
+            last_page: Last page to process, `None` for the end of the document.
+            **kwargs: Arguments for performing pipeline inference.
+
+        Returns:
+            The page results and the engine call statistics.
+        """
+        if not hasattr(self, "_engine_wrapper"):
+            raise RuntimeError("Engine wrapper has not been initialized")
+        total = last_page - first_page + 1 if last_page is not None else None
+        results: List[Any] = []
+        engine_stats: Dict[str, Any] = {}
+        page_start = time.perf_counter()
+        async for page_no, page in self._engine_wrapper.predict_pages(
+            processed_input, first_page, last_page, stats=engine_stats, **kwargs
+        ):
+            # the pages are inferred one after the other, each span covers
+            # the time since the previous page arrived
+            record_span("mcp.page", time.perf_counter() - page_start, page=page_no)
+            page_start = time.perf_counter()
+            results.append(page)
+            await ctx.report_progress(len(results), total)
+            await ctx.info(
+                _format_page_notice(page_no, self._get_local_page_text(page))
+            )
+        return results, engine_stats
+
+    def _get_local_page_text(self, page_result: Any) -> str:
+        """Return the text of a page result of the local engine."""
+        return ""
+
+    def _select_service_pages(
+        self,
+        service_result: Dict[str, Any],
+        first_page: int,
+        last_page: Optional[int],
+    ) -> Dict[str, Any]:
+        """Keep the selected pages of a service result."""
+        if self._service_pages_key is None:
+            return service_result
+        if first_page == 1 and last_page is None:
+            return service_result
+        result_data = service_result.get("result", service_result)
+        pages = result_data.get(self._service_pages_key)
+        if pages:
+            result_data[self._service_pages_key] = pages[first_page - 1 : last_page]
+        return service_result
 
 
 class SimpleInferencePipelineHandler(PipelineHandler):
@@ -349,6 +1006,7 @@ class SimpleInferencePipelineHandler(PipelineHandler):
         file_type: Optional[str] = None,
         infer_kwargs: Optional[Dict[str, Any]] = None,
         format_kwargs: Optional[Dict[str, Any]] = None,
+        page_range: Optional[str] = None,
     ) -> Union[str, List[Union[TextContent, ImageContent]]]:
         """Process input data through the pipeline.
 
@@ -359,10 +1017,38 @@ class SimpleInferencePipelineHandler(PipelineHandler):
             file_type: File type for URLs ("image", "pdf", or None for auto-detection).
             infer_kwargs: Additional arguments for performing pipeline inference.
             format_kwargs: Additional arguments for formatting the output.
+            page_range: Pages of a PDF to process, e.g. "3-10" (all pages if
+                not set, limited by `max_pages`).
 
         Returns:
             Processed result in the requested output format.
         """
+        with span(
+            "mcp.request",
+            pipeline=self._pipeline,
+            source=self._ppocr_source,
+            output_mode=output_mode,
+        ):
+            return await self._process(
+                input_data,
+                output_mode,
+                ctx,
+                file_type,
+                infer_kwargs,
+                format_kwargs,
+                page_range,
+            )
+
+    async def _process(
+        self,
+        input_data: str,
+        output_mode: OutputMode,
+        ctx: Context,
+        file_type: Optional[str],
+        infer_kwargs: Optional[Dict[str, Any]],
+        format_kwargs: Optional[Dict[str, Any]],
+        page_range: Optional[str],
+    ) -> Union[str, List[Union[TextContent, ImageContent]]]:
         infer_kwargs = infer_kwargs or {}
         format_kwargs = format_kwargs or {}
         try:
@@ -370,27 +1056,105 @@ class SimpleInferencePipelineHandler(PipelineHandler):
                 f"Starting {self._pipeline} processing (source: {self._ppocr_source})"
             )
 
+            first_page, last_page = _parse_page_range(page_range, self._max_pages)
+            # Hashing the input and reading the SQLite tier block, so keep them
+            # off the event loop.
+            cache_key = await asyncio.to_thread(
+                self._get_cache_key,
+                input_data,
+                file_type,
+                infer_kwargs,
+                (first_page, last_page),
+                format_kwargs,
+            )
+            result = (
+                await asyncio.to_thread(self._result_cache.get, cache_key)
+                if cache_key
+                else None
+            )
+            cache_status = (
+                "off" if not cache_key else "miss" if result is None else "hit"
+            )
+            current_span().set(cache=cache_status)
+            get_registry().counter(
+                "paddleocr_mcp_requests_total",
+                "Tool calls by pipeline and cache status",
+            ).inc(pipeline=self._pipeline, cache=cache_status)
+            if result is not None:
+                await ctx.info(
+                    f"{self._pipeline} result served from the cache"
+                    + self._format_cache_stats()
+                )
+                return await self._format_output(
+                    result, output_mode == "detailed", ctx, **format_kwargs
+                )
+
             if self._mode == "local":
-                processed_input = self._process_input_for_local(input_data, file_type)
+                with span("mcp.decode"):
+                    processed_input = self._process_input_for_local(
+                        input_data, file_type
+                    )
                 infer_kwargs = self._transform_local_kwargs(infer_kwargs)
-                raw_result = await self._predict_with_local_engine(
-                    processed_input, ctx, **infer_kwargs
-                )
-                result = await self._parse_local_result(raw_result, ctx)
+                with span("mcp.inference") as inference_span:
+                    if isinstance(processed_input, np.ndarray):
+                        inference_span.set(shape=processed_input.shape)
+                        (
+                            raw_result,
+                            engine_stats,
+                        ) = await self._predict_with_local_engine(
+                            processed_input, ctx, **infer_kwargs
+                        )
+                    else:
+                        (
+                            raw_result,
+                            engine_stats,
+                        ) = await self._predict_pages_with_local_engine(
+                            processed_input, ctx, first_page, last_page, **infer_kwargs
+                        )
+                        inference_span.set(page_num=len(raw_result))
+                    if engine_stats:
+                        # requests of a batch share it, so its size is not
+                        # named like a count that is summed per request
+                        inference_span.set(
+                            queue_wait=engine_stats["queue_wait"],
+                            batch=engine_stats["batch_size"],
+                            replica=engine_stats["replica"],
+                        )
+                        get_registry().histogram(
+                            "paddleocr_mcp_queue_wait_seconds",
+                            "Time requests waited for a free engine replica",
+                        ).observe(engine_stats["queue_wait"])
+                with span("mcp.parse"):
+                    result = await self._parse_local_result(raw_result, ctx)
             else:
-                processed_input, inferred_file_type = self._process_input_for_service(
-                    input_data, file_type
-                )
+                engine_stats = None
+                with span("mcp.decode"):
+                    (
+                        processed_input,
+                        inferred_file_type,
+                    ) = self._process_input_for_service(input_data, file_type)
                 infer_kwargs = self._transform_service_kwargs(infer_kwargs)
-                raw_result = await self._call_service(
-                    processed_input, inferred_file_type, ctx, **infer_kwargs
+                with span("mcp.service", file_type=inferred_file_type):
+                    raw_result = await self._call_service(
+                        processed_input, inferred_file_type, ctx, **infer_kwargs
+                    )
+                raw_result = self._select_service_pages(
+                    raw_result, first_page, last_page
+                )
+                with span("mcp.parse"):
+                    result = await self._parse_service_result(raw_result, ctx)
+
+            if cache_key:
+                await asyncio.to_thread(
+                    self._result_cache.put,
+                    cache_key,
+                    self._get_cacheable_result(result, **format_kwargs),
+                )
+            await self._log_completion_stats(result, ctx, engine_stats)
+            with span("mcp.format"):
+                return await self._format_output(
+                    result, output_mode == "detailed", ctx, **format_kwargs
                 )
-                result = await self._parse_service_result(raw_result, ctx)
-
-            await self._log_completion_stats(result, ctx)
-            return await self._format_output(
-                result, output_mode == "detailed", ctx, **format_kwargs
-            )
 
         except Exception as e:
             await ctx.error(f"{self._pipeline} processing failed: {str(e)}")
@@ -401,18 +1165,13 @@ class SimpleInferencePipelineHandler(PipelineHandler):
     ) -> Union[str, np.ndarray]:
         # TODO: Use `file_type` to handle more cases.
         if _is_base64(input_data):
-            if input_data.startswith("data:"):
-                base64_data = input_data.split(",", 1)[1]
-            else:
-                base64_data = input_data
+            base64_data = _strip_data_url(input_data)
             try:
-                image_bytes = base64.b64decode(base64_data)
-                file_type = _infer_file_type_from_bytes(image_bytes)
+                # the type is checked before the whole input is decoded
+                file_type = _infer_file_type_from_base64(base64_data)
                 if file_type != "image":
                     raise ValueError("Currently, only images can be passed via Base64.")
-                image_pil = PILImage.open(io.BytesIO(image_bytes))
-                image_arr = np.array(image_pil.convert("RGB"))
-                return np.ascontiguousarray(image_arr[..., ::-1])
+                return _decode_image(base64.b64decode(base64_data))
             except Exception as e:
                 raise ValueError(f"Failed to decode Base64 image: {str(e)}") from e
         elif _is_file_path(input_data) or _is_url(input_data):
@@ -433,12 +1192,10 @@ class SimpleInferencePipelineHandler(PipelineHandler):
             return input_data, norm_ft
         elif _is_base64(input_data):
             try:
-                if input_data.startswith("data:"):
-                    base64_data = input_data.split(",", 1)[1]
-                else:
-                    base64_data = input_data
-                bytes_ = base64.b64decode(base64_data)
-                file_type_str = _infer_file_type_from_bytes(bytes_)
+                # the data is passed on as is, only its header is decoded
+                file_type_str = _infer_file_type_from_base64(
+                    _strip_data_url(input_data)
+                )
                 if file_type_str is None:
                     raise ValueError(
                         "Unsupported file type in Base64 data. "
@@ -451,14 +1208,13 @@ class SimpleInferencePipelineHandler(PipelineHandler):
             try:
                 with open(input_data, "rb") as f:
                     bytes_ = f.read()
-                input_data = base64.b64encode(bytes_).decode("ascii")
                 file_type_str = _infer_file_type_from_bytes(bytes_)
                 if file_type_str is None:
                     raise ValueError(
                         f"Unsupported file type for '{input_data}'. "
                         "Only images (JPEG, PNG, etc.) and PDF documents are supported."
                     )
-                return input_data, file_type_str
+                return base64.b64encode(bytes_).decode("ascii"), file_type_str
             except Exception as e:
                 raise ValueError(f"Failed to read file: {str(e)}") from e
         else:
@@ -492,13 +1248,10 @@ class SimpleInferencePipelineHandler(PipelineHandler):
             headers["Authorization"] = f"Bearer {self._qianfan_api_key}"
 
         try:
-            timeout = httpx.Timeout(
-                connect=30.0, read=self._timeout, write=30.0, pool=30.0
+            response = await self._send_http_request(
+                "POST", url, json=payload, headers=headers
             )
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                return response.json()
+            return response.json()
         except httpx.HTTPError as e:
             raise RuntimeError(f"HTTP request failed: {type(e).__name__}: {str(e)}")
         except json.JSONDecodeError as e:
@@ -522,12 +1275,15 @@ class SimpleInferencePipelineHandler(PipelineHandler):
 
 
 class OCRHandler(SimpleInferencePipelineHandler):
+    _service_pages_key = "ocrResults"
+
     def register_tools(self, mcp: FastMCP) -> None:
         @mcp.tool("ocr")
         async def _ocr(
             input_data: str,
             output_mode: OutputMode = "simple",
             file_type: Optional[str] = None,
+            page_range: Optional[str] = None,
             *,
             ctx: Context,
         ) -> Union[str, List[Union[TextContent, ImageContent]]]:
@@ -542,11 +1298,14 @@ class OCRHandler(SimpleInferencePipelineHandler):
                     - "image": For image files
                     - "pdf": For PDF documents
                     - None: For unknown file types
+                page_range: Pages of a PDF to process, e.g. "1-10" or "5". Omit it to process all pages.
             """
             await ctx.info(
                 f"--- OCR tool received `input_data`: {get_str_with_max_len(input_data, 50)} ---"
             )
-            return await self.process(input_data, output_mode, ctx, file_type)
+            return await self.process(
+                input_data, output_mode, ctx, file_type, page_range=page_range
+            )
 
     def _create_local_engine(self) -> Any:
         return PaddleOCR(
@@ -569,6 +1328,11 @@ class OCRHandler(SimpleInferencePipelineHandler):
             "useDocOrientationClassify": False,
         }
 
+    def _get_local_page_text(self, page_result: Any) -> str:
+        return "\n".join(
+            text.strip() for text in page_result["rec_texts"] if text and text.strip()
+        )
+
     async def _parse_local_result(self, local_result: Dict, ctx: Context) -> Dict:
         clean_texts, confidences, text_lines = [], [], []
 
@@ -628,11 +1392,18 @@ class OCRHandler(SimpleInferencePipelineHandler):
             "text_lines": text_lines,
         }
 
-    async def _log_completion_stats(self, result: Dict, ctx: Context) -> None:
+    async def _log_completion_stats(
+        self,
+        result: Dict,
+        ctx: Context,
+        engine_stats: Optional[Dict[str, Any]] = None,
+    ) -> None:
         text_length = len(result["text"])
         text_line_count = len(result["text_lines"])
         await ctx.info(
             f"OCR completed: {text_length} characters, {text_line_count} text lines"
+            + self._format_engine_stats(engine_stats)
+            + self._format_cache_stats()
         )
 
     async def _format_output(
@@ -663,6 +1434,8 @@ class OCRHandler(SimpleInferencePipelineHandler):
 
 
 class _LayoutParsingHandler(SimpleInferencePipelineHandler):
+    _service_pages_key = "layoutParsingResults"
+
     def _get_service_endpoint(self) -> str:
         return "layout-parsing" if self._ppocr_source != "qianfan" else "paddleocr"
 
@@ -678,6 +1451,18 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
             "useDocOrientationClassify": False,
         }
 
+    def _get_local_page_text(self, page_result: Any) -> str:
+        return page_result.markdown["markdown_texts"]
+
+    def _get_cacheable_result(
+        self, result: Dict[str, Any], return_images: bool = True, **kwargs: Any
+    ) -> Dict[str, Any]:
+        # images that are not returned would otherwise be encoded just to be
+        # pickled
+        if return_images:
+            return result
+        return {**result, "images_mapping": {}}
+
     async def _parse_local_result(self, local_result: Dict, ctx: Context) -> Dict:
         markdown_parts = []
         all_images_mapping = {}
@@ -688,13 +1473,11 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
             text = markdown["markdown_texts"]
             markdown_parts.append(text)
             images = markdown["markdown_images"]
-            processed_images = {}
-            for img_key, img_data in images.items():
-                with io.BytesIO() as buffer:
-                    img_data.save(buffer, format="JPEG")
-                    processed_images[img_key] = base64.b64encode(buffer.getvalue())
-            all_images_mapping.update(processed_images)
-            detailed_results.append(result)
+            # encoded only if the images end up in the output
+            all_images_mapping.update(
+                (img_key, _LazyImage(img_data)) for img_key, img_data in images.items()
+            )
+            detailed_results.append(_prune_local_result(result.json["res"]))
 
         return {
             # TODO: Page concatenation can be done better via `pipeline.concatenate_markdown_pages`
@@ -723,12 +1506,14 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
         for res in layout_results:
             markdown_parts.append(res["markdown"]["text"])
             images = res["markdown"]["images"]
-            processed_images = {}
-            for img_key, img_data in images.items():
-                processed_images[img_key] = await self._process_image_data(
-                    img_data, ctx
+            # the images of a page are downloaded concurrently over the pool
+            processed = await asyncio.gather(
+                *(
+                    self._process_image_data(img_data, ctx)
+                    for img_data in images.values()
                 )
-            all_images_mapping.update(processed_images)
+            )
+            all_images_mapping.update(zip(images.keys(), processed))
             detailed_results.append(res["prunedResult"])
 
         return {
@@ -741,12 +1526,10 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
     async def _process_image_data(self, img_data: str, ctx: Context) -> str:
         if _is_url(img_data):
             try:
-                timeout = httpx.Timeout(connect=30.0, read=30.0, write=30.0, pool=30.0)
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    response = await client.get(img_data)
-                    response.raise_for_status()
-                    img_bytes = response.content
-                    return base64.b64encode(img_bytes).decode("ascii")
+                response = await self._send_http_request(
+                    "GET", img_data, timeout=httpx.Timeout(30.0)
+                )
+                return base64.b64encode(response.content).decode("ascii")
             except Exception as e:
                 await ctx.error(
                     f"Failed to download image from URL {img_data}: {str(e)}"
@@ -760,9 +1543,18 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
             )
             return img_data
 
-    async def _log_completion_stats(self, result: Dict, ctx: Context) -> None:
+    async def _log_completion_stats(
+        self,
+        result: Dict,
+        ctx: Context,
+        engine_stats: Optional[Dict[str, Any]] = None,
+    ) -> None:
         page_count = result["pages"]
-        await ctx.info(f"Layout parsing completed: {page_count} pages")
+        await ctx.info(
+            f"Layout parsing completed: {page_count} pages"
+            + self._format_engine_stats(engine_stats)
+            + self._format_cache_stats()
+        )
 
     async def _format_output(
         self,
@@ -806,7 +1598,7 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
         return content_list
 
     def _parse_markdown_with_images(
-        self, markdown_text: str, images_mapping: Dict[str, str]
+        self, markdown_text: str, images_mapping: Dict[str, Union[str, _LazyImage]]
     ) -> List[Union[TextContent, ImageContent]]:
         """Parse markdown text and return mixed list of text and images."""
         if not images_mapping:
@@ -826,7 +1618,7 @@ class _LayoutParsingHandler(SimpleInferencePipelineHandler):
                 content_list.append(
                     ImageContent(
                         type="image",
-                        data=images_mapping[img_src],
+                        data=_image_to_base64(images_mapping[img_src]),
                         mimeType="image/jpeg",
                     )
                 )
@@ -848,6 +1640,7 @@ class PPStructureV3Handler(_LayoutParsingHandler):
             output_mode: OutputMode = "simple",
             file_type: Optional[str] = None,
             return_images: bool = True,
+            page_range: Optional[str] = None,
             *,
             ctx: Context,
         ) -> Union[str, List[Union[TextContent, ImageContent]]]:
@@ -863,6 +1656,7 @@ class PPStructureV3Handler(_LayoutParsingHandler):
                     - "pdf": For PDF documents
                     - None: For unknown file types
                 return_images: Whether to return the images extracted from the document.
+                page_range: Pages of a PDF to process, e.g. "1-10" or "5". Omit it to process all pages.
             """
             return await self.process(
                 input_data,
@@ -870,6 +1664,7 @@ class PPStructureV3Handler(_LayoutParsingHandler):
                 ctx,
                 file_type,
                 format_kwargs={"return_images": return_images},
+                page_range=page_range,
             )
 
     def _create_local_engine(self) -> Any:
@@ -893,6 +1688,7 @@ class PaddleOCRVLHandler(_LayoutParsingHandler):
             output_mode: OutputMode = "simple",
             file_type: Optional[str] = None,
             return_images: bool = True,
+            page_range: Optional[str] = None,
             *,
             ctx: Context,
         ) -> Union[str, List[Union[TextContent, ImageContent]]]:
@@ -908,6 +1704,7 @@ class PaddleOCRVLHandler(_LayoutParsingHandler):
                     - "pdf": For PDF documents
                     - None: For unknown file types
                 return_images: Whether to return the images extracted from the document.
+                page_range: Pages of a PDF to process, e.g. "1-10" or "5". Omit it to process all pages.
             """
             return await self.process(
                 input_data,
@@ -915,6 +1712,7 @@ class PaddleOCRVLHandler(_LayoutParsingHandler):
                 ctx,
                 file_type,
                 format_kwargs={"return_images": return_images},
+                page_range=page_range,
             )
 
     def _create_local_engine(self) -> Any:
@@ -0,0 +1,248 @@
+# Copyright (c) 2025 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed cache of pipeline results.
+
+Results are keyed by a hash of the input and of the effective pipeline
+arguments. Entries are kept pickled in an LRU memory tier and, optionally, in
+a SQLite file that survives restarts. Both tiers are bounded by size and
+entries expire after a time to live.
+
+Only the standard library is used: the repository's apps load this same file
+through `ppocr.utils.result_cache`.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+__all__ = ["ResultCache", "make_cache_key"]
+
+
+def make_cache_key(data: Any, params: Optional[Dict[str, Any]] = None) -> str:
+    """Compute the key of an input and the parameters that change its result.
+
+    Args:
+        data: Bytes-like input (bytes, memoryview, contiguous NumPy array).
+        params: JSON serializable parameters.
+
+    Returns:
+        Hex digest that identifies the input and the parameters.
+    """
+    h = hashlib.sha256()
+    h.update(memoryview(data).cast("B"))
+    h.update(b"\0")
+    h.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory and SQLite) result cache."""
+
+    def __init__(
+        self,
+        max_memory_entries: int = 64,
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        disk_path: Optional[str] = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_memory_entries: Entries of the memory tier, 0 disables it.
+            max_memory_bytes: Total pickled size of the memory tier.
+            disk_path: SQLite file of the disk tier, `None` disables it.
+            max_disk_bytes: Total pickled size of the disk tier.
+            ttl: Seconds after which entries expire, `None` keeps them.
+        """
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl or None
+        self._memory: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "puts": 0,
+            "evictions": 0,
+            "expired": 0,
+            "unpicklable": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            if os.path.dirname(disk_path):
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                "value BLOB, size INTEGER, created REAL, accessed REAL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_memory_entries > 0 or self._db is not None
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Any:
+        """Return the cached value of `key` or `None`."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[1], now):
+                self._drop_memory(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                blob = entry[0]
+            else:
+                blob = self._get_disk(key, now)
+                if blob is None:
+                    self._stats["misses"] += 1
+                    return None
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+        # unpickled per hit so that callers can modify the result freely
+        return pickle.loads(blob)
+
+    def put(self, key: str, value: Any) -> None:
+        """Store `value` under `key`. Values that cannot be pickled are skipped."""
+        if not self.enabled:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            with self._lock:
+                self._stats["unpicklable"] += 1
+            return
+        now = time.time()
+        with self._lock:
+            self._stats["puts"] += 1
+            self._put_memory(key, blob, now)
+            self._put_disk(key, blob, now)
+
+    def _drop_memory(self, key: str) -> None:
+        blob, _ = self._memory.pop(key)
+        self._memory_bytes -= len(blob)
+
+    def _put_memory(self, key: str, blob: bytes, created: float) -> None:
+        if self.max_memory_entries <= 0 or len(blob) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = (blob, created)
+        self._memory_bytes += len(blob)
+        while (
+            len(self._memory) > self.max_memory_entries
+            or self._memory_bytes > self.max_memory_bytes
+        ):
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self._stats["evictions"] += 1
+
+    def _get_disk(self, key: str, now: float) -> Optional[bytes]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT value, created FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        blob, created = row
+        if self._expired(created, now):
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+            self._stats["expired"] += 1
+            return None
+        self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        self._put_memory(key, blob, created)
+        return blob
+
+    def _put_disk(self, key: str, blob: bytes, now: float) -> None:
+        if self._db is None or len(blob) > self.max_disk_bytes:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (key, sqlite3.Binary(blob), len(blob), now, now),
+        )
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+        if total > self.max_disk_bytes:
+            # drop the least recently used entries until the tier fits again
+            rows = self._db.execute(
+                "SELECT key, size FROM results ORDER BY accessed"
+            ).fetchall()
+            for old_key, size in rows:
+                if total <= self.max_disk_bytes:
+                    break
+                self._db.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                total -= size
+                self._stats["evictions"] += 1
+        self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit/miss counters and the size of both tiers."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            if self._db is not None:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+                ).fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db: Optional[sqlite3.Connection] = None
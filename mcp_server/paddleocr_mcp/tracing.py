@@ -0,0 +1,497 @@
+# Copyright (c) 2025 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tracing spans and an in-process metrics registry of the MCP server.
+
+Spans nest through a context variable, so every asyncio task (i.e. every tool
+call) builds its own tree of request, decode, inference and parse spans.
+Finished spans are observed by the `paddleocr_mcp_span_seconds` histogram,
+their count attributes (integers named `*_num` or `*_size`) are summed into
+`paddleocr_mcp_span_items_total`, and they are passed on to the exporters,
+e.g. `JsonLinesExporter`. The registry renders itself in the Prometheus text
+format.
+
+Only the standard library is used: the repository's inference pipelines load
+this same file through `ppocr.utils.tracing`, with a registry whose metrics
+are prefixed with `ppocr` (see `set_registry`).
+"""
+
+import contextvars
+import json
+import logging
+import numbers
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Span",
+    "span",
+    "record_span",
+    "current_span",
+    "MetricsRegistry",
+    "JsonLinesExporter",
+    "get_registry",
+    "set_registry",
+    "add_exporter",
+    "remove_exporter",
+    "start_metrics_server",
+]
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cache hit to a long document.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# Integer attributes with these suffixes are counts that are worth summing.
+_COUNTED_SUFFIXES = ("_num", "_size")
+
+_LabelKey = Tuple[Tuple[str, Any], ...]
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "paddleocr_mcp_current_span", default=None
+)
+
+
+def _new_id(bits: int) -> str:
+    return "{:0{}x}".format(random.getrandbits(bits), bits // 4)
+
+
+def _to_json(value: Any) -> Any:
+    # NumPy scalars and shapes of NumPy arrays are not JSON serializable.
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class Span:
+    """A timed operation with attributes, child of the span it was opened in."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_time",
+        "duration",
+        "attributes",
+        "error",
+        "_start",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else _new_id(128)
+        self.span_id = _new_id(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes: Any) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "attributes": {k: _to_json(v) for k, v in self.attributes.items()},
+            "error": self.error,
+        }
+
+
+class _Counter:
+    def __init__(self, name: str, help: str, lock: threading.Lock) -> None:
+        self.name = name
+        self.help = help
+        self.values: Dict[_LabelKey, float] = {}
+        self._lock = lock
+
+    def inc(self, value: float = 1, **labels: Any) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+class _Histogram:
+    def __init__(
+        self, name: str, help: str, buckets: Sequence[float], lock: threading.Lock
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (the last one is +Inf), sum and count.
+        self.values: Dict[_LabelKey, list] = {}
+        self._lock = lock
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+
+def _format_labels(key: _LabelKey, extra: Sequence[Tuple[str, Any]] = ()) -> str:
+    labels = list(key) + list(extra)
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+    )
+
+
+def _format_bound(bound: float) -> str:
+    return "{:g}".format(bound)
+
+
+class MetricsRegistry:
+    """Counters and histograms with labels, safe to update from several threads."""
+
+    def __init__(
+        self,
+        prefix: str = "paddleocr_mcp",
+        span_buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize the registry.
+
+        Args:
+            prefix: Prefix of the metrics that are derived from spans.
+            span_buckets: Buckets of the span duration histogram, in seconds.
+        """
+        self.prefix = prefix
+        self.span_buckets = tuple(span_buckets)
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, help: str = "") -> _Counter:
+        return self._get(name, lambda: _Counter(name, help, self._lock))
+
+    def histogram(
+        self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> _Histogram:
+        return self._get(name, lambda: _Histogram(name, help, buckets, self._lock))
+
+    def observe_span(self, span: Span) -> None:
+        """Record the duration, error and count attributes of a finished span."""
+        labels = {"span": span.name}
+        self.histogram(
+            f"{self.prefix}_span_seconds",
+            "Duration of the spans in seconds",
+            self.span_buckets,
+        ).observe(span.duration or 0.0, **labels)
+        if span.error is not None:
+            self.counter(
+                f"{self.prefix}_span_errors_total",
+                "Spans that ended with an exception",
+            ).inc(**labels)
+        items = self.counter(
+            f"{self.prefix}_span_items_total",
+            "Sum of the count attributes of the spans, e.g. boxes or batch sizes",
+        )
+        for key, value in span.attributes.items():
+            if not key.endswith(_COUNTED_SUFFIXES):
+                continue
+            if isinstance(value, bool) or not isinstance(value, numbers.Integral):
+                continue
+            items.inc(int(value), item=key, **labels)
+
+    def reset(self) -> None:
+        """Drop all metrics."""
+        with self._lock:
+            self._metrics = {}
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the metrics as JSON serializable data.
+
+        Returns:
+            Metric name to a list of label sets with their value; histograms
+            have a count, a sum and the cumulative bucket counts instead.
+        """
+        with self._lock:
+            result: Dict[str, List[Dict[str, Any]]] = {}
+            for name, metric in self._metrics.items():
+                series = []
+                for key, value in metric.values.items():
+                    entry: Dict[str, Any] = {"labels": dict(key)}
+                    if isinstance(metric, _Histogram):
+                        cumulative, total = [], 0
+                        for count in value[0]:
+                            total += count
+                            cumulative.append(total)
+                        bounds = [_format_bound(b) for b in metric.buckets] + ["+Inf"]
+                        entry.update(
+                            count=value[2],
+                            sum=value[1],
+                            buckets=dict(zip(bounds, cumulative)),
+                        )
+                    else:
+                        entry["value"] = value
+                    series.append(entry)
+                result[name] = series
+            return result
+
+    def span_summary(self) -> Dict[str, Dict[str, float]]:
+        """Summarize the span durations.
+
+        Returns:
+            Span name to its count, total and mean duration in seconds.
+        """
+        with self._lock:
+            histogram = self._metrics.get(f"{self.prefix}_span_seconds")
+            if histogram is None:
+                return {}
+            return {
+                dict(key)["span"]: {
+                    "count": value[2],
+                    "total": value[1],
+                    "mean": value[1] / value[2],
+                }
+                for key, value in sorted(histogram.values.items())
+            }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                kind = "histogram" if isinstance(metric, _Histogram) else "counter"
+                if metric.help:
+                    lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(metric.values.items()):
+                    if kind == "counter":
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+                        continue
+                    total = 0
+                    bounds = [_format_bound(b) for b in metric.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, value[0]):
+                        total += count
+                        lines.append(
+                            f"{name}_bucket{_format_labels(key, [('le', bound)])} "
+                            f"{total}"
+                        )
+                    lines.append(f"{name}_sum{_format_labels(key)} {value[1]!r}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value[2]}")
+        return "\n".join(lines) + "\n"
+
+
+class JsonLinesExporter:
+    """Appends every finished span as one JSON line to a file."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_registry = MetricsRegistry()
+_exporters: List[Callable[[Span], None]] = []
+_exporters_lock = threading.Lock()
+_servers: Dict[Tuple[str, int], ThreadingHTTPServer] = {}
+_servers_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def set_registry(registry: MetricsRegistry) -> None:
+    """Replace the registry that observes the spans and that is served.
+
+    Meant to be called once at import time, before any span finishes.
+    """
+    global _registry
+    _registry = registry
+
+
+def add_exporter(exporter: Callable[[Span], None]) -> None:
+    """Call `exporter` with every finished span."""
+    with _exporters_lock:
+        _exporters.append(exporter)
+
+
+def remove_exporter(exporter: Callable[[Span], None]) -> None:
+    with _exporters_lock:
+        if exporter in _exporters:
+            _exporters.remove(exporter)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _finish(item: Span) -> None:
+    _registry.observe_span(item)
+    for exporter in list(_exporters):
+        try:
+            exporter(item)
+        except Exception:
+            logger.warning("Span exporter failed", exc_info=True)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Open a span as child of the current one.
+
+    Args:
+        name: Operation name, e.g. "mcp.inference".
+        **attributes: Initial attributes, more can be added with `Span.set`.
+    """
+    item = Span(name, _current.get(), attributes)
+    token = _current.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        item.finish()
+        _finish(item)
+
+
+def record_span(name: str, duration: float, **attributes: Any) -> Span:
+    """Record a span that ended now and was timed by the caller.
+
+    Args:
+        name: Operation name.
+        duration: Seconds the operation took.
+        **attributes: Attributes of the span.
+    """
+    item = Span(name, _current.get(), attributes)
+    item.start_time -= duration
+    item.duration = duration
+    _finish(item)
+    return item
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body = _registry.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(_registry.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve `/metrics` (Prometheus text) and `/metrics.json` from a daemon thread.
+
+    Starting the same address twice returns the running server.
+
+    Args:
+        port: Port to listen on.
+        host: Address to bind.
+
+    Returns:
+        The running server.
+    """
+    with _servers_lock:
+        server = _servers.get((host, port))
+        if server is None:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            _servers[(host, port)] = server
+            logger.info(
+                "Serving metrics at http://%s:%d/metrics",
+                host,
+                server.server_address[1],
+            )
+        return server
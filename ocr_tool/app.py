@@ -5,7 +5,9 @@ import os
 import textwrap
 from PIL import Image
 try:
-    from local_ocr_engine import LocalOCREngine
+    from local_ocr_engine import LocalOCREngine, tracing
+    from engine_registry import get_engine, get_registry, warm_up_engines
+    get_metrics_registry = tracing.get_registry
 except Exception as e:
     # If it still fails, show error in streamlit
     st.error(f"Failed to load OCR Engine: {e}")
@@ -96,6 +98,35 @@ with st.sidebar:
     st.markdown("---")
     st.info("This tool runs locally on your machine. Text and tables are extracted using PaddleOCR PP-Structure.")
 
+    if LocalOCREngine is not None:
+        # Engines are shared process-wide, every key is warmed up once per process.
+        warm_up_engines([(lang, use_gpu, 'PP-OCRv4')])
+        with st.expander("Engine cache"):
+            for entry in get_registry().stats():
+                rss = entry['rss_delta']
+                rss_txt = f"{rss / (1024 * 1024):.0f} MB" if rss is not None else "n/a"
+                st.caption(
+                    f"{entry['lang']} / {'GPU' if entry['use_gpu'] else 'CPU'} / {entry['ocr_version']}: "
+                    f"loaded in {entry['load_time']:.1f}s, {rss_txt}, {entry['hits']} hits"
+                )
+            cache_stats = get_registry().result_cache.stats()
+            st.caption(
+                f"Result cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                f"{cache_stats['memory_entries']} entries ({cache_stats['memory_bytes'] / (1024 * 1024):.1f} MB)"
+            )
+        with st.expander("Metrics"):
+            span_stats = get_metrics_registry().span_summary()
+            if not span_stats:
+                st.caption("No image processed yet.")
+            for name, stats in span_stats.items():
+                st.caption(f"{name}: {stats['count']} calls, mean {stats['mean'] * 1000:.0f} ms")
+            st.download_button(
+                "Export (Prometheus)",
+                get_metrics_registry().to_prometheus(),
+                file_name="ocr_tool_metrics.prom",
+                mime="text/plain",
+            )
+
 # --- MAIN APPLICATION LOGIC ---
 if 'ocr_result' in st.session_state:
     # PHASE 1: FULL-SCREEN DESIGNER STUDIO
@@ -281,7 +312,7 @@ else:
             if st.button("🚀 Run AI Carbon Copy Analysis", type="primary", use_container_width=True):
                 with st.spinner("Analyzing document structure..."):
                     try:
-                        engine = LocalOCREngine(use_gpu=use_gpu, lang=lang)
+                        engine = get_engine(lang=lang, use_gpu=use_gpu)
                         result_data = engine.process_image(image, save_folder="output_results")
                         
                         # Fix: Store image base64 correctly for robust session recovery
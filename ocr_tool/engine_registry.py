@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from local_ocr_engine import LocalOCREngine, create_result_cache
+
+DEFAULT_OCR_VERSION = 'PP-OCRv4'
+
+
+def _current_rss_bytes():
+    """
+    Returns the resident set size of this process in bytes, or None if it
+    cannot be determined on this platform.
+    """
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return None
+
+
+class EngineRegistry:
+    """
+    Process-wide cache of LocalOCREngine instances keyed by
+    (lang, use_gpu, ocr_version). Loading the det/rec predictors takes
+    seconds, so every Streamlit rerun should reuse an engine instead of
+    rebuilding it. The least recently used engine is dropped once more than
+    `max_engines` are cached.
+    """
+
+    def __init__(self, max_engines=2):
+        self.max_engines = max(1, int(max_engines))
+        self._engines = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._warmed = set()
+        # shared by all engines, the engine settings are part of the cache key
+        self.result_cache = create_result_cache()
+
+    @staticmethod
+    def make_key(lang='ch', use_gpu=False, ocr_version=DEFAULT_OCR_VERSION):
+        return (lang, bool(use_gpu), ocr_version)
+
+    def _cached(self, key, count_hit):
+        # caller holds self._lock
+        engine = self._engines.get(key)
+        if engine is not None and count_hit:
+            self._engines.move_to_end(key)
+            self._stats[key]['hits'] += 1
+            self._stats[key]['last_used'] = time.time()
+        return engine
+
+    def get(self, lang='ch', use_gpu=False, ocr_version=DEFAULT_OCR_VERSION):
+        return self._get(self.make_key(lang, use_gpu, ocr_version), count_hit=True)
+
+    def _get(self, key, count_hit):
+        lang, use_gpu, ocr_version = key
+        with self._lock:
+            engine = self._cached(key, count_hit)
+            if engine is not None:
+                return engine
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Loading happens under a lock of its own key so two concurrent sessions
+        # asking for the same key never build the predictors twice, while cache
+        # hits for other keys do not wait for the load.
+        with load_lock:
+            with self._lock:
+                engine = self._cached(key, count_hit)
+                if engine is not None:
+                    return engine
+
+            rss_before = _current_rss_bytes()
+            start = time.time()
+            engine = LocalOCREngine(use_gpu=use_gpu, lang=lang, ocr_version=ocr_version,
+                                    result_cache=self.result_cache)
+            load_time = time.time() - start
+            rss_after = _current_rss_bytes()
+            print(f"Engine {key} loaded in {load_time:.2f}s")
+
+            with self._lock:
+                self._load_locks.pop(key, None)
+                self._engines[key] = engine
+                self._stats[key] = {
+                    'load_time': load_time,
+                    'rss_delta': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+                    'rss_after_load': rss_after,
+                    'hits': 0,
+                    'loaded_at': time.time(),
+                    'last_used': time.time(),
+                }
+
+                while len(self._engines) > self.max_engines:
+                    evicted_key, _ = self._engines.popitem(last=False)
+                    self._stats.pop(evicted_key, None)
+                    print(f"Evicted engine {evicted_key} (cache size {self.max_engines})")
+            return engine
+
+    def warm_up(self, keys):
+        """
+        Loads every (lang, use_gpu, ocr_version) tuple in `keys` that was not
+        warmed up by this process before. Warm-up does not count as a hit.
+        Failures are reported and skipped so that a bad entry does not
+        prevent the app from starting.
+        """
+        for key in keys:
+            key = self.make_key(*key)
+            with self._lock:
+                if key in self._warmed:
+                    continue
+                self._warmed.add(key)
+            try:
+                self._get(key, count_hit=False)
+            except Exception as e:
+                print(f"Warm-up of engine {key} failed: {e}")
+
+    def evict(self, lang='ch', use_gpu=False, ocr_version=DEFAULT_OCR_VERSION):
+        key = self.make_key(lang, use_gpu, ocr_version)
+        with self._lock:
+            self._stats.pop(key, None)
+            return self._engines.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._engines.clear()
+            self._stats.clear()
+
+    def stats(self):
+        """
+        Returns one dict per cached engine, most recently used last.
+        `rss_delta` is the growth of the process RSS while the engine was
+        loading, which approximates the memory the engine keeps resident.
+        """
+        with self._lock:
+            report = []
+            for key in self._engines:
+                lang, use_gpu, ocr_version = key
+                entry = {'lang': lang, 'use_gpu': use_gpu, 'ocr_version': ocr_version}
+                entry.update(self._stats[key])
+                report.append(entry)
+            return report
+
+    def __len__(self):
+        return len(self._engines)
+
+    def __contains__(self, key):
+        return self.make_key(*key) in self._engines
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Returns the process-wide registry. The cache size can be set with the
+    OCR_ENGINE_CACHE_SIZE environment variable (default 2).
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = EngineRegistry(max_engines=int(os.environ.get('OCR_ENGINE_CACHE_SIZE', 2)))
+        return _registry
+
+
+def get_engine(lang='ch', use_gpu=False, ocr_version=DEFAULT_OCR_VERSION):
+    return get_registry().get(lang=lang, use_gpu=use_gpu, ocr_version=ocr_version)
+
+
+def warm_up_engines(keys=None):
+    """
+    Preloads engines at app startup. Without `keys`, the list is read from
+    OCR_ENGINE_WARMUP, e.g. "en:cpu,ch:gpu:PP-OCRv4".
+    """
+    if keys is None:
+        keys = []
+        for spec in os.environ.get('OCR_ENGINE_WARMUP', '').split(','):
+            parts = [p.strip() for p in spec.split(':') if p.strip()]
+            if not parts:
+                continue
+            lang = parts[0]
+            use_gpu = len(parts) > 1 and parts[1].lower() == 'gpu'
+            ocr_version = parts[2] if len(parts) > 2 else DEFAULT_OCR_VERSION
+            keys.append((lang, use_gpu, ocr_version))
+    get_registry().warm_up(keys)
+    return get_registry()
@@ -1,5 +1,7 @@
 import os
 import sys
+import threading
+import time
 import cv2
 import numpy as np
 from paddleocr import PPStructure, PaddleOCR
@@ -7,22 +9,55 @@ from paddleocr.ppstructure.recovery.recovery_to_doc import convert_info_docx
 from docx import Document
 from docx.shared import Pt, Inches, Emu
 
+from repo_modules import load_repo_module
+# The reading-order sorter and the grid index live in the repo's ppocr package
+# (numpy only), which the paddleocr wheel's own ppocr shadows, so they are
+# loaded by file path
+reading_order = load_repo_module("ppocr/utils/reading_order.py").reading_order
+GridIndex = load_repo_module("ppocr/utils/spatial_index.py").GridIndex
+# the cache and the tracing shared with the MCP server, standard library only
+_result_cache = load_repo_module("mcp_server/paddleocr_mcp/result_cache.py")
+ResultCache, make_cache_key = _result_cache.ResultCache, _result_cache.make_cache_key
+tracing = load_repo_module("mcp_server/paddleocr_mcp/tracing.py")
+# same metric names as ppocr.utils.tracing
+tracing.set_registry(tracing.MetricsRegistry(prefix="ppocr"))
+span, record_span, current_span = tracing.span, tracing.record_span, tracing.current_span
+
+
+def create_result_cache():
+    """
+    Result cache configured from the environment: OCR_TOOL_CACHE_SIZE memory
+    entries (default 16), an optional SQLite tier at OCR_TOOL_CACHE_PATH that
+    survives restarts and an optional OCR_TOOL_CACHE_TTL in seconds.
+    """
+    return ResultCache(
+        max_memory_entries=int(os.getenv('OCR_TOOL_CACHE_SIZE', '16')),
+        disk_path=os.getenv('OCR_TOOL_CACHE_PATH') or None,
+        ttl=float(os.getenv('OCR_TOOL_CACHE_TTL', '0')) or None,
+    )
+
 class LocalOCREngine:
-    def __init__(self, use_gpu=False, lang='ch'):
+    def __init__(self, use_gpu=False, lang='ch', ocr_version='PP-OCRv4', result_cache=None):
         self.use_gpu = use_gpu
         self.lang = lang
+        self.ocr_version = ocr_version
+        # Re-running the analysis on the same image returns the cached result
+        self.result_cache = result_cache if result_cache is not None else create_result_cache()
+        # The registry shares one engine between all Streamlit sessions and the
+        # predictors underneath are not thread-safe, so pages run one at a time
+        self._lock = threading.Lock()
         
         # Initialize PaddleOCR (Fallback to non-structure engine to fix crash)
-        print(f"Initializing PaddleOCR (v4) with lang={lang}...")
+        print(f"Initializing PaddleOCR ({ocr_version}) with lang={lang}...")
         try:
             self.table_engine = PaddleOCR(
                 show_log=True, 
                 use_gpu=use_gpu, 
                 lang=lang,
-                ocr_version='PP-OCRv4',
+                ocr_version=ocr_version,
                 use_angle_cls=False
             )
-            print(f"✓ Initialized PaddleOCR (v4) successfully.")
+            print(f"✓ Initialized PaddleOCR ({ocr_version}) successfully.")
         except Exception as e:
             print(f"PaddleOCR init failed: {e}")
             raise e
@@ -53,8 +88,8 @@ class LocalOCREngine:
                         'bbox': line['bbox']
                     })
 
-        # Sort all lines by Y then X to maintain natural reading order flow with spacing
-        all_lines.sort(key=lambda x: (x['bbox'][1], x['bbox'][0]))
+        # Sort all lines into reading order (line by line, left to right) to keep the flow with spacing
+        all_lines = [all_lines[i] for i in reading_order([l['bbox'] for l in all_lines])]
         
         last_y = 0
         for line in all_lines:
@@ -84,22 +119,59 @@ class LocalOCREngine:
         return save_path
 
     def process_image(self, img_path_or_array, save_folder="./output", img_name="result"):
+        # The spans feed tracing.get_registry(), which the apps show
+        with self._lock, span("ocr_tool.page", lang=self.lang, ocr_version=self.ocr_version) as page_span:
+            output = self._process_image(img_path_or_array, save_folder, img_name)
+            page_span.set(region_num=len(output['processed_output']))
+        return output
+
+    def _process_image(self, img_path_or_array, save_folder, img_name):
         if not os.path.exists(save_folder):
             os.makedirs(save_folder)
 
         if isinstance(img_path_or_array, str):
-            img = cv2.imread(img_path_or_array)
             img_name = os.path.basename(img_path_or_array).split('.')[0]
+            if not os.path.isfile(img_path_or_array):
+                raise ValueError("Image could not be loaded.")
+            data = np.fromfile(img_path_or_array, dtype=np.uint8)
+            img = None
         else:
             img = img_path_or_array
+            if img is None:
+                raise ValueError("Image could not be loaded.")
+            img = np.ascontiguousarray(img)
+            data = img
+
+        # Key: the file bytes (or pixels) plus everything that changes the output
+        cache_key = make_cache_key(data, {
+            'shape': None if img is None else img.shape,
+            'lang': self.lang,
+            'ocr_version': self.ocr_version,
+            'save_folder': os.path.abspath(save_folder),
+            'img_name': img_name,
+        })
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            output, docx_mtime = cached
+            # the docx may have been overwritten by another image with the same name
+            if output['docx_path'] is None or (
+                    os.path.exists(output['docx_path'])
+                    and os.path.getmtime(output['docx_path']) == docx_mtime):
+                print(f"✓ Result cache hit for {img_name}")
+                current_span().set(cache='hit')
+                return output
 
+        if img is None:
+            with span("ocr_tool.decode"):
+                img = cv2.imdecode(data, cv2.IMREAD_COLOR)
         if img is None:
             raise ValueError("Image could not be loaded.")
 
         h, w = img.shape[:2]
 
         # Run the engine
-        result = self.table_engine(img)
+        with span("ocr_tool.engine", shape=img.shape):
+            result = self.table_engine(img)
         
         # Compatibility Fix: Convert PaddleOCR format to PPStructure format if needed
         print(f"DEBUG: result type = {type(result)}")
@@ -209,7 +281,8 @@ class LocalOCREngine:
         print(f"DEBUG: About to sort. result type = {type(result)}, length = {len(result) if isinstance(result, list) else 'N/A'}")
         if isinstance(result, list) and len(result) > 0:
             print(f"DEBUG: result[0] = {result[0] if isinstance(result[0], dict) else 'NOT DICT'}")
-        sorted_res = sorted(result, key=lambda x: (x['bbox'][1], x['bbox'][0]))
+        with span("ocr_tool.sort", region_num=len(result)):
+            sorted_res = [result[i] for i in reading_order([r['bbox'] for r in result], deskew=False)]
 
         processed_output = []
         for region in sorted_res:
@@ -294,19 +367,25 @@ class LocalOCREngine:
             # Filter out overlapping lines (EXTREMELY aggressive threshold)
             unique_lines = []
             raw_lines = item['lines']
+            # Only lines whose boxes touch can overlap, the grid index returns
+            # them in insertion order so the first match is the same as before
+            heights = [l['bbox'][3] - l['bbox'][1] for l in raw_lines if l.get('bbox')]
+            line_index = GridIndex(cell_size=2 * float(np.median(heights)) if heights else None)
             # Sort by confidence/size if possible, but here we just use order
             for i, line in enumerate(raw_lines):
                 if not line.get('bbox'):
                     unique_lines.append(line)
                     continue
                 is_duplicate = False
-                for existing in unique_lines:
-                    if existing.get('bbox') and get_iou(line['bbox'], existing['bbox']) > 0.15:
+                for k in line_index.query(line['bbox']):
+                    existing = unique_lines[k]
+                    if get_iou(line['bbox'], existing['bbox']) > 0.15:
                         if len(line['text']) > len(existing['text']):
                             existing['text'] = line['text'] # Keep longer text
                         is_duplicate = True
                         break
                 if not is_duplicate:
+                    line_index.insert(len(unique_lines), line['bbox'])
                     unique_lines.append(line)
             
             item['lines'] = unique_lines
@@ -315,6 +394,7 @@ class LocalOCREngine:
         # --- NEW: Layout Recovery (Absolute Positioning Docx) ---
         docx_path = None
         custom_docx_path = os.path.join(save_folder, f"{img_name}_layout.docx")
+        docx_start = time.perf_counter()
         
         # 1. Try Native PaddleOCR Recovery (Better for Tables/Structure)
         try:
@@ -337,6 +417,7 @@ class LocalOCREngine:
                 docx_path = custom_docx_path
             except Exception as e:
                 print(f"Custom layout docx generation also failed: {e}")
+        record_span("ocr_tool.docx", time.perf_counter() - docx_start, written=docx_path is not None)
 
         # Prepare metadata for frontend scaling
         metadata = {
@@ -345,12 +426,15 @@ class LocalOCREngine:
             'image_name': img_name
         }
             
-        return {
+        output = {
             "processed_output": processed_output,
             "raw_result": result,
             "docx_path": docx_path,
             "metadata": metadata
         }
+        docx_mtime = os.path.getmtime(docx_path) if docx_path else None
+        self.result_cache.put(cache_key, (output, docx_mtime))
+        return output
 
     def regenerate_docx_from_result(self, result, img_path_or_array, save_folder="./output", img_name="edited_result"):
         """
@@ -0,0 +1,32 @@
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def load_repo_module(relative_path):
+    """
+    Loads a numpy / standard library module of the repository by file path,
+    e.g. "ppocr/utils/reading_order.py", once per process.
+
+    `from paddleocr import ...` puts the ppocr package of the installed
+    paddleocr wheel into sys.modules, so the repository's ppocr cannot be
+    imported next to it. The module is registered under a name of its own
+    instead, which does not clash with the installed ppocr.
+    """
+    module_name = "_ocr_tool_" + os.path.splitext(relative_path)[0].replace("/", "_")
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(REPO_ROOT, *relative_path.split("/")))
+    module = importlib.util.module_from_spec(spec)
+    # registered before running it so that pickle can find its classes
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -19,34 +19,52 @@ from __future__ import unicode_literals
 
 import os
 import sys
-import numpy as np
-import skimage
-import paddle
 import signal
-import random
+import importlib
 
 __dir__ = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.abspath(os.path.join(__dir__, "../..")))
 
 import copy
-from paddle.io import Dataset, DataLoader, BatchSampler, DistributedBatchSampler
-import paddle.distributed as dist
 
 from ppocr.data.imaug import transform, create_operators
-from ppocr.data.simple_dataset import SimpleDataSet, MultiScaleDataSet
-from ppocr.data.lmdb_dataset import LMDBDataSet, LMDBDataSetSR, LMDBDataSetTableMaster
-from ppocr.data.pgnet_dataset import PGDataSet
-from ppocr.data.pubtab_dataset import PubTabDataSet
-from ppocr.data.multi_scale_sampler import MultiScaleSampler
-from ppocr.data.latexocr_dataset import LaTeXOCRDataSet
+
+# the submodule of every dataset and sampler, they are only imported by
+# build_dataloader so that inference, which needs create_operators and
+# transform only, does not import paddle.io and the dataset dependencies
+_MODULES = {
+    "SimpleDataSet": "ppocr.data.simple_dataset",
+    "MultiScaleDataSet": "ppocr.data.simple_dataset",
+    "LMDBDataSet": "ppocr.data.lmdb_dataset",
+    "LMDBDataSetSR": "ppocr.data.lmdb_dataset",
+    "LMDBDataSetTableMaster": "ppocr.data.lmdb_dataset",
+    "PGDataSet": "ppocr.data.pgnet_dataset",
+    "PubTabDataSet": "ppocr.data.pubtab_dataset",
+    "MultiScaleSampler": "ppocr.data.multi_scale_sampler",
+    "LaTeXOCRDataSet": "ppocr.data.latexocr_dataset",
+}
 
 # for PaddleX dataset_type
-TextDetDataset = SimpleDataSet
-TextRecDataset = SimpleDataSet
-MSTextRecDataset = MultiScaleDataSet
-PubTabTableRecDataset = PubTabDataSet
-KieDataset = SimpleDataSet
-LaTeXOCRDataSet = LaTeXOCRDataSet
+_ALIASES = {
+    "TextDetDataset": "SimpleDataSet",
+    "TextRecDataset": "SimpleDataSet",
+    "MSTextRecDataset": "MultiScaleDataSet",
+    "PubTabTableRecDataset": "PubTabDataSet",
+    "KieDataset": "SimpleDataSet",
+}
+
+
+def _load(name):
+    name = _ALIASES.get(name, name)
+    return getattr(importlib.import_module(_MODULES[name]), name)
+
+
+def __getattr__(name):
+    # keeps `from ppocr.data import SimpleDataSet` working
+    if name in _MODULES or name in _ALIASES:
+        return _load(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 
 __all__ = ["build_dataloader", "transform", "create_operators", "set_signal_handlers"]
 
@@ -81,6 +99,8 @@ def set_signal_handlers():
 
 
 def build_dataloader(config, mode, device, logger, seed=None):
+    from paddle.io import DataLoader, BatchSampler, DistributedBatchSampler
+
     config = copy.deepcopy(config)
 
     support_dict = [
@@ -104,7 +124,7 @@ def build_dataloader(config, mode, device, logger, seed=None):
     )
     assert mode in ["Train", "Eval", "Test"], "Mode should be Train, Eval or Test."
 
-    dataset = eval(module_name)(config, mode, logger, seed)
+    dataset = _load(module_name)(config, mode, logger, seed)
     loader_config = config[mode]["loader"]
     batch_size = loader_config["batch_size_per_card"]
     drop_last = loader_config["drop_last"]
@@ -120,7 +140,7 @@ def build_dataloader(config, mode, device, logger, seed=None):
         if "sampler" in config[mode]:
             config_sampler = config[mode]["sampler"]
             sampler_name = config_sampler.pop("name")
-            batch_sampler = eval(sampler_name)(dataset, **config_sampler)
+            batch_sampler = _load(sampler_name)(dataset, **config_sampler)
         else:
             batch_sampler = DistributedBatchSampler(
                 dataset=dataset,
@@ -17,96 +17,68 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import os
 import copy
+import importlib
 
 __all__ = ["build_post_process"]
 
-from .db_postprocess import DBPostProcess, DistillationDBPostProcess
-from .east_postprocess import EASTPostProcess
-from .sast_postprocess import SASTPostProcess
-from .fce_postprocess import FCEPostProcess
-from .rec_postprocess import (
-    CTCLabelDecode,
-    AttnLabelDecode,
-    SRNLabelDecode,
-    DistillationCTCLabelDecode,
-    NRTRLabelDecode,
-    SARLabelDecode,
-    SEEDLabelDecode,
-    PRENLabelDecode,
-    ViTSTRLabelDecode,
-    ABINetLabelDecode,
-    SPINLabelDecode,
-    VLLabelDecode,
-    RFLLabelDecode,
-    SATRNLabelDecode,
-    ParseQLabelDecode,
-    CPPDLabelDecode,
-    LaTeXOCRDecode,
-    UniMERNetDecode,
-)
-from .cls_postprocess import ClsPostProcess
-from .pg_postprocess import PGPostProcess
-from .vqa_token_ser_layoutlm_postprocess import (
-    VQASerTokenLayoutLMPostProcess,
-    DistillationSerPostProcess,
-)
-from .vqa_token_re_layoutlm_postprocess import (
-    VQAReTokenLayoutLMPostProcess,
-    DistillationRePostProcess,
-)
-from .table_postprocess import TableMasterLabelDecode, TableLabelDecode
-from .picodet_postprocess import PicoDetPostProcess
-from .ct_postprocess import CTPostProcess
-from .drrg_postprocess import DRRGPostprocess
-from .rec_postprocess import CANLabelDecode
+# the submodule of every post process, a submodule is only imported when one
+# of its classes is built so that a pipeline does not pay for the imports
+# (paddle, shapely, scipy, ...) of post processes it never uses
+_MODULES = {
+    "DBPostProcess": ".db_postprocess",
+    "DistillationDBPostProcess": ".db_postprocess",
+    "EASTPostProcess": ".east_postprocess",
+    "SASTPostProcess": ".sast_postprocess",
+    "FCEPostProcess": ".fce_postprocess",
+    "CTCLabelDecode": ".rec_postprocess",
+    "AttnLabelDecode": ".rec_postprocess",
+    "SRNLabelDecode": ".rec_postprocess",
+    "DistillationCTCLabelDecode": ".rec_postprocess",
+    "NRTRLabelDecode": ".rec_postprocess",
+    "SARLabelDecode": ".rec_postprocess",
+    "DistillationSARLabelDecode": ".rec_postprocess",
+    "SEEDLabelDecode": ".rec_postprocess",
+    "PRENLabelDecode": ".rec_postprocess",
+    "ViTSTRLabelDecode": ".rec_postprocess",
+    "ABINetLabelDecode": ".rec_postprocess",
+    "SPINLabelDecode": ".rec_postprocess",
+    "VLLabelDecode": ".rec_postprocess",
+    "RFLLabelDecode": ".rec_postprocess",
+    "SATRNLabelDecode": ".rec_postprocess",
+    "ParseQLabelDecode": ".rec_postprocess",
+    "CPPDLabelDecode": ".rec_postprocess",
+    "CANLabelDecode": ".rec_postprocess",
+    "LaTeXOCRDecode": ".rec_postprocess",
+    "UniMERNetDecode": ".rec_postprocess",
+    "ClsPostProcess": ".cls_postprocess",
+    "PGPostProcess": ".pg_postprocess",
+    "VQASerTokenLayoutLMPostProcess": ".vqa_token_ser_layoutlm_postprocess",
+    "DistillationSerPostProcess": ".vqa_token_ser_layoutlm_postprocess",
+    "VQAReTokenLayoutLMPostProcess": ".vqa_token_re_layoutlm_postprocess",
+    "DistillationRePostProcess": ".vqa_token_re_layoutlm_postprocess",
+    "TableLabelDecode": ".table_postprocess",
+    "TableMasterLabelDecode": ".table_postprocess",
+    "PicoDetPostProcess": ".picodet_postprocess",
+    "CTPostProcess": ".ct_postprocess",
+    "DRRGPostprocess": ".drrg_postprocess",
+    "PSEPostProcess": ".pse_postprocess",
+}
 
 
-def build_post_process(config, global_config=None):
-    support_dict = [
-        "DBPostProcess",
-        "EASTPostProcess",
-        "SASTPostProcess",
-        "FCEPostProcess",
-        "CTCLabelDecode",
-        "AttnLabelDecode",
-        "ClsPostProcess",
-        "SRNLabelDecode",
-        "PGPostProcess",
-        "DistillationCTCLabelDecode",
-        "TableLabelDecode",
-        "DistillationDBPostProcess",
-        "NRTRLabelDecode",
-        "SARLabelDecode",
-        "SEEDLabelDecode",
-        "VQASerTokenLayoutLMPostProcess",
-        "VQAReTokenLayoutLMPostProcess",
-        "PRENLabelDecode",
-        "DistillationSARLabelDecode",
-        "ViTSTRLabelDecode",
-        "ABINetLabelDecode",
-        "TableMasterLabelDecode",
-        "SPINLabelDecode",
-        "DistillationSerPostProcess",
-        "DistillationRePostProcess",
-        "VLLabelDecode",
-        "PicoDetPostProcess",
-        "CTPostProcess",
-        "RFLLabelDecode",
-        "DRRGPostprocess",
-        "CANLabelDecode",
-        "SATRNLabelDecode",
-        "ParseQLabelDecode",
-        "CPPDLabelDecode",
-        "LaTeXOCRDecode",
-        "UniMERNetDecode",
-    ]
+def _load(name):
+    return getattr(importlib.import_module(_MODULES[name], __name__), name)
+
 
-    if config["name"] == "PSEPostProcess":
-        from .pse_postprocess import PSEPostProcess
+def __getattr__(name):
+    # keeps `from ppocr.postprocess import DBPostProcess` working
+    if name in _MODULES:
+        return _load(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
-        support_dict.append("PSEPostProcess")
+
+def build_post_process(config, global_config=None):
+    support_dict = list(_MODULES)
 
     config = copy.deepcopy(config)
     module_name = config.pop("name")
@@ -117,5 +89,5 @@ def build_post_process(config, global_config=None):
     assert module_name in support_dict, Exception(
         "post process only support {}".format(support_dict)
     )
-    module_class = eval(module_name)(**config)
+    module_class = _load(module_name)(**config)
     return module_class
@@ -21,9 +21,8 @@ from __future__ import print_function
 
 import numpy as np
 import cv2
-import paddle
-from shapely.geometry import Polygon
-import pyclipper
+
+from ppocr.utils.utility import is_paddle_tensor
 
 
 class DBPostProcess(object):
@@ -40,6 +39,7 @@ class DBPostProcess(object):
         use_dilation=False,
         score_mode="fast",
         box_type="quad",
+        batch_min_candidates=100,
         **kwargs,
     ):
         self.thresh = thresh
@@ -49,10 +49,12 @@ class DBPostProcess(object):
         self.min_size = 3
         self.score_mode = score_mode
         self.box_type = box_type
+        self.batch_min_candidates = batch_min_candidates
         assert score_mode in [
             "slow",
             "fast",
-        ], "Score mode must be in [slow, fast] but got: {}".format(score_mode)
+            "batch",
+        ], "Score mode must be in [slow, fast, batch] but got: {}".format(score_mode)
 
         self.dilation_kernel = None if not use_dilation else np.array([[1, 1], [1, 1]])
 
@@ -124,11 +126,16 @@ class DBPostProcess(object):
             contours, _ = outs[0], outs[1]
 
         num_contours = min(len(contours), self.max_candidates)
+        return self.boxes_from_contours(
+            pred, contours[:num_contours], width, height, dest_width, dest_height
+        )
 
+    def boxes_from_contours(
+        self, pred, contours, width, height, dest_width, dest_height
+    ):
         boxes = []
         scores = []
-        for index in range(num_contours):
-            contour = contours[index]
+        for contour in contours:
             points, sside = self.get_mini_boxes(contour)
             if sside < self.min_size:
                 continue
@@ -157,7 +164,137 @@ class DBPostProcess(object):
             scores.append(score)
         return np.array(boxes, dtype="int32"), scores
 
+    def boxes_from_bitmap_batch(self, pred, _bitmap, dest_width, dest_height):
+        """
+        High-throughput version of boxes_from_bitmap used when score_mode is "batch".
+        _bitmap: single map with shape (H, W),
+                whose values are binarized as {0, 1}
+
+        Instead of rasterizing a mask per candidate, every outer contour is
+        scored in one pass over a label map (the mean probability of the
+        pixels of its connected component, which is the "slow" polygon score
+        for components without holes), hole contours are scored one by one as
+        in "slow". The unclip of a rectangle is done in closed form: the
+        offset distance is area * unclip_ratio / perimeter and the rectangle
+        is grown by that distance on every side, so neither shapely,
+        pyclipper nor a second minAreaRect is needed.
+
+        The result follows "slow", not "fast": the box count is that of
+        "slow" (fast scores the min-area rect, background included, and keeps
+        fewer boxes), and corners differ by up to 3-4 pixels from the
+        pyclipper result, measured with tools/infer/benchmark_db_postprocess.py.
+        The label map costs a pass over the whole map, so with fewer than
+        batch_min_candidates outer contours (sparse pages, the break-even is
+        about 100 on a 960x960 map) the candidates are scored one by one as
+        in "slow". Use the mode for dense pages with hundreds of text lines,
+        where it is about 1.5x faster than "slow".
+        """
+        bitmap = _bitmap
+        height, width = bitmap.shape
+        bitmap = (bitmap * 255).astype(np.uint8)
+
+        outs = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        contours = outs[-2][: self.max_candidates]
+        if len(contours) == 0:
+            return np.zeros((0, 4, 2), dtype="int32"), []
+        # hole contours run the other way round than outer ones, their
+        # polygon covers the hole and not the component
+        holes = np.array(
+            [cv2.contourArea(contour, oriented=True) > 0 for contour in contours]
+        )
+        if len(contours) - holes.sum() < self.batch_min_candidates:
+            boxes, scores = self.boxes_from_contours(
+                pred, contours, width, height, dest_width, dest_height
+            )
+            return boxes.reshape(-1, 4, 2), scores
+
+        label_num, labels = cv2.connectedComponents(bitmap, connectivity=8)
+        labels = labels.ravel()
+        pixel_num = np.bincount(labels, minlength=label_num)
+        score_sum = np.bincount(labels, weights=pred.ravel(), minlength=label_num)
+        label_scores = score_sum / np.maximum(pixel_num, 1)
+
+        # every contour point lies on a foreground pixel of the component it
+        # belongs to, holes included
+        start_points = np.array([contour[0, 0] for contour in contours])
+        scores = label_scores[
+            labels.reshape(height, width)[start_points[:, 1], start_points[:, 0]]
+        ]
+        for index in np.flatnonzero(holes):
+            scores[index] = self.box_score_slow(pred, contours[index])
+
+        rects = np.array(
+            [
+                (cx, cy, w, h, angle)
+                for (cx, cy), (w, h), angle in map(cv2.minAreaRect, contours)
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 5)
+        cx, cy, w, h, angle = rects.T
+        keep = (np.minimum(w, h) >= self.min_size) & (scores >= self.box_thresh)
+
+        perimeter = 2 * (w + h)
+        distance = w * h * self.unclip_ratio / np.maximum(perimeter, 1e-6)
+        w = w + 2 * distance
+        h = h + 2 * distance
+        keep &= np.minimum(w, h) >= self.min_size + 2
+        if not keep.any():
+            return np.zeros((0, 4, 2), dtype="int32"), []
+
+        boxes = self.rect_to_box_points(
+            cx[keep], cy[keep], w[keep], h[keep], angle[keep]
+        )
+        boxes[:, :, 0] = np.clip(
+            np.round(boxes[:, :, 0] / width * dest_width), 0, dest_width
+        )
+        boxes[:, :, 1] = np.clip(
+            np.round(boxes[:, :, 1] / height * dest_height), 0, dest_height
+        )
+        return boxes.astype("int32"), scores[keep].tolist()
+
+    @staticmethod
+    def rect_to_box_points(cx, cy, w, h, angle):
+        """
+        Vectorized cv2.boxPoints followed by the corner ordering of get_mini_boxes.
+        All arguments are arrays of shape (N,), angle in degrees. Returns (N, 4, 2).
+        """
+        theta = np.deg2rad(angle)
+        b = np.cos(theta) * 0.5
+        a = np.sin(theta) * 0.5
+        pts = np.empty((len(cx), 4, 2), dtype=np.float32)
+        pts[:, 0, 0] = cx - a * h - b * w
+        pts[:, 0, 1] = cy + b * h - a * w
+        pts[:, 1, 0] = cx + a * h - b * w
+        pts[:, 1, 1] = cy - b * h - a * w
+        pts[:, 2, 0] = 2 * cx - pts[:, 0, 0]
+        pts[:, 2, 1] = 2 * cy - pts[:, 0, 1]
+        pts[:, 3, 0] = 2 * cx - pts[:, 1, 0]
+        pts[:, 3, 1] = 2 * cy - pts[:, 1, 1]
+
+        order = np.argsort(pts[:, :, 0], axis=1, kind="stable")
+        pts = np.take_along_axis(pts, order[:, :, None], axis=1)
+        left_swap = pts[:, 1, 1] <= pts[:, 0, 1]
+        right_swap = pts[:, 3, 1] <= pts[:, 2, 1]
+        rows = np.arange(len(pts))
+        index_1 = np.where(left_swap, 1, 0)
+        index_4 = 1 - index_1
+        index_2 = np.where(right_swap, 3, 2)
+        index_3 = 5 - index_2
+        return np.stack(
+            [
+                pts[rows, index_1],
+                pts[rows, index_2],
+                pts[rows, index_3],
+                pts[rows, index_4],
+            ],
+            axis=1,
+        )
+
     def unclip(self, box, unclip_ratio):
+        # only the slow box path needs shapely and pyclipper
+        import pyclipper
+        from shapely.geometry import Polygon
+
         poly = Polygon(box)
         distance = poly.area * unclip_ratio / poly.length
         offset = pyclipper.PyclipperOffset()
@@ -226,7 +363,7 @@ class DBPostProcess(object):
 
     def __call__(self, outs_dict, shape_list):
         pred = outs_dict["maps"]
-        if isinstance(pred, paddle.Tensor):
+        if is_paddle_tensor(pred):
             pred = pred.numpy()
         pred = pred[:, 0, :, :]
         segmentation = pred > self.thresh
@@ -245,6 +382,10 @@ class DBPostProcess(object):
                 boxes, scores = self.polygons_from_bitmap(
                     pred[batch_index], mask, src_w, src_h
                 )
+            elif self.box_type == "quad" and self.score_mode == "batch":
+                boxes, scores = self.boxes_from_bitmap_batch(
+                    pred[batch_index], mask, src_w, src_h
+                )
             elif self.box_type == "quad":
                 boxes, scores = self.boxes_from_bitmap(
                     pred[batch_index], mask, src_w, src_h
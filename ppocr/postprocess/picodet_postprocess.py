@@ -13,7 +13,6 @@
 # limitations under the License.
 
 import numpy as np
-from scipy.special import softmax
 
 
 def hard_nms(box_scores, iou_threshold, top_k=-1, candidate_size=200):
@@ -165,6 +164,8 @@ class PicoDetPostProcess(object):
         return ori_shape, input_shape, scale_factor
 
     def __call__(self, ori_img, img, preds):
+        from scipy.special import softmax
+
         scores, raw_boxes = preds["boxes"], preds["boxes_num"]
         batch_size = raw_boxes[0].shape[0]
         reg_max = int(raw_boxes[0].shape[-1] / 4 - 1)
@@ -11,23 +11,42 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import sys
+import importlib
 import os
 import subprocess
+import sys
 
-python_path = sys.executable
 
-ori_path = os.getcwd()
-os.chdir("ppocr/postprocess/pse_postprocess/pse")
-if (
-    subprocess.call("{} setup.py build_ext --inplace".format(python_path), shell=True)
-    != 0
-):
-    raise RuntimeError(
-        "Cannot compile pse: {}, if your system is windows, you need to install all the default components of `desktop development using C++` in visual studio 2019+".format(
-            os.path.dirname(os.path.realpath(__file__))
+def _build():
+    # compiles the extension next to this file, PPOCR_PSE_BUILD=0 disables it,
+    # e.g. where no compiler is installed or the package is read only
+    if os.environ.get("PPOCR_PSE_BUILD", "1") == "0":
+        return False
+    try:
+        returncode = subprocess.call(
+            [sys.executable, "setup.py", "build_ext", "--inplace"],
+            cwd=os.path.dirname(os.path.realpath(__file__)),
         )
-    )
-os.chdir(ori_path)
+    except OSError:
+        return False
+    importlib.invalidate_caches()
+    return returncode == 0
+
 
-from .pse import pse
+try:
+    # built before, e.g. by a wheel or an earlier run
+    from .pse import pse
+except ImportError:
+    if _build():
+        from .pse import pse
+    else:
+        from ppocr.utils.logging import get_logger
+
+        from .pse_fallback import pse
+
+        get_logger().warning(
+            "Cannot compile pse: {}, the slower numpy implementation is used. "
+            "If your system is windows, you need to install all the default "
+            "components of `desktop development using C++` in visual studio "
+            "2019+".format(os.path.dirname(os.path.realpath(__file__)))
+        )
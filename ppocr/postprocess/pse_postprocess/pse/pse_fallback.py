@@ -0,0 +1,56 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+numpy implementation of the progressive scale expansion of pse.pyx, used
+where the extension cannot be compiled.
+"""
+import cv2
+import numpy as np
+
+__all__ = ["pse"]
+
+_CROSS = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
+
+def pse(kernels, min_area):
+    """
+    Grows the instances of the smallest kernel through the larger kernels one
+    pixel ring at a time. Unlike the queue of pse.pyx, a pixel that two
+    instances reach in the same step goes to the larger label.
+    args:
+        kernels(np.ndarray): uint8 kernels of shape (kernel_num, h, w), the
+            largest kernel first
+        min_area(float): instances of the smallest kernel with fewer pixels
+            are dropped
+    return:
+        int32 label map of shape (h, w)
+    """
+    kernel_num = kernels.shape[0]
+    label_num, label = cv2.connectedComponents(kernels[-1], connectivity=4)
+    small = np.bincount(label.ravel(), minlength=label_num) < min_area
+    small[0] = True
+    # cv2.dilate takes no int32, labels are exact in float32 up to 2 ** 24
+    pred = np.where(small[label], 0, label).astype(np.float32)
+
+    for kernel_idx in range(kernel_num - 2, -1, -1):
+        free = (kernels[kernel_idx] > 0) & (pred == 0)
+        while True:
+            # the largest label among the 4 neighbours of every pixel
+            grown = cv2.dilate(pred, _CROSS)
+            reached = free & (grown > 0)
+            if not reached.any():
+                break
+            pred[reached] = grown[reached]
+            free &= ~reached
+    return pred.astype(np.int32)
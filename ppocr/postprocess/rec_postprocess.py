@@ -14,11 +14,11 @@
 
 import os
 import numpy as np
-import paddle
-from paddle.nn import functional as F
 import re
 import json
 
+from ppocr.utils.utility import is_paddle_tensor
+
 
 class BaseRecLabelDecode(object):
     """Convert between text-label and text-index"""
@@ -197,6 +197,71 @@ class BaseRecLabelDecode(object):
     def get_ignored_tokens(self):
         return [0]  # for ctc blank
 
+    def get_character_array(self):
+        """Lookup table from text index to character, rebuilt if self.character changed."""
+        char_array = getattr(self, "_character_array", None)
+        if char_array is None or len(char_array) != len(self.character):
+            char_array = np.empty(len(self.character), dtype=object)
+            char_array[:] = self.character
+            self._character_array = char_array
+        return char_array
+
+    def decode_batch(
+        self,
+        text_index,
+        text_prob=None,
+        is_remove_duplicate=False,
+        return_word_box=False,
+    ):
+        """
+        Batch-vectorized version of decode for a [B, T] index array.
+
+        Duplicate collapse, ignored token removal, the character lookup and the
+        confidence average are done for the whole batch at once, only the final
+        string join runs per sample. The output has the same format as decode;
+        confidences are averaged in float64, so they can differ from decode in the
+        last float32 ulp.
+        """
+        text_index = np.asarray(text_index)
+        batch_size, seq_len = text_index.shape
+        selection = np.ones(text_index.shape, dtype=bool)
+        if is_remove_duplicate:
+            selection[:, 1:] = text_index[:, 1:] != text_index[:, :-1]
+        selection &= np.isin(text_index, self.get_ignored_tokens(), invert=True)
+
+        char_num = selection.sum(axis=1)
+        chars = self.get_character_array()[text_index[selection]]
+        offsets = np.concatenate([[0], np.cumsum(char_num)])
+
+        if text_prob is not None:
+            prob_sum = np.where(selection, text_prob, 0).sum(axis=1, dtype=np.float64)
+            conf = (prob_sum / np.maximum(char_num, 1)).astype(np.float32)
+            conf[char_num == 0] = 0
+        else:
+            conf = np.ones(batch_size, dtype=np.float32)
+        conf = conf.tolist()
+
+        result_list = []
+        for batch_idx in range(batch_size):
+            text = "".join(chars[offsets[batch_idx] : offsets[batch_idx + 1]])
+            if self.reverse:  # for arabic rec
+                text = self.pred_reverse(text)
+
+            if return_word_box:
+                word_list, word_col_list, state_list = self.get_word_info(
+                    text, selection[batch_idx]
+                )
+                result_list.append(
+                    (
+                        text,
+                        conf[batch_idx],
+                        [seq_len, word_list, word_col_list, state_list],
+                    )
+                )
+            else:
+                result_list.append((text, conf[batch_idx]))
+        return result_list
+
 
 class CTCLabelDecode(BaseRecLabelDecode):
     """Convert between text-label and text-index"""
@@ -207,11 +272,11 @@ class CTCLabelDecode(BaseRecLabelDecode):
     def __call__(self, preds, label=None, return_word_box=False, *args, **kwargs):
         if isinstance(preds, tuple) or isinstance(preds, list):
             preds = preds[-1]
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds.numpy()
         preds_idx = preds.argmax(axis=2)
         preds_prob = preds.max(axis=2)
-        text = self.decode(
+        text = self.decode_batch(
             preds_idx,
             preds_prob,
             is_remove_duplicate=True,
@@ -321,7 +386,7 @@ class AttnLabelDecode(BaseRecLabelDecode):
             label = self.decode(label, is_remove_duplicate=False)
             return text, label
         """
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds.numpy()
 
         preds_idx = preds.argmax(axis=2)
@@ -394,7 +459,7 @@ class RFLLabelDecode(BaseRecLabelDecode):
         # if seq_outputs is not None:
         if isinstance(preds, tuple) or isinstance(preds, list):
             cnt_outputs, seq_outputs = preds
-            if isinstance(seq_outputs, paddle.Tensor):
+            if is_paddle_tensor(seq_outputs):
                 seq_outputs = seq_outputs.numpy()
             preds_idx = seq_outputs.argmax(axis=2)
             preds_prob = seq_outputs.max(axis=2)
@@ -407,7 +472,7 @@ class RFLLabelDecode(BaseRecLabelDecode):
 
         else:
             cnt_outputs = preds
-            if isinstance(cnt_outputs, paddle.Tensor):
+            if is_paddle_tensor(cnt_outputs):
                 cnt_outputs = cnt_outputs.numpy()
             cnt_length = []
             for lens in cnt_outputs:
@@ -497,7 +562,7 @@ class SEEDLabelDecode(BaseRecLabelDecode):
             return text, label
         """
         preds_idx = preds["rec_pred"]
-        if isinstance(preds_idx, paddle.Tensor):
+        if is_paddle_tensor(preds_idx):
             preds_idx = preds_idx.numpy()
         if "rec_pred_scores" in preds:
             preds_idx = preds["rec_pred"]
@@ -522,7 +587,7 @@ class SRNLabelDecode(BaseRecLabelDecode):
     def __call__(self, preds, label=None, *args, **kwargs):
         pred = preds["predict"]
         char_num = len(self.character_str) + 2
-        if isinstance(pred, paddle.Tensor):
+        if is_paddle_tensor(pred):
             pred = pred.numpy()
         pred = np.reshape(pred, [-1, char_num])
 
@@ -609,7 +674,7 @@ class ParseQLabelDecode(BaseRecLabelDecode):
         char_num = (
             len(self.character_str) + 1
         )  # We don't predict <bos> nor <pad>, with only addition <eos>
-        if isinstance(pred, paddle.Tensor):
+        if is_paddle_tensor(pred):
             pred = pred.numpy()
         B, L = pred.shape[:2]
         pred = np.reshape(pred, [-1, char_num])
@@ -740,7 +805,7 @@ class SARLabelDecode(BaseRecLabelDecode):
         return result_list
 
     def __call__(self, preds, label=None, *args, **kwargs):
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds.numpy()
         preds_idx = preds.argmax(axis=2)
         preds_prob = preds.max(axis=2)
@@ -815,7 +880,7 @@ class SATRNLabelDecode(BaseRecLabelDecode):
         return result_list
 
     def __call__(self, preds, label=None, *args, **kwargs):
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds.numpy()
         preds_idx = preds.argmax(axis=2)
         preds_prob = preds.max(axis=2)
@@ -914,7 +979,7 @@ class PRENLabelDecode(BaseRecLabelDecode):
         return result_list
 
     def __call__(self, preds, label=None, *args, **kwargs):
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds.numpy()
         preds_idx = preds.argmax(axis=2)
         preds_prob = preds.max(axis=2)
@@ -935,9 +1000,9 @@ class NRTRLabelDecode(BaseRecLabelDecode):
         if len(preds) == 2:
             preds_id = preds[0]
             preds_prob = preds[1]
-            if isinstance(preds_id, paddle.Tensor):
+            if is_paddle_tensor(preds_id):
                 preds_id = preds_id.numpy()
-            if isinstance(preds_prob, paddle.Tensor):
+            if is_paddle_tensor(preds_prob):
                 preds_prob = preds_prob.numpy()
             if preds_id[0][0] == 2:
                 preds_idx = preds_id[:, 1:]
@@ -949,7 +1014,7 @@ class NRTRLabelDecode(BaseRecLabelDecode):
                 return text
             label = self.decode(label[:, 1:])
         else:
-            if isinstance(preds, paddle.Tensor):
+            if is_paddle_tensor(preds):
                 preds = preds.numpy()
             preds_idx = preds.argmax(axis=2)
             preds_prob = preds.max(axis=2)
@@ -994,7 +1059,7 @@ class ViTSTRLabelDecode(NRTRLabelDecode):
         super(ViTSTRLabelDecode, self).__init__(character_dict_path, use_space_char)
 
     def __call__(self, preds, label=None, *args, **kwargs):
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds[:, 1:].numpy()
         else:
             preds = preds[:, 1:]
@@ -1020,7 +1085,7 @@ class ABINetLabelDecode(NRTRLabelDecode):
     def __call__(self, preds, label=None, *args, **kwargs):
         if isinstance(preds, dict):
             preds = preds["align"][-1].numpy()
-        elif isinstance(preds, paddle.Tensor):
+        elif is_paddle_tensor(preds):
             preds = preds.numpy()
         else:
             preds = preds
@@ -1088,13 +1153,16 @@ class VLLabelDecode(BaseRecLabelDecode):
         return result_list
 
     def __call__(self, preds, label=None, length=None, *args, **kwargs):
+        import paddle
+        from paddle.nn import functional as F
+
         if len(preds) == 2:  # eval mode
             text_pre, x = preds
             b = text_pre.shape[1]
             lenText = self.max_text_length
             nsteps = self.max_text_length
 
-            if not isinstance(text_pre, paddle.Tensor):
+            if not is_paddle_tensor(text_pre):
                 text_pre = paddle.to_tensor(text_pre, dtype="float32")
 
             out_res = paddle.zeros(shape=[lenText, b, self.nclass], dtype=x.dtype)
@@ -1128,7 +1196,7 @@ class VLLabelDecode(BaseRecLabelDecode):
             length = length
             net_out = paddle.concat([t[:l] for t, l in zip(net_out, length)])
         text = []
-        if not isinstance(net_out, paddle.Tensor):
+        if not is_paddle_tensor(net_out):
             net_out = paddle.to_tensor(net_out, dtype="float32")
         net_out = F.softmax(net_out, axis=1)
         for i in range(0, length.shape[0]):
@@ -1203,7 +1271,7 @@ class CPPDLabelDecode(NRTRLabelDecode):
                 preds = preds[-1]["align"][-1].numpy()
             else:
                 preds = preds[-1].numpy()
-        if isinstance(preds, paddle.Tensor):
+        if is_paddle_tensor(preds):
             preds = preds.numpy()
         else:
             preds = preds
@@ -13,7 +13,8 @@
 # limitations under the License.
 
 import numpy as np
-import paddle
+
+from ppocr.utils.utility import is_paddle_tensor
 
 from .rec_postprocess import AttnLabelDecode
 
@@ -45,9 +46,9 @@ class TableLabelDecode(AttnLabelDecode):
     def __call__(self, preds, batch=None):
         structure_probs = preds["structure_probs"]
         bbox_preds = preds["loc_preds"]
-        if isinstance(structure_probs, paddle.Tensor):
+        if is_paddle_tensor(structure_probs):
             structure_probs = structure_probs.numpy()
-        if isinstance(bbox_preds, paddle.Tensor):
+        if is_paddle_tensor(bbox_preds):
             bbox_preds = bbox_preds.numpy()
         shape_list = batch[-1]
         result = self.decode(structure_probs, bbox_preds, shape_list)
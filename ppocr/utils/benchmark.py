@@ -0,0 +1,236 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Latency and memory recording of the --benchmark mode.
+
+StageTimer keeps every latency of every stage so that percentiles can be
+reported instead of averages, PeakMemorySampler samples the resident memory
+of the process while a block runs. tools/infer/benchmark_suite.py drives the
+predictors with them.
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+
+__all__ = [
+    "StageTimer",
+    "PeakMemorySampler",
+    "latency_stats",
+    "current_rss_mb",
+    "peak_rss_mb",
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+def latency_stats(values):
+    """
+    args:
+        values(list): latencies in seconds
+    return:
+        dict with count, mean, p50, p95, p99 and max in milliseconds
+    """
+    if len(values) == 0:
+        return {"count": 0}
+    values_ms = np.asarray(values, dtype=np.float64) * 1000
+    stats = {"count": len(values), "mean": float(values_ms.mean())}
+    for q, value in zip(PERCENTILES, np.percentile(values_ms, PERCENTILES)):
+        stats["p{}".format(q)] = float(value)
+    stats["max"] = float(values_ms.max())
+    return stats
+
+
+def current_rss_mb():
+    # resident set size, None where /proc or the resource module (windows) is
+    # not available
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import resource
+    except (OSError, ValueError, IndexError, ImportError):
+        return None
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on linux and in bytes on macos, the resource
+    # module does not exist on windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer(object):
+    """
+    Records the latency of the stages of every run. start() opens a run,
+    every stamp() closes the current stage and opens the next one of stages
+    and end() closes the run. Runs of different threads are kept apart.
+    args:
+        name(str): name in the report
+        stages(list): names of the stages in the order they are stamped
+        warmup(int): number of first runs that are not recorded
+    """
+
+    def __init__(
+        self, name, stages=("preprocess", "inference", "postprocess"), warmup=0
+    ):
+        self.name = name
+        self.stages = list(stages)
+        self.warmup = warmup
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._runs = 0
+        self.reset()
+
+    def reset(self):
+        """Drop the recorded runs, a warmup that is over is not repeated."""
+        with self._lock:
+            self.times = {stage: [] for stage in self.stages}
+            self.totals = []
+            self.items = 0
+
+    def start(self, elapsed=0.0):
+        """
+        args:
+            elapsed(float): seconds of the first stage that ran before, e.g.
+                preprocessing done ahead for a batch
+        """
+        now = time.perf_counter() - elapsed
+        self._local.run = {"start": now, "last": now, "stage": 0, "times": {}}
+
+    def stamp(self):
+        run = getattr(self._local, "run", None)
+        if run is None:
+            return
+        now = time.perf_counter()
+        if run["stage"] < len(self.stages):
+            stage = self.stages[run["stage"]]
+            run["times"][stage] = run["times"].get(stage, 0.0) + now - run["last"]
+        run["stage"] += 1
+        run["last"] = now
+
+    def end(self, stamp=False, items=1):
+        """
+        args:
+            stamp(bool): close the current stage first
+            items(int): number of images or crops the run processed
+        """
+        if stamp:
+            self.stamp()
+        run = getattr(self._local, "run", None)
+        if run is None:
+            return
+        self._local.run = None
+        total = time.perf_counter() - run["start"]
+        with self._lock:
+            self._runs += 1
+            if self._runs <= self.warmup:
+                return
+            for stage, seconds in run["times"].items():
+                self.times[stage].append(seconds)
+            self.totals.append(total)
+            self.items += items
+
+    def add(self, stage, seconds):
+        """Record a stage that is timed by the caller."""
+        with self._lock:
+            self.times.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        with self._lock:
+            busy = sum(self.totals)
+            return {
+                "name": self.name,
+                "runs": len(self.totals),
+                "items": self.items,
+                "items_per_second": self.items / busy if busy > 0 else 0.0,
+                "total": latency_stats(self.totals),
+                "stages": {
+                    stage: latency_stats(values)
+                    for stage, values in self.times.items()
+                    if values
+                },
+            }
+
+    def report(self, logger):
+        summary = self.summary()
+        logger.info(
+            "----------------------- {} benchmark -----------------------".format(
+                self.name
+            )
+        )
+        logger.info(
+            "runs: {}, items: {}, throughput: {:.2f} items/s".format(
+                summary["runs"], summary["items"], summary["items_per_second"]
+            )
+        )
+        for stage, stats in [("total", summary["total"])] + list(
+            summary["stages"].items()
+        ):
+            if stats["count"] == 0:
+                continue
+            logger.info(
+                "{}: mean {:.2f} ms, p50 {:.2f} ms, p95 {:.2f} ms, "
+                "p99 {:.2f} ms".format(
+                    stage, stats["mean"], stats["p50"], stats["p95"], stats["p99"]
+                )
+            )
+        peak_mb = peak_rss_mb()
+        if peak_mb is not None:
+            logger.info("peak rss: {:.1f} MB".format(peak_mb))
+
+
+class PeakMemorySampler(object):
+    """
+    Samples the resident memory on a background thread while the block runs,
+    unlike ru_maxrss the peak belongs to this block only.
+    args:
+        interval(float): seconds between samples
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_mb = None
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self):
+        self.start_mb = current_rss_mb()
+        if self.start_mb is None:
+            return self
+        self.peak_mb = self.start_mb
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+        else:
+            # without /proc only the peak of the whole process is known
+            self.peak_mb = peak_rss_mb()
@@ -20,11 +20,20 @@ import os
 import sys
 import logging
 import functools
-import paddle.distributed as dist
 
 logger_initialized = {}
 
 
+def _get_rank():
+    # a process that has not imported paddle yet runs no collective job, the
+    # launcher still passes the rank of the worker in the environment
+    if "paddle" not in sys.modules:
+        return int(os.environ.get("PADDLE_TRAINER_ID", 0))
+    import paddle.distributed as dist
+
+    return dist.get_rank()
+
+
 @functools.lru_cache()
 def get_logger(name="ppocr", log_file=None, log_level=logging.DEBUG, log_ranks="0"):
     """Initialize and get a logger by name.
@@ -57,7 +66,7 @@ def get_logger(name="ppocr", log_file=None, log_level=logging.DEBUG, log_ranks="
     stream_handler = logging.StreamHandler(stream=sys.stdout)
     stream_handler.setFormatter(formatter)
     logger.addHandler(stream_handler)
-    if log_file is not None and dist.get_rank() == 0:
+    if log_file is not None and _get_rank() == 0:
         log_file_folder = os.path.split(log_file)[0]
         os.makedirs(log_file_folder, exist_ok=True)
         file_handler = logging.FileHandler(log_file, "a")
@@ -69,7 +78,7 @@ def get_logger(name="ppocr", log_file=None, log_level=logging.DEBUG, log_ranks="
     elif isinstance(log_ranks, int):
         log_ranks = [log_ranks]
 
-    if dist.get_rank() in log_ranks:
+    if _get_rank() in log_ranks:
         logger.setLevel(log_level)
     else:
         logger.setLevel(logging.ERROR)
@@ -0,0 +1,217 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Reading order of text boxes.
+
+Boxes are grouped into lines with a single sweep over their vertical centers
+and sorted left to right inside every line, which is O(n log n) instead of the
+quadratic swap pass that sorted_boxes used to run. Skewed pages are deskewed
+with the median angle of the box top edges first, and an optional column mode
+reads multi-column pages column by column.
+
+Only numpy is needed so that the module can be shared by the inference tools,
+ppstructure and the standalone apps.
+"""
+import numpy as np
+
+__all__ = [
+    "to_quads",
+    "estimate_skew_angle",
+    "cluster_lines",
+    "reading_order",
+    "sort_boxes",
+]
+
+
+def to_quads(boxes):
+    """
+    Convert boxes to an array of quadrilaterals with shape (N, 4, 2).
+    args:
+        boxes: quadrilaterals with shape (N, 4, 2), polygons with any number of
+            points, or axis-aligned boxes [x1, y1, x2, y2]
+    return:
+        float64 array with shape (N, 4, 2)
+    """
+    if len(boxes) == 0:
+        return np.zeros((0, 4, 2), dtype=np.float64)
+    try:
+        arr = np.asarray(boxes, dtype=np.float64)
+    except ValueError:
+        arr = None
+    if arr is not None and arr.ndim == 2 and arr.shape[1] == 4:
+        x1, y1, x2, y2 = arr.T
+        corners = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+        return np.stack([np.stack(corner, axis=1) for corner in corners], axis=1)
+    if arr is not None and arr.ndim == 3 and arr.shape[1:] == (4, 2):
+        return arr
+    # polygons with different numbers of points: use their bounding rectangles
+    quads = []
+    for poly in boxes:
+        poly = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+        x1, y1 = poly.min(axis=0)
+        x2, y2 = poly.max(axis=0)
+        quads.append([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+    return np.asarray(quads, dtype=np.float64)
+
+
+def estimate_skew_angle(quads):
+    """
+    Median angle (radians) of the top edges of the boxes that are wider than
+    they are tall. Returns 0 when there is no such box.
+    """
+    if len(quads) == 0:
+        return 0.0
+    top = quads[:, 1] - quads[:, 0]
+    side = quads[:, 3] - quads[:, 0]
+    width = np.hypot(top[:, 0], top[:, 1])
+    height = np.hypot(side[:, 0], side[:, 1])
+    angles = np.arctan2(top[:, 1], top[:, 0])
+    valid = (width > height) & (np.abs(angles) < np.pi / 4)
+    if not valid.any():
+        return 0.0
+    return float(np.median(angles[valid]))
+
+
+def _deskewed_extents(quads, angle):
+    points = quads
+    if abs(angle) > 1e-3:
+        cos, sin = np.cos(-angle), np.sin(-angle)
+        x = points[..., 0] * cos - points[..., 1] * sin
+        y = points[..., 0] * sin + points[..., 1] * cos
+        points = np.stack([x, y], axis=-1)
+    left, top = points.min(axis=1).T
+    right, bottom = points.max(axis=1).T
+    return left, top, right, bottom
+
+
+def cluster_lines(left, top, bottom, y_tolerance=0):
+    """
+    Group boxes into lines and return the reading order of the boxes.
+    args:
+        left, top, bottom: arrays with shape (N,) in deskewed coordinates
+        y_tolerance: boxes whose centers are at most y_tolerance apart are
+            always put on the same line
+    return:
+        (order, line_ids): order is an int array of box indices from top to
+        bottom and left to right, line_ids[k] is the line of box order[k]
+    """
+    num = len(left)
+    if num == 0:
+        return np.zeros((0,), dtype=np.int64), np.zeros((0,), dtype=np.int64)
+    center = (top + bottom) / 2
+    height = bottom - top
+    # limit the reach of unusually tall boxes so that they do not glue
+    # several lines together
+    median_height = max(float(np.median(height)), 1.0)
+    reach = center + 0.5 * np.minimum(height, 1.5 * median_height)
+
+    by_center = np.lexsort((left, center))
+    center = center[by_center]
+    reach = np.maximum.accumulate(reach[by_center])
+    new_line = np.zeros((num,), dtype=bool)
+    new_line[1:] = (center[1:] > reach[:-1]) & (center[1:] - center[:-1] > y_tolerance)
+    line_ids = np.cumsum(new_line)
+
+    order = np.lexsort((left[by_center], line_ids))
+    return by_center[order], line_ids[order]
+
+
+def _find_gutters(left, right, min_gap):
+    """Empty vertical stripes between the x extents of the boxes."""
+    by_left = np.argsort(left, kind="stable")
+    left = left[by_left]
+    reach = np.maximum.accumulate(right[by_left])
+    gap = left[1:] - reach[:-1]
+    index = np.nonzero(gap > min_gap)[0]
+    return [(reach[i], left[i + 1]) for i in index]
+
+
+def _column_order(left, top, right, bottom, y_tolerance, max_span_ratio):
+    page_left, page_right = left.min(), right.max()
+    page_width = max(page_right - page_left, 1.0)
+    median_height = max(float(np.median(bottom - top)), 1.0)
+
+    narrow = (right - left) < max_span_ratio * page_width
+    if narrow.sum() < 2:
+        return cluster_lines(left, top, bottom, y_tolerance)[0]
+    gutters = _find_gutters(left[narrow], right[narrow], median_height)
+    if len(gutters) == 0:
+        return cluster_lines(left, top, bottom, y_tolerance)[0]
+
+    bounds = np.array(
+        [-np.inf] + [(g0 + g1) / 2 for g0, g1 in gutters] + [np.inf],
+        dtype=np.float64,
+    )
+    col_left = np.searchsorted(bounds, left, side="right") - 1
+    col_right = np.searchsorted(bounds, right, side="left") - 1
+    spanning = col_right > col_left
+
+    # boxes that cross a gutter (titles, full-width paragraphs) split the page
+    # into bands that are read one after another, column by column inside
+    span_index = np.nonzero(spanning)[0]
+    span_index = span_index[np.argsort((top + bottom)[span_index], kind="stable")]
+    band_edges = [(top[i] + bottom[i]) / 2 for i in span_index]
+    band = np.searchsorted(np.asarray(band_edges), (top + bottom) / 2, side="left")
+
+    order = []
+    column_index = np.nonzero(~spanning)[0]
+    for band_id in range(len(band_edges) + 1):
+        in_band = column_index[band[column_index] == band_id]
+        for col in range(len(bounds) - 1):
+            index = in_band[col_left[in_band] == col]
+            if len(index) == 0:
+                continue
+            sub_order, _ = cluster_lines(
+                left[index], top[index], bottom[index], y_tolerance
+            )
+            order.extend(index[sub_order].tolist())
+        if band_id < len(span_index):
+            order.append(int(span_index[band_id]))
+    return np.asarray(order, dtype=np.int64)
+
+
+def reading_order(
+    boxes, y_tolerance=0, use_columns=False, deskew=True, max_span_ratio=0.6
+):
+    """
+    Reading order of text boxes.
+    args:
+        boxes: quadrilaterals (N, 4, 2), polygons or [x1, y1, x2, y2] boxes
+        y_tolerance: boxes whose centers differ by at most this many pixels
+            are put on the same line
+        use_columns: read multi-column pages column by column instead of line
+            by line across the whole page
+        deskew: undo the dominant rotation of the boxes before sorting
+        max_span_ratio: in column mode, boxes wider than this fraction of the
+            page are treated as spanning several columns
+    return:
+        int array with the box indices in reading order
+    """
+    quads = to_quads(boxes)
+    if len(quads) <= 1:
+        return np.arange(len(quads), dtype=np.int64)
+    angle = estimate_skew_angle(quads) if deskew else 0.0
+    left, top, right, bottom = _deskewed_extents(quads, angle)
+    if use_columns:
+        return _column_order(left, top, right, bottom, y_tolerance, max_span_ratio)
+    return cluster_lines(left, top, bottom, y_tolerance)[0]
+
+
+def sort_boxes(boxes, **kwargs):
+    """
+    Sort boxes into reading order, see reading_order for the arguments.
+    return:
+        list with the boxes in reading order
+    """
+    return [boxes[i] for i in reading_order(boxes, **kwargs)]
@@ -0,0 +1,33 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Content-addressed cache of inference results.
+
+Results are keyed by a hash of the input bytes and of the parameters that
+change the result, so re-submitting the same image skips decoding and
+inference. Entries are kept pickled in an LRU memory tier and, optionally, in
+a SQLite file that survives restarts; both tiers are bounded by size and
+entries expire after a time to live.
+
+The implementation is mcp_server/paddleocr_mcp/result_cache.py, see
+ppocr.utils.shared_modules.
+"""
+from ppocr.utils.shared_modules import load_shared_module
+
+_result_cache = load_shared_module("result_cache")
+
+ResultCache = _result_cache.ResultCache
+make_cache_key = _result_cache.make_cache_key
+
+__all__ = ["ResultCache", "make_cache_key"]
@@ -0,0 +1,59 @@
+# Copyright (c) 2025 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Modules shared with the MCP server.
+
+The MCP server is released as a package of its own and cannot import ppocr,
+so the standard-library-only helpers that both need live in
+mcp_server/paddleocr_mcp and are loaded from there by file path. Importing
+them as mcp_server.paddleocr_mcp would depend on where the checkout sits on
+sys.path and could pick up an unrelated installed package of that name.
+"""
+import importlib.util
+import os
+import sys
+
+__all__ = ["load_shared_module"]
+
+_SHARED_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "..",
+    "mcp_server",
+    "paddleocr_mcp",
+)
+
+
+def load_shared_module(name):
+    """
+    args:
+        name(str): module name in mcp_server/paddleocr_mcp, e.g. "tracing"
+    return:
+        the module, loaded once per process
+    """
+    module_name = "ppocr.utils._shared_" + name
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    path = os.path.normpath(os.path.join(_SHARED_DIR, name + ".py"))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    # registered before running it so that dataclasses and pickle can find it
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -0,0 +1,144 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Uniform grid index over axis-aligned boxes.
+
+Text lines on a page have similar sizes, so a grid whose cells are about one
+line tall answers "which boxes touch this rectangle" by looking at a handful
+of cells instead of scanning every box, and region -> lines assignment or
+duplicate filtering become near-linear in the number of boxes. Boxes can be
+inserted incrementally, which greedy deduplication needs.
+
+Only numpy is needed so that the module can be shared by ppstructure and the
+standalone apps.
+"""
+import numpy as np
+
+__all__ = ["GridIndex", "boxes_to_rects"]
+
+
+def boxes_to_rects(boxes):
+    """
+    Bounding rectangles [x_min, y_min, x_max, y_max] of quadrilaterals or
+    polygons with shape (N, K, 2), or of rectangles with shape (N, 4).
+    """
+    if len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float64)
+    try:
+        boxes = np.asarray(boxes, dtype=np.float64)
+    except ValueError:
+        # polygons with different numbers of points
+        rects = []
+        for poly in boxes:
+            poly = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+            rects.append(np.concatenate([poly.min(axis=0), poly.max(axis=0)]))
+        return np.asarray(rects, dtype=np.float64)
+    if boxes.ndim == 2:
+        return np.stack(
+            [
+                np.minimum(boxes[:, 0], boxes[:, 2]),
+                np.minimum(boxes[:, 1], boxes[:, 3]),
+                np.maximum(boxes[:, 0], boxes[:, 2]),
+                np.maximum(boxes[:, 1], boxes[:, 3]),
+            ],
+            axis=1,
+        )
+    return np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1)
+
+
+class GridIndex(object):
+    """
+    args:
+        rects: optional initial rectangles [x_min, y_min, x_max, y_max], their
+            ids are 0..len(rects)-1
+        cell_size(float): grid cell size, defaults to twice the median height
+            of the initial rectangles
+        max_cells_per_rect(int): rectangles that would cover more cells than
+            this (e.g. a whole-page region) are kept in a separate list that
+            every query checks
+    """
+
+    def __init__(self, rects=None, cell_size=None, max_cells_per_rect=64):
+        rects = (
+            np.zeros((0, 4), dtype=np.float64)
+            if rects is None
+            else np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+        )
+        if cell_size is None:
+            heights = rects[:, 3] - rects[:, 1] if len(rects) else np.zeros(0)
+            heights = heights[heights > 0]
+            cell_size = 2 * float(np.median(heights)) if len(heights) else 32.0
+        self.cell_size = max(float(cell_size), 1.0)
+        self.max_cells_per_rect = max_cells_per_rect
+        self.cells = {}
+        self.large_ids = []
+        self.ids = []
+        self.rects = []
+        for i, rect in enumerate(rects):
+            self.insert(i, rect)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell_range(self, rect):
+        x0, y0, x1, y1 = rect
+        size = self.cell_size
+        return (
+            int(np.floor(x0 / size)),
+            int(np.floor(y0 / size)),
+            int(np.floor(x1 / size)),
+            int(np.floor(y1 / size)),
+        )
+
+    def insert(self, item_id, rect):
+        """Add a rectangle [x_min, y_min, x_max, y_max] under item_id."""
+        rect = [float(v) for v in rect]
+        pos = len(self.ids)
+        self.ids.append(item_id)
+        self.rects.append(rect)
+        gx0, gy0, gx1, gy1 = self._cell_range(rect)
+        if (gx1 - gx0 + 1) * (gy1 - gy0 + 1) > self.max_cells_per_rect:
+            self.large_ids.append(pos)
+            return
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                self.cells.setdefault((gx, gy), []).append(pos)
+
+    def query(self, rect):
+        """
+        Ids of the rectangles that intersect rect (touching edges count), in
+        insertion order.
+        """
+        if not self.ids:
+            return []
+        x0, y0, x1, y1 = [float(v) for v in rect]
+        gx0, gy0, gx1, gy1 = self._cell_range((x0, y0, x1, y1))
+        candidates = set(self.large_ids)
+        if (gx1 - gx0 + 1) * (gy1 - gy0 + 1) > len(self.cells):
+            # the query covers more grid cells than are occupied
+            for (gx, gy), positions in self.cells.items():
+                if gx0 <= gx <= gx1 and gy0 <= gy <= gy1:
+                    candidates.update(positions)
+        else:
+            for gx in range(gx0, gx1 + 1):
+                for gy in range(gy0, gy1 + 1):
+                    positions = self.cells.get((gx, gy))
+                    if positions:
+                        candidates.update(positions)
+        result = []
+        for pos in sorted(candidates):
+            r = self.rects[pos]
+            if r[0] <= x1 and r[2] >= x0 and r[1] <= y1 and r[3] >= y0:
+                result.append(self.ids[pos])
+        return result
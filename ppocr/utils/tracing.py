@@ -0,0 +1,118 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tracing spans and an in-process metrics registry for the inference pipelines.
+
+    with span("ocr.page", shape=img.shape) as page:
+        ...
+        page.set(box_num=len(dt_boxes))
+
+Spans nest per thread (and per asyncio task) through a context variable, so a
+predictor call made inside a page span becomes its child. Every finished span
+is observed by the ppocr_span_seconds histogram of the registry, its count
+attributes (integers named *_num or *_size, e.g. box_num and batch_size) are
+summed into ppocr_span_items_total, and it is passed on to the exporters,
+e.g. JsonLinesExporter for --trace_file. The registry is exported in the
+Prometheus text format by start_metrics_server (--metrics_port) or as a dict
+by snapshot().
+
+The implementation is mcp_server/paddleocr_mcp/tracing.py, see
+ppocr.utils.shared_modules; this module sets up its registry with the ppocr
+metric names and adds configure_tracing for the command line arguments.
+"""
+import os
+import threading
+
+from ppocr.utils.shared_modules import load_shared_module
+
+__all__ = [
+    "Span",
+    "span",
+    "record_span",
+    "current_span",
+    "MetricsRegistry",
+    "JsonLinesExporter",
+    "get_registry",
+    "add_exporter",
+    "remove_exporter",
+    "start_metrics_server",
+    "configure_tracing",
+]
+
+_tracing = load_shared_module("tracing")
+
+Span = _tracing.Span
+span = _tracing.span
+record_span = _tracing.record_span
+current_span = _tracing.current_span
+MetricsRegistry = _tracing.MetricsRegistry
+JsonLinesExporter = _tracing.JsonLinesExporter
+get_registry = _tracing.get_registry
+add_exporter = _tracing.add_exporter
+remove_exporter = _tracing.remove_exporter
+start_metrics_server = _tracing.start_metrics_server
+
+# seconds, from a small crop to a large page on cpu
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_tracing.set_registry(MetricsRegistry(prefix="ppocr", span_buckets=DEFAULT_BUCKETS))
+
+_configure_lock = threading.Lock()
+_configured = set()
+
+
+def _logger():
+    # imported on use, the module itself only needs the standard library so
+    # that the apps can read the registry without loading paddle
+    from ppocr.utils.logging import get_logger
+
+    return get_logger()
+
+
+def configure_tracing(args):
+    """
+    Set up the exporters requested by --trace_file and --metrics_port, every
+    file and port is set up once per process however many systems are built.
+    """
+    trace_file = getattr(args, "trace_file", None)
+    metrics_port = getattr(args, "metrics_port", 0)
+    if trace_file:
+        key = ("trace_file", os.path.abspath(trace_file))
+        with _configure_lock:
+            if key not in _configured:
+                _configured.add(key)
+                add_exporter(JsonLinesExporter(trace_file))
+    if metrics_port:
+        try:
+            start_metrics_server(metrics_port)
+        except OSError as e:
+            # e.g. the workers of --use_mp, the first one serves its metrics
+            _logger().warning(
+                "metrics port {} is not available: {}".format(metrics_port, e)
+            )
@@ -17,10 +17,12 @@ import os
 import cv2
 import random
 import numpy as np
-import paddle
 import importlib.util
 import sys
 import subprocess
+import queue
+import threading
+import time
 
 
 def print_dict(d, logger, delimiter=0):
@@ -132,26 +134,115 @@ def check_and_read(img_path):
         from paddle.utils import try_import
 
         fitz = try_import("fitz")
-        from PIL import Image
 
         imgs = []
         with fitz.open(img_path) as pdf:
             for pg in range(0, pdf.page_count):
-                page = pdf[pg]
-                mat = fitz.Matrix(2, 2)
-                pm = page.get_pixmap(matrix=mat, alpha=False)
-
-                # if width or height > 2000 pixels, don't enlarge the image
-                if pm.width > 2000 or pm.height > 2000:
-                    pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
-
-                img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-                img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                imgs.append(img)
+                imgs.append(_render_pdf_page(fitz, pdf[pg]))
             return imgs, False, True
     return None, False, False
 
 
+def _render_pdf_page(fitz, page):
+    from PIL import Image
+
+    mat = fitz.Matrix(2, 2)
+    pm = page.get_pixmap(matrix=mat, alpha=False)
+
+    # if width or height > 2000 pixels, don't enlarge the image
+    if pm.width > 2000 or pm.height > 2000:
+        pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
+
+    img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
+    img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    return img
+
+
+class PdfPageSource(object):
+    """
+    Lazily rasterize the pages of a pdf file.
+
+    Unlike check_and_read, which renders every page into a list up front,
+    pages are rendered on a background thread and handed over through a
+    bounded queue, so at most prefetch_num + 1 page bitmaps are alive at a
+    time and rendering overlaps with whatever the consumer does per page.
+    Set prefetch_num to 0 to render synchronously in the calling thread.
+
+    args:
+        pdf_path(str): path of the pdf file
+        page_num(int): number of leading pages to read, 0 means all pages
+        prefetch_num(int): maximum number of rendered pages waiting in the queue
+    """
+
+    _END = object()
+
+    def __init__(self, pdf_path, page_num=0, prefetch_num=2):
+        from paddle.utils import try_import
+
+        self._fitz = try_import("fitz")
+        self.pdf_path = pdf_path
+        self.prefetch_num = max(0, int(prefetch_num))
+        with self._fitz.open(pdf_path) as pdf:
+            page_count = pdf.page_count
+        if page_num > page_count or page_num <= 0:
+            page_num = page_count
+        self.page_num = page_num
+        self.render_times = []
+
+    def __len__(self):
+        return self.page_num
+
+    def _render(self, pdf, pg):
+        st = time.time()
+        img = _render_pdf_page(self._fitz, pdf[pg])
+        self.render_times.append(time.time() - st)
+        return img
+
+    def __iter__(self):
+        if self.prefetch_num == 0:
+            with self._fitz.open(self.pdf_path) as pdf:
+                for pg in range(self.page_num):
+                    yield self._render(pdf, pg)
+            return
+
+        page_queue = queue.Queue(maxsize=self.prefetch_num)
+        stop_event = threading.Event()
+
+        def _put(item):
+            while not stop_event.is_set():
+                try:
+                    page_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _worker():
+            try:
+                with self._fitz.open(self.pdf_path) as pdf:
+                    for pg in range(self.page_num):
+                        if not _put(self._render(pdf, pg)):
+                            return
+            except Exception as e:
+                _put(e)
+            _put(self._END)
+
+        worker = threading.Thread(target=_worker, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = page_queue.get()
+                if item is self._END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # unblock the worker if the consumer stopped early
+            stop_event.set()
+            worker.join()
+
+
 def load_vqa_bio_label_maps(label_map_path):
     with open(label_map_path, "r", encoding="utf-8") as fin:
         lines = fin.readlines()
@@ -171,7 +262,16 @@ def load_vqa_bio_label_maps(label_map_path):
     return label2id_map, id2label_map
 
 
+def is_paddle_tensor(obj):
+    # whoever made a paddle tensor has imported paddle already, so inference
+    # on numpy outputs never needs to import it for this check
+    paddle = sys.modules.get("paddle")
+    return paddle is not None and isinstance(obj, paddle.Tensor)
+
+
 def set_seed(seed=1024):
+    import paddle
+
     random.seed(seed)
     np.random.seed(seed)
     paddle.seed(seed)
@@ -0,0 +1,96 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time and peak RSS of a structure run over all pages of the inputs, e.g.
+
+    python3 ppstructure/benchmark_structure.py --image_dir=./docs/scan.pdf \
+        --layout_model_dir=... --table_model_dir=... --det_model_dir=... \
+        --rec_model_dir=... --debug_readonly_images=true
+
+Run it once per revision to compare them. With --debug_readonly_images the
+pages are passed as read-only views and a stage that writes into an image it
+does not own fails with "assignment destination is read-only".
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+import resource
+import time
+
+import cv2
+import numpy as np
+
+from ppocr.utils.logging import get_logger
+from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppstructure.predict_system import StructureSystem
+from ppstructure.utility import parse_args
+
+logger = get_logger()
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def iter_pages(image_dir):
+    for image_file in get_image_file_list(image_dir):
+        img, flag_gif, flag_pdf = check_and_read(image_file)
+        if not flag_gif and not flag_pdf:
+            img = cv2.imread(image_file)
+        if img is None:
+            logger.error("error in loading image:{}".format(image_file))
+            continue
+        for page in img if flag_pdf else [img]:
+            yield image_file, page
+
+
+def main(args):
+    structure_sys = StructureSystem(args)
+    rss_before = peak_rss_mb()
+    page_times = []
+    for image_file, page in iter_pages(args.image_dir):
+        st = time.time()
+        structure_sys(page, img_idx=len(page_times))
+        page_times.append(time.time() - st)
+        logger.debug(
+            "{} page {}: {:.3f}s".format(image_file, len(page_times), page_times[-1])
+        )
+    if not page_times:
+        logger.error("no pages found in {}".format(args.image_dir))
+        return
+    # the first page includes the predictor warmup
+    steady = page_times[1:] or page_times
+    logger.info(
+        "{} pages in {:.3f}s, {:.3f}s/page (after the first page: {:.3f}s/page)".format(
+            len(page_times),
+            sum(page_times),
+            float(np.mean(page_times)),
+            float(np.mean(steady)),
+        )
+    )
+    logger.info(
+        "peak RSS: {:.1f} MB after loading the models, {:.1f} MB after the run".format(
+            rss_before, peak_rss_mb()
+        )
+    )
+
+
+if __name__ == "__main__":
+    main(parse_args())
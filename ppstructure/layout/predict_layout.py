@@ -27,7 +27,9 @@ import time
 import tools.infer.utility as utility
 from ppocr.data import create_operators, transform
 from ppocr.postprocess import build_post_process
+from ppocr.utils.benchmark import StageTimer
 from ppocr.utils.logging import get_logger
+from ppocr.utils.tracing import span, record_span
 from ppocr.utils.utility import get_image_file_list, check_and_read
 from ppstructure.utility import parse_args
 from picodet_postprocess import PicoDetPostProcess
@@ -66,9 +68,21 @@ class LayoutPredictor(object):
             self.config,
         ) = utility.create_predictor(args, "layout", logger)
         self.use_onnx = args.use_onnx
+        self.benchmark = args.benchmark
+        if args.benchmark:
+            self.stage_timer = StageTimer("layout")
 
     def __call__(self, img):
-        ori_im = img.copy()
+        with span("layout.predict", shape=img.shape) as layout_span:
+            post_preds, elapse = self._predict(img)
+            layout_span.set(region_num=len(post_preds or []))
+        return post_preds, elapse
+
+    def _predict(self, img):
+        # the postprocess only reads the shape of the original image
+        ori_im = img
+        if self.benchmark:
+            self.stage_timer.start()
         data = {"image": img}
         data = transform(data, self.preprocess_op)
         img = data[0]
@@ -77,10 +91,13 @@ class LayoutPredictor(object):
             return None, 0
 
         img = np.expand_dims(img, axis=0)
-        img = img.copy()
+        img = np.ascontiguousarray(img)
+        if self.benchmark:
+            self.stage_timer.stamp()
 
         preds, elapse = 0, 1
         starttime = time.time()
+        infer_st = time.perf_counter()
 
         np_score_list, np_boxes_list = [], []
         if self.use_onnx:
@@ -108,9 +125,19 @@ class LayoutPredictor(object):
                     ).copy_to_cpu()
                 )
         preds = dict(boxes=np_score_list, boxes_num=np_boxes_list)
+        record_span(
+            "layout.infer",
+            time.perf_counter() - infer_st,
+            shape=img.shape,
+            batch_size=1,
+        )
+        if self.benchmark:
+            self.stage_timer.stamp()
 
         post_preds = self.postprocess_op(ori_im, img, preds)
         elapse = time.time() - starttime
+        if self.benchmark:
+            self.stage_timer.end(stamp=True)
         return post_preds, elapse
 
 
@@ -14,7 +14,6 @@
 
 import os
 import sys
-import subprocess
 
 __dir__ = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(__dir__)
@@ -28,12 +27,15 @@ import time
 import logging
 from copy import deepcopy
 
-from paddle.utils import try_import
 from ppocr.utils.utility import get_image_file_list, check_and_read
 from ppocr.utils.logging import get_logger
+from ppocr.utils.spatial_index import GridIndex, boxes_to_rects
+from ppocr.utils.tracing import span, configure_tracing
 from ppocr.utils.visual import draw_ser_results, draw_re_results
 from tools.infer.predict_system import TextSystem
 from tools.infer.predict_rec import TextRecognizer
+from tools.infer.batch_runner import run_batch
+from tools.infer.utility import readonly_view
 from ppstructure.layout.predict_layout import LayoutPredictor
 from ppstructure.table.predict_table import TableSystem, to_excel
 from ppstructure.utility import parse_args, draw_structure_result, cal_ocr_word_box
@@ -45,6 +47,7 @@ class StructureSystem(object):
     def __init__(self, args):
         self.mode = args.mode
         self.recovery = args.recovery
+        configure_tracing(args)
 
         self.image_orientation_predictor = None
         if args.image_orientation:
@@ -94,8 +97,17 @@ class StructureSystem(object):
             self.kie_predictor = SerRePredictor(args)
 
         self.return_word_box = args.return_word_box
+        self.debug_readonly_images = getattr(args, "debug_readonly_images", False)
+        self.table_reuse_page_ocr = getattr(args, "table_reuse_page_ocr", False)
 
     def __call__(self, img, return_ocr_result_in_table=False, img_idx=0):
+        with span("structure.page", shape=img.shape, mode=self.mode) as page_span:
+            res, time_dict = self._predict(img, return_ocr_result_in_table, img_idx)
+            if self.mode == "structure" and res is not None:
+                page_span.set(region_num=len(res))
+        return res, time_dict
+
+    def _predict(self, img, return_ocr_result_in_table, img_idx):
         time_dict = {
             "image_orientation": 0,
             "layout": 0,
@@ -111,8 +123,9 @@ class StructureSystem(object):
 
         if self.image_orientation_predictor is not None:
             tic = time.time()
-            cls_result = self.image_orientation_predictor.predict(input_data=img)
-            cls_res = next(cls_result)
+            with span("structure.orientation"):
+                cls_result = self.image_orientation_predictor.predict(input_data=img)
+                cls_res = next(cls_result)
             angle = cls_res[0]["label_names"][0]
             cv_rotate_code = {
                 "90": cv2.ROTATE_90_COUNTERCLOCKWISE,
@@ -125,7 +138,8 @@ class StructureSystem(object):
             time_dict["image_orientation"] = toc - tic
 
         if self.mode == "structure":
-            ori_im = img.copy()
+            # the regions are views into the page, no stage modifies it
+            ori_im = img = readonly_view(img, self.debug_readonly_images)
             if self.layout_predictor is not None:
                 layout_res, elapse = self.layout_predictor(img)
                 time_dict["layout"] += elapse
@@ -141,8 +155,17 @@ class StructureSystem(object):
             # that first use text_system to detect and recognize all text information
             # and then filter out relevant texts according to the layout regions.
             text_res = None
+            page_ocr = None
+            text_index = None
             if self.text_system is not None:
-                text_res, ocr_time_dict = self._predict_text(img)
+                filter_boxes, filter_rec_res, ocr_time_dict = self.text_system(img)
+                if filter_boxes is None:
+                    filter_boxes, filter_rec_res = [], []
+                text_res = self._format_text_res(filter_boxes, filter_rec_res)
+                page_ocr = (filter_boxes, filter_rec_res)
+                # built once per page, every layout region queries it instead
+                # of scanning all text lines
+                text_index = GridIndex(boxes_to_rects(filter_boxes))
                 time_dict["det"] += ocr_time_dict["det"]
                 time_dict["rec"] += ocr_time_dict["rec"]
 
@@ -158,25 +181,38 @@ class StructureSystem(object):
                     roi_img = ori_im
                 bbox = [x1, y1, x2, y2]
 
-                if region["label"] == "table":
-                    if self.table_system is not None:
-                        res, table_time_dict = self.table_system(
-                            roi_img, return_ocr_result_in_table
-                        )
-                        time_dict["table"] += table_time_dict["table"]
-                        time_dict["table_match"] += table_time_dict["match"]
-                        time_dict["det"] += table_time_dict["det"]
-                        time_dict["rec"] += table_time_dict["rec"]
-
-                elif region["label"] == "equation" and self.formula_system is not None:
-                    latex_res, formula_time = self.formula_system([roi_img])
-                    time_dict["formula"] += formula_time
-                    res = {"latex": latex_res[0]}
-
-                else:
-                    if text_res is not None:
-                        # Filter the text results whose regions intersect with the current layout bbox.
-                        res = self._filter_text_res(text_res, bbox)
+                with span("structure.region", label=region["label"], bbox=bbox):
+                    if region["label"] == "table":
+                        if self.table_system is not None:
+                            # tables reuse the page ocr instead of running det/rec
+                            # a second time on the table crop
+                            ocr_result = None
+                            if self.table_reuse_page_ocr and page_ocr is not None:
+                                ocr_result = self._crop_ocr_result(
+                                    page_ocr, bbox, text_index
+                                )
+                            res, table_time_dict = self.table_system(
+                                roi_img,
+                                return_ocr_result_in_table,
+                                ocr_result=ocr_result,
+                            )
+                            time_dict["table"] += table_time_dict["table"]
+                            time_dict["table_match"] += table_time_dict["match"]
+                            time_dict["det"] += table_time_dict["det"]
+                            time_dict["rec"] += table_time_dict["rec"]
+
+                    elif (
+                        region["label"] == "equation"
+                        and self.formula_system is not None
+                    ):
+                        latex_res, formula_time = self.formula_system([roi_img])
+                        time_dict["formula"] += formula_time
+                        res = {"latex": latex_res[0]}
+
+                    else:
+                        if text_res is not None:
+                            # Filter the text results whose regions intersect with the current layout bbox.
+                            res = self._filter_text_res(text_res, bbox, text_index)
 
                 res_list.append(
                     {
@@ -203,7 +239,31 @@ class StructureSystem(object):
 
     def _predict_text(self, img):
         filter_boxes, filter_rec_res, ocr_time_dict = self.text_system(img)
-
+        return self._format_text_res(filter_boxes, filter_rec_res), ocr_time_dict
+
+    def _crop_ocr_result(self, page_ocr, bbox, text_index=None):
+        """
+        Select the page ocr results whose box center lies in bbox and translate
+        them into the coordinates of the bbox crop.
+        """
+        x1, y1, x2, y2 = bbox
+        boxes, rec_results = page_ocr
+        index = range(len(boxes)) if text_index is None else text_index.query(bbox)
+        crop_boxes, crop_rec_res = [], []
+        for i in index:
+            box, rec_res = boxes[i], rec_results[i]
+            box = np.asarray(box, dtype=np.float32)
+            cx, cy = box.mean(axis=0)
+            if not (x1 <= cx < x2 and y1 <= cy < y2):
+                continue
+            box = box - np.array([x1, y1], dtype=np.float32)
+            box[:, 0] = np.clip(box[:, 0], 0, x2 - x1)
+            box[:, 1] = np.clip(box[:, 1], 0, y2 - y1)
+            crop_boxes.append(box)
+            crop_rec_res.append(rec_res)
+        return crop_boxes, crop_rec_res
+
+    def _format_text_res(self, filter_boxes, filter_rec_res):
         # remove style char,
         # when using the recognition model trained on the PubtabNet dataset,
         # it will recognize the text format in the table, such as <b>
@@ -250,11 +310,15 @@ class StructureSystem(object):
                         "text_region": box.tolist(),
                     }
                 )
-        return res, ocr_time_dict
+        return res
 
-    def _filter_text_res(self, text_res, bbox):
+    def _filter_text_res(self, text_res, bbox, text_index=None):
+        # the index returns a superset of the intersecting lines in their
+        # original order, the exact test below keeps the old semantics
+        index = range(len(text_res)) if text_index is None else text_index.query(bbox)
         res = []
-        for r in text_res:
+        for i in index:
+            r = text_res[i]
             box = r["text_region"]
             rect = box[0][0], box[0][1], box[2][0], box[2][1]
             if self._has_intersection(bbox, rect):
@@ -274,7 +338,8 @@ class StructureSystem(object):
 def save_structure_res(res, save_folder, img_name, img_idx=0):
     excel_save_folder = os.path.join(save_folder, img_name)
     os.makedirs(excel_save_folder, exist_ok=True)
-    res_cp = deepcopy(res)
+    # only the region dicts are modified, so the region images are not copied
+    res_cp = [dict(region) for region in res]
     # save res
     with open(
         os.path.join(excel_save_folder, "res_{}.txt".format(img_idx)),
@@ -301,115 +366,139 @@ def save_structure_res(res, save_folder, img_name, img_idx=0):
                 cv2.imwrite(img_path, roi_img)
 
 
+def process_file(structure_sys, image_file, args, save_folder):
+    """
+    Run the structure system on every page of one file and save the results.
+    return:
+        list with one summary record per page
+    """
+    records = []
+    img, flag_gif, flag_pdf = check_and_read(image_file)
+    img_name = os.path.basename(image_file).split(".")[0]
+
+    if args.recovery and args.use_pdf2docx_api and flag_pdf:
+        from paddle.utils import try_import
+
+        try_import("pdf2docx")
+        from pdf2docx.converter import Converter
+
+        os.makedirs(args.output, exist_ok=True)
+        docx_file = os.path.join(args.output, "{}_api.docx".format(img_name))
+        cv = Converter(image_file)
+        cv.convert(docx_file)
+        cv.close()
+        logger.info("docx save to {}".format(docx_file))
+        return [{"file": image_file, "docx": docx_file}]
+
+    if not flag_gif and not flag_pdf:
+        img = cv2.imread(image_file)
+
+    if not flag_pdf:
+        if img is None:
+            logger.error("error in loading image:{}".format(image_file))
+            return records
+        imgs = [img]
+    else:
+        imgs = img
+
+    all_res = []
+    time_dict = {"all": 0}
+    for index, img in enumerate(imgs):
+        res, time_dict = structure_sys(img, img_idx=index)
+        img_save_path = os.path.join(save_folder, img_name, "show_{}.jpg".format(index))
+        os.makedirs(os.path.join(save_folder, img_name), exist_ok=True)
+        if structure_sys.mode == "structure" and res != []:
+            draw_img = draw_structure_result(img, res, args.vis_font_path)
+            save_structure_res(res, save_folder, img_name, index)
+        elif structure_sys.mode == "kie":
+            if structure_sys.kie_predictor.predictor is not None:
+                draw_img = draw_re_results(img, res, font_path=args.vis_font_path)
+            else:
+                draw_img = draw_ser_results(img, res, font_path=args.vis_font_path)
+
+            with open(
+                os.path.join(save_folder, img_name, "res_{}_kie.txt".format(index)),
+                "w",
+                encoding="utf8",
+            ) as f:
+                res_str = "{}\t{}\n".format(
+                    image_file, json.dumps({"ocr_info": res}, ensure_ascii=False)
+                )
+                f.write(res_str)
+        if res != []:
+            cv2.imwrite(img_save_path, draw_img)
+            logger.info("result save to {}".format(img_save_path))
+        records.append(
+            {
+                "file": image_file,
+                "page": index,
+                "elapse": time_dict["all"],
+                "regions": len(res),
+            }
+        )
+        if args.recovery and res != []:
+            from ppstructure.recovery.recovery_to_doc import (
+                sorted_layout_boxes,
+                convert_info_docx,
+            )
+            from ppstructure.recovery.recovery_to_markdown import (
+                convert_info_markdown,
+            )
+
+            h, w, _ = img.shape
+            res = sorted_layout_boxes(res, w)
+            all_res += res
+
+    if args.recovery and all_res != []:
+        try:
+            convert_info_docx(img, all_res, save_folder, img_name)
+            if args.recovery_to_markdown:
+                convert_info_markdown(all_res, save_folder, img_name)
+        except Exception as ex:
+            logger.error(
+                "error in layout recovery image:{}, err msg: {}".format(image_file, ex)
+            )
+            return records
+    logger.info("Predict time : {:.3f}s".format(time_dict["all"]))
+    return records
+
+
+def mp_init(args):
+    if args.use_pdf2docx_api:
+        return None, None
+    structure_sys = StructureSystem(args)
+    save_folder = os.path.join(args.output, structure_sys.mode)
+    os.makedirs(save_folder, exist_ok=True)
+    return structure_sys, save_folder
+
+
+def mp_process(state, args, image_file):
+    """Process one file in a batch runner worker, see tools/infer/batch_runner.py."""
+    structure_sys, save_folder = state
+    return process_file(structure_sys, image_file, args, save_folder)
+
+
 def main(args):
     image_file_list = get_image_file_list(args.image_dir)
-    image_file_list = image_file_list
     image_file_list = image_file_list[args.process_id :: args.total_process_num]
 
-    if not args.use_pdf2docx_api:
-        structure_sys = StructureSystem(args)
-        save_folder = os.path.join(args.output, structure_sys.mode)
-        os.makedirs(save_folder, exist_ok=True)
+    structure_sys, save_folder = mp_init(args)
     img_num = len(image_file_list)
 
     for i, image_file in enumerate(image_file_list):
         logger.info("[{}/{}] {}".format(i, img_num, image_file))
-        img, flag_gif, flag_pdf = check_and_read(image_file)
-        img_name = os.path.basename(image_file).split(".")[0]
-
-        if args.recovery and args.use_pdf2docx_api and flag_pdf:
-            try_import("pdf2docx")
-            from pdf2docx.converter import Converter
-
-            os.makedirs(args.output, exist_ok=True)
-            docx_file = os.path.join(args.output, "{}_api.docx".format(img_name))
-            cv = Converter(image_file)
-            cv.convert(docx_file)
-            cv.close()
-            logger.info("docx save to {}".format(docx_file))
-            continue
-
-        if not flag_gif and not flag_pdf:
-            img = cv2.imread(image_file)
-
-        if not flag_pdf:
-            if img is None:
-                logger.error("error in loading image:{}".format(image_file))
-                continue
-            imgs = [img]
-        else:
-            imgs = img
-
-        all_res = []
-        for index, img in enumerate(imgs):
-            res, time_dict = structure_sys(img, img_idx=index)
-            img_save_path = os.path.join(
-                save_folder, img_name, "show_{}.jpg".format(index)
-            )
-            os.makedirs(os.path.join(save_folder, img_name), exist_ok=True)
-            if structure_sys.mode == "structure" and res != []:
-                draw_img = draw_structure_result(img, res, args.vis_font_path)
-                save_structure_res(res, save_folder, img_name, index)
-            elif structure_sys.mode == "kie":
-                if structure_sys.kie_predictor.predictor is not None:
-                    draw_img = draw_re_results(img, res, font_path=args.vis_font_path)
-                else:
-                    draw_img = draw_ser_results(img, res, font_path=args.vis_font_path)
-
-                with open(
-                    os.path.join(save_folder, img_name, "res_{}_kie.txt".format(index)),
-                    "w",
-                    encoding="utf8",
-                ) as f:
-                    res_str = "{}\t{}\n".format(
-                        image_file, json.dumps({"ocr_info": res}, ensure_ascii=False)
-                    )
-                    f.write(res_str)
-            if res != []:
-                cv2.imwrite(img_save_path, draw_img)
-                logger.info("result save to {}".format(img_save_path))
-            if args.recovery and res != []:
-                from ppstructure.recovery.recovery_to_doc import (
-                    sorted_layout_boxes,
-                    convert_info_docx,
-                )
-                from ppstructure.recovery.recovery_to_markdown import (
-                    convert_info_markdown,
-                )
-
-                h, w, _ = img.shape
-                res = sorted_layout_boxes(res, w)
-                all_res += res
-
-        if args.recovery and all_res != []:
-            try:
-                convert_info_docx(img, all_res, save_folder, img_name)
-                if args.recovery_to_markdown:
-                    convert_info_markdown(all_res, save_folder, img_name)
-            except Exception as ex:
-                logger.error(
-                    "error in layout recovery image:{}, err msg: {}".format(
-                        image_file, ex
-                    )
-                )
-                continue
-        logger.info("Predict time : {:.3f}s".format(time_dict["all"]))
+        process_file(structure_sys, image_file, args, save_folder)
 
 
 if __name__ == "__main__":
     args = parse_args()
     if args.use_mp:
-        p_list = []
-        total_process_num = args.total_process_num
-        for process_id in range(total_process_num):
-            cmd = (
-                [sys.executable, "-u"]
-                + sys.argv
-                + ["--process_id={}".format(process_id), "--use_mp={}".format(False)]
-            )
-            p = subprocess.Popen(cmd, stdout=sys.stdout, stderr=sys.stdout)
-            p_list.append(p)
-        for p in p_list:
-            p.wait()
+        run_batch(
+            mp_init,
+            mp_process,
+            args,
+            get_image_file_list(args.image_dir),
+            default_output=os.path.join(args.output, "structure_results.jsonl"),
+        )
     else:
         main(args)
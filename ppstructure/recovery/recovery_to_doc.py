@@ -25,6 +25,7 @@ from docx.enum.table import WD_TABLE_ALIGNMENT
 from ppstructure.recovery.table_process import HtmlToDocx
 
 from ppocr.utils.logging import get_logger
+from ppocr.utils.reading_order import reading_order
 
 logger = get_logger()
 
@@ -97,8 +98,10 @@ def sorted_layout_boxes(res, w):
         res[0]["layout"] = "single"
         return res
 
-    sorted_boxes = sorted(res, key=lambda x: (x["bbox"][1], x["bbox"][0]))
-    _boxes = list(sorted_boxes)
+    # regions on the same row come out left to right even when their tops
+    # differ by a few pixels, which a plain (y, x) sort gets wrong
+    order = reading_order([x["bbox"] for x in res], deskew=False)
+    _boxes = [res[i] for i in order]
 
     new_res = []
     res_left = []
@@ -0,0 +1,125 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare TableMatch.match_result with the former pairwise loop on synthetic
+tables of growing size and check that both produce the same assignment, e.g.
+
+    python3 ppstructure/table/benchmark_matcher.py --sizes=10x5,50x10,100x10
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+import argparse
+import time
+import numpy as np
+
+from ppstructure.table.matcher import TableMatch, distance, compute_iou
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="10x5,25x10,50x10,100x10",
+        help="comma separated table sizes as rows x cols",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def match_result_loop(dt_boxes, pred_bboxes):
+    """The pairwise implementation match_result used to have."""
+    matched = {}
+    for i, gt_box in enumerate(dt_boxes):
+        distances = []
+        for j, pred_box in enumerate(pred_bboxes):
+            if len(pred_box) == 8:
+                pred_box = [
+                    np.min(pred_box[0::2]),
+                    np.min(pred_box[1::2]),
+                    np.max(pred_box[0::2]),
+                    np.max(pred_box[1::2]),
+                ]
+            distances.append(
+                (distance(gt_box, pred_box), 1.0 - compute_iou(gt_box, pred_box))
+            )
+        sorted_distances = sorted(distances.copy(), key=lambda item: (item[1], item[0]))
+        index = distances.index(sorted_distances[0])
+        matched.setdefault(index, []).append(i)
+    return matched
+
+
+def make_table(rows, cols, rng, cell_w=120, cell_h=30):
+    """Cells as 8-point polygons and 1-2 ocr boxes per cell as [x0, y0, x1, y1]."""
+    pred_bboxes, dt_boxes = [], []
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = c * cell_w, r * cell_h
+            x1, y1 = x0 + cell_w, y0 + cell_h
+            pred_bboxes.append([x0, y0, x1, y0, x1, y1, x0, y1])
+            for k in range(rng.randint(1, 3)):
+                bx0 = x0 + rng.uniform(-4, cell_w * 0.5)
+                by0 = y0 + rng.uniform(-4, 8)
+                dt_boxes.append(
+                    [
+                        bx0,
+                        by0,
+                        bx0 + rng.uniform(10, cell_w * 0.6),
+                        by0 + rng.uniform(10, 20),
+                    ]
+                )
+    return np.array(dt_boxes), np.array(pred_bboxes, dtype=np.float32)
+
+
+def main(args):
+    rng = np.random.RandomState(args.seed)
+    matcher = TableMatch()
+    for size in args.sizes.split(","):
+        rows, cols = [int(v) for v in size.split("x")]
+        dt_boxes, pred_bboxes = make_table(rows, cols, rng)
+
+        st = time.time()
+        ref = match_result_loop(dt_boxes, pred_bboxes)
+        loop_time = time.time() - st
+
+        elapse_list = []
+        for _ in range(args.repeat):
+            st = time.time()
+            matched = matcher.match_result(dt_boxes, pred_bboxes)
+            elapse_list.append(time.time() - st)
+        vec_time = float(np.median(elapse_list))
+        logger.info(
+            "cells: {}, ocr boxes: {}, loop: {:.3f}s, vectorized: {:.4f}s, "
+            "speedup: {:.1f}x, identical: {}".format(
+                len(pred_bboxes),
+                len(dt_boxes),
+                loop_time,
+                vec_time,
+                loop_time / max(vec_time, 1e-9),
+                matched == ref and list(matched) == list(ref),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,139 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the table results and latency of StructureSystem with the table ocr
+running on every table crop (--table_reuse_page_ocr=False) and with tables
+reusing the page-level ocr (--table_reuse_page_ocr=True), e.g.
+
+    python3 ppstructure/table/compare_table_ocr.py --image_dir=./docs \
+        --det_model_dir=... --rec_model_dir=... --table_model_dir=... \
+        --layout_model_dir=... [--gt_path=gt.txt]
+
+gt_path is optional and uses the format of eval_table.py (img_name\\thtml);
+the first table of every image is scored against it with TEDS.
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+import cv2
+import time
+import numpy as np
+
+from ppocr.utils.utility import get_image_file_list
+from ppocr.utils.logging import get_logger
+from ppstructure.predict_system import StructureSystem
+from ppstructure.table.eval_table import load_txt
+from ppstructure.utility import init_args
+
+logger = get_logger()
+
+
+def parse_args():
+    parser = init_args()
+    parser.add_argument("--gt_path", type=str, default=None)
+    return parser.parse_args()
+
+
+def run(structure_sys, img_list, reuse_page_ocr):
+    structure_sys.table_reuse_page_ocr = reuse_page_ocr
+    tables, latencies = [], []
+    for img in img_list:
+        st = time.time()
+        res, _ = structure_sys(img)
+        latencies.append(time.time() - st)
+        tables.append(
+            [
+                region["res"].get("html", "")
+                for region in res
+                if region["type"] == "table" and isinstance(region["res"], dict)
+            ]
+        )
+    return tables, latencies
+
+
+def main(args):
+    image_file_list = get_image_file_list(args.image_dir)
+    names, img_list = [], []
+    for image_file in image_file_list:
+        img = cv2.imread(image_file)
+        if img is None:
+            logger.info("error in loading image:{}".format(image_file))
+            continue
+        names.append(os.path.basename(image_file))
+        img_list.append(img)
+
+    structure_sys = StructureSystem(args)
+    # warm up so that predictor initialization is not measured
+    run(structure_sys, img_list[:1], False)
+
+    separate_tables, separate_latency = run(structure_sys, img_list, False)
+    shared_tables, shared_latency = run(structure_sys, img_list, True)
+
+    table_num = sum(len(t) for t in separate_tables)
+    same = sum(
+        a == b
+        for tables_a, tables_b in zip(separate_tables, shared_tables)
+        for a, b in zip(tables_a, tables_b)
+    )
+    separate_time, shared_time = np.sum(separate_latency), np.sum(shared_latency)
+    logger.info("pages: {}, tables: {}".format(len(img_list), table_num))
+    logger.info(
+        "latency per page, table ocr: {:.3f}s, page ocr reused: {:.3f}s, speedup: {:.2f}x".format(
+            separate_time / max(len(img_list), 1),
+            shared_time / max(len(img_list), 1),
+            separate_time / max(shared_time, 1e-6),
+        )
+    )
+    logger.info("tables with identical html: {}/{}".format(same, table_num))
+
+    from ppstructure.table.table_metric import TEDS
+
+    teds = TEDS(n_jobs=1)
+    pairs = [
+        (a, b)
+        for tables_a, tables_b in zip(separate_tables, shared_tables)
+        for a, b in zip(tables_a, tables_b)
+    ]
+    if pairs:
+        scores = teds.batch_evaluate_html([b for _, b in pairs], [a for a, _ in pairs])
+        logger.info(
+            "TEDS of page ocr reused against table ocr: {:.4f}".format(np.mean(scores))
+        )
+
+    if args.gt_path:
+        gt_html_dict = load_txt(args.gt_path)
+        for mode, tables in [
+            ("table ocr", separate_tables),
+            ("page ocr reused", shared_tables),
+        ]:
+            gt_htmls, pred_htmls = [], []
+            for name, page_tables in zip(names, tables):
+                if name in gt_html_dict:
+                    gt_htmls.append(gt_html_dict[name])
+                    pred_htmls.append(page_tables[0] if page_tables else "")
+            if gt_htmls:
+                scores = teds.batch_evaluate_html(pred_htmls, gt_htmls)
+                logger.info(
+                    "TEDS against gt, {}: {:.4f} ({} images)".format(
+                        mode, np.mean(scores), len(scores)
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main(parse_args())
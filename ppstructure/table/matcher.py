@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import numpy as np
+from ppocr.utils.spatial_index import GridIndex
 from ppstructure.table.table_master_match import deal_eb_token, deal_bb
 import html
 
@@ -55,6 +56,48 @@ def compute_iou(rec1, rec2):
         return (intersect / (sum_area - intersect)) * 1.0
 
 
+def distance_matrix(boxes_1, boxes_2):
+    """
+    distance for every pair of boxes
+    :param boxes_1: array with shape (N, 4), (x0, y0, x1, y1)
+    :param boxes_2: array with shape (M, 4)
+    :return: array with shape (N, M)
+    """
+    diff = np.abs(boxes_2[None, :, :] - boxes_1[:, None, :])
+    # same order of additions as distance so that ties are resolved alike
+    dis = diff[..., 0] + diff[..., 1] + diff[..., 2] + diff[..., 3]
+    dis_2 = diff[..., 0] + diff[..., 1]
+    dis_3 = diff[..., 2] + diff[..., 3]
+    return dis + np.minimum(dis_2, dis_3)
+
+
+def compute_iou_matrix(recs_1, recs_2):
+    """
+    compute_iou for every pair of rectangles
+    :param recs_1: array with shape (N, 4)
+    :param recs_2: array with shape (M, 4)
+    :return: array with shape (N, M)
+    """
+    recs_1 = recs_1[:, None, :]
+    recs_2 = recs_2[None, :, :]
+    S_rec1 = (recs_1[..., 2] - recs_1[..., 0]) * (recs_1[..., 3] - recs_1[..., 1])
+    S_rec2 = (recs_2[..., 2] - recs_2[..., 0]) * (recs_2[..., 3] - recs_2[..., 1])
+    sum_area = S_rec1 + S_rec2
+
+    left_line = np.maximum(recs_1[..., 1], recs_2[..., 1])
+    right_line = np.minimum(recs_1[..., 3], recs_2[..., 3])
+    top_line = np.maximum(recs_1[..., 0], recs_2[..., 0])
+    bottom_line = np.minimum(recs_1[..., 2], recs_2[..., 2])
+
+    valid = (left_line < right_line) & (top_line < bottom_line)
+    intersect = np.where(
+        valid, (right_line - left_line) * (bottom_line - top_line), 0.0
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = intersect / (sum_area - intersect)
+    return np.where(valid, iou, 0.0)
+
+
 class TableMatch:
     def __init__(self, filter_ocr_result=False, use_master=False):
         self.filter_ocr_result = filter_ocr_result
@@ -75,32 +118,76 @@ class TableMatch:
             )
         return pred_html
 
-    def match_result(self, dt_boxes, pred_bboxes):
+    def match_result(
+        self, dt_boxes, pred_bboxes, chunk_size=2048, index_threshold=1 << 20
+    ):
+        """
+        Assign every ocr box to the cell with the highest IoU, ties broken by
+        the smallest L1 distance and then by the lowest cell index. The IoU and
+        distance matrices are computed for chunk_size ocr boxes at a time. For
+        tables with more than index_threshold box/cell pairs, ocr boxes are
+        first matched against the cells a spatial index returns for them and
+        only boxes that overlap no cell are compared with all cells.
+        """
         matched = {}
-        for i, gt_box in enumerate(dt_boxes):
-            distances = []
-            for j, pred_box in enumerate(pred_bboxes):
-                if len(pred_box) == 8:
-                    pred_box = [
-                        np.min(pred_box[0::2]),
-                        np.min(pred_box[1::2]),
-                        np.max(pred_box[0::2]),
-                        np.max(pred_box[1::2]),
-                    ]
-                distances.append(
-                    (distance(gt_box, pred_box), 1.0 - compute_iou(gt_box, pred_box))
-                )  # compute iou and l1 distance
-            sorted_distances = distances.copy()
-            # select det box by iou and l1 distance
-            sorted_distances = sorted(
-                sorted_distances, key=lambda item: (item[1], item[0])
+        if len(dt_boxes) == 0 or len(pred_bboxes) == 0:
+            return matched
+        gt_boxes = np.asarray(dt_boxes, dtype=np.float64).reshape(-1, 4)
+        pred_boxes = np.asarray(pred_bboxes, dtype=np.float64)
+        if pred_boxes.shape[1] == 8:
+            pred_boxes = np.stack(
+                [
+                    pred_boxes[:, 0::2].min(axis=1),
+                    pred_boxes[:, 1::2].min(axis=1),
+                    pred_boxes[:, 0::2].max(axis=1),
+                    pred_boxes[:, 1::2].max(axis=1),
+                ],
+                axis=1,
             )
-            if distances.index(sorted_distances[0]) not in matched.keys():
-                matched[distances.index(sorted_distances[0])] = [i]
+        best = np.full((len(gt_boxes),), -1, dtype=np.int64)
+        if len(gt_boxes) * len(pred_boxes) > index_threshold:
+            self._match_with_index(gt_boxes, pred_boxes, best)
+        rest = np.nonzero(best < 0)[0]
+        for beg in range(0, len(rest), chunk_size):
+            rows = rest[beg : beg + chunk_size]
+            best[rows] = self._match_dense(gt_boxes[rows], pred_boxes)
+        for i, j in enumerate(best.tolist()):
+            if j not in matched:
+                matched[j] = [i]
             else:
-                matched[distances.index(sorted_distances[0])].append(i)
+                matched[j].append(i)
         return matched
 
+    def _match_dense(self, gt_boxes, pred_boxes):
+        iou_cost = 1.0 - compute_iou_matrix(gt_boxes, pred_boxes)
+        dist = distance_matrix(gt_boxes, pred_boxes)
+        best_iou = iou_cost.min(axis=1, keepdims=True)
+        dist = np.where(iou_cost == best_iou, dist, np.inf)
+        # argmin returns the first minimum, like list.index did
+        return dist.argmin(axis=1)
+
+    def _match_with_index(self, gt_boxes, pred_boxes, best):
+        """
+        Match the ocr boxes that overlap at least one cell. Every cell with a
+        positive IoU intersects the box, so the best cell and all cells tied
+        with it are among the candidates of the index.
+        """
+        index = GridIndex(pred_boxes)
+        for i, gt_box in enumerate(gt_boxes):
+            candidates = np.asarray(index.query(gt_box), dtype=np.int64)
+            if len(candidates) == 0:
+                continue
+            cells = pred_boxes[candidates]
+            iou_cost = 1.0 - compute_iou_matrix(gt_box[None], cells)[0]
+            best_iou = iou_cost.min()
+            # without overlap all cells tie at 1.0, leave the box to the
+            # dense matching
+            if not best_iou < 1.0:
+                continue
+            dist = distance_matrix(gt_box[None], cells)[0]
+            dist = np.where(iou_cost == best_iou, dist, np.inf)
+            best[i] = candidates[dist.argmin()]
+
     def get_pred_html(self, pred_structures, matched_index, ocr_contents):
         end_html = []
         td_index = 0
@@ -28,7 +28,9 @@ import json
 import tools.infer.utility as utility
 from ppocr.data import create_operators, transform
 from ppocr.postprocess import build_post_process
+from ppocr.utils.benchmark import StageTimer
 from ppocr.utils.logging import get_logger
+from ppocr.utils.tracing import span, record_span
 from ppocr.utils.utility import get_image_file_list, check_and_read
 from ppocr.utils.visual import draw_rectangle
 from ppstructure.utility import parse_args
@@ -97,40 +99,30 @@ class TableStructurer(object):
         ) = utility.create_predictor(args, "table", logger)
 
         if args.benchmark:
-            import auto_log
-
-            pid = os.getpid()
-            gpu_id = utility.get_infer_gpuid()
-            self.autolog = auto_log.AutoLogger(
-                model_name="table",
-                model_precision=args.precision,
-                batch_size=1,
-                data_shape="dynamic",
-                save_path=None,  # args.save_log_path,
-                inference_config=self.config,
-                pids=pid,
-                process_name=None,
-                gpu_ids=gpu_id if args.use_gpu else None,
-                time_keys=["preprocess_time", "inference_time", "postprocess_time"],
-                warmup=0,
-                logger=logger,
-            )
+            self.stage_timer = StageTimer("table")
 
     def __call__(self, img):
+        with span("table.structure", shape=img.shape) as table_span:
+            structure_res, elapse = self._predict(img)
+            if structure_res is not None:
+                table_span.set(cell_num=len(structure_res[1]))
+        return structure_res, elapse
+
+    def _predict(self, img):
         starttime = time.time()
         if self.args.benchmark:
-            self.autolog.times.start()
+            self.stage_timer.start()
 
-        ori_im = img.copy()
         data = {"image": img}
         data = transform(data, self.preprocess_op)
         img = data[0]
         if img is None:
             return None, 0
         img = np.expand_dims(img, axis=0)
-        img = img.copy()
+        img = np.ascontiguousarray(img)
         if self.args.benchmark:
-            self.autolog.times.stamp()
+            self.stage_timer.stamp()
+        infer_st = time.perf_counter()
         if self.use_onnx:
             input_dict = {}
             input_dict[self.input_tensor.name] = img
@@ -143,7 +135,10 @@ class TableStructurer(object):
                 output = output_tensor.copy_to_cpu()
                 outputs.append(output)
             if self.args.benchmark:
-                self.autolog.times.stamp()
+                self.stage_timer.stamp()
+        record_span(
+            "table.infer", time.perf_counter() - infer_st, shape=img.shape, batch_size=1
+        )
 
         preds = {}
         preds["structure_probs"] = outputs[1]
@@ -162,7 +157,7 @@ class TableStructurer(object):
         )
         elapse = time.time() - starttime
         if self.args.benchmark:
-            self.autolog.times.end(stamp=True)
+            self.stage_timer.end(stamp=True)
         return (structure_str_list, bbox_list), elapse
 
 
@@ -200,7 +195,7 @@ def main(args):
             count += 1
             logger.info("Predict time of {}: {}".format(image_file, elapse))
     if args.benchmark:
-        table_structurer.autolog.report()
+        table_structurer.stage_timer.report(logger)
 
 
 if __name__ == "__main__":
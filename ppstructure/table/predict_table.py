@@ -26,14 +26,19 @@ import copy
 import logging
 import numpy as np
 import time
+import json
 import tools.infer.predict_rec as predict_rec
 import tools.infer.predict_det as predict_det
 import tools.infer.utility as utility
 from tools.infer.predict_system import sorted_boxes
+from tools.infer.batch_runner import run_batch
 from ppocr.utils.utility import get_image_file_list, check_and_read
 from ppocr.utils.logging import get_logger
+from ppocr.utils.reading_order import reading_order
+from ppocr.utils.tracing import span, configure_tracing
 from ppstructure.table.matcher import TableMatch
 from ppstructure.table.table_master_match import TableMasterMatcher
+from ppstructure.table.xlsx_writer import XlsxTableWriter
 from ppstructure.utility import parse_args
 import ppstructure.table.predict_structure as predict_strture
 
@@ -60,6 +65,7 @@ class TableSystem(object):
         self.args = args
         if not args.show_log:
             logger.setLevel(logging.INFO)
+        configure_tracing(args)
         benchmark_tmp = False
         if args.benchmark:
             benchmark_tmp = args.benchmark
@@ -77,6 +83,7 @@ class TableSystem(object):
         if benchmark_tmp:
             args.benchmark = True
         self.table_structurer = predict_strture.TableStructurer(args)
+        self.debug_readonly_images = getattr(args, "debug_readonly_images", False)
         if args.table_algorithm in ["TableMaster"]:
             self.match = TableMasterMatcher()
         else:
@@ -89,24 +96,51 @@ class TableSystem(object):
             self.config,
         ) = utility.create_predictor(args, "table", logger)
 
-    def __call__(self, img, return_ocr_result_in_table=False):
+    def __call__(self, img, return_ocr_result_in_table=False, ocr_result=None):
+        """
+        args:
+            img: the table image
+            return_ocr_result_in_table(bool): add the ocr boxes and texts to the result
+            ocr_result: optional (dt_boxes, rec_res) that was already computed
+                for this image, e.g. cut out of a page-level ocr pass. The
+                quadrilateral boxes must be in the coordinates of img. When
+                given, the table ocr (det + rec) is skipped.
+        """
+        with span("table.predict", shape=img.shape, reuse_ocr=ocr_result is not None):
+            return self._predict(img, return_ocr_result_in_table, ocr_result)
+
+    def _predict(self, img, return_ocr_result_in_table, ocr_result):
         result = dict()
         time_dict = {"det": 0, "rec": 0, "table": 0, "all": 0, "match": 0}
         start = time.time()
-        structure_res, elapse = self._structure(copy.deepcopy(img))
+        # none of the stages modifies the image, so it is shared instead of
+        # being copied for each of them
+        img = utility.readonly_view(img, self.debug_readonly_images)
+        structure_res, elapse = self._structure(img)
         result["cell_bbox"] = structure_res[1].tolist()
         time_dict["table"] = elapse
 
-        dt_boxes, rec_res, det_elapse, rec_elapse = self._ocr(copy.deepcopy(img))
-        time_dict["det"] = det_elapse
-        time_dict["rec"] = rec_elapse
+        if ocr_result is not None:
+            h, w = img.shape[:2]
+            dt_boxes, rec_res = ocr_result
+            # sorted like the boxes of the table ocr, the texts move with them
+            order = reading_order(dt_boxes)
+            dt_boxes = self._to_table_boxes([dt_boxes[i] for i in order], h, w)
+            rec_res = [rec_res[i] for i in order]
+        else:
+            with span("table.ocr") as ocr_span:
+                dt_boxes, rec_res, det_elapse, rec_elapse = self._ocr(img)
+                ocr_span.set(box_num=len(dt_boxes))
+            time_dict["det"] = det_elapse
+            time_dict["rec"] = rec_elapse
 
         if return_ocr_result_in_table:
             result["boxes"] = [x.tolist() for x in dt_boxes]
             result["rec_res"] = rec_res
 
         tic = time.time()
-        pred_html = self.match(structure_res, dt_boxes, rec_res)
+        with span("table.match", box_num=len(dt_boxes)):
+            pred_html = self.match(structure_res, dt_boxes, rec_res)
         toc = time.time()
         time_dict["match"] = toc - tic
         result["html"] = pred_html
@@ -115,23 +149,26 @@ class TableSystem(object):
         return result, time_dict
 
     def _structure(self, img):
-        structure_res, elapse = self.table_structurer(copy.deepcopy(img))
+        structure_res, elapse = self.table_structurer(img)
         return structure_res, elapse
 
-    def _ocr(self, img):
-        h, w = img.shape[:2]
-        dt_boxes, det_elapse = self.text_detector(copy.deepcopy(img))
-        dt_boxes = sorted_boxes(dt_boxes)
-
+    def _to_table_boxes(self, dt_boxes, h, w):
         r_boxes = []
         for box in dt_boxes:
+            box = np.asarray(box)
             x_min = max(0, box[:, 0].min() - 1)
             x_max = min(w, box[:, 0].max() + 1)
             y_min = max(0, box[:, 1].min() - 1)
             y_max = min(h, box[:, 1].max() + 1)
             box = [x_min, y_min, x_max, y_max]
             r_boxes.append(box)
-        dt_boxes = np.array(r_boxes)
+        return np.array(r_boxes)
+
+    def _ocr(self, img):
+        h, w = img.shape[:2]
+        dt_boxes, det_elapse = self.text_detector(img)
+        dt_boxes = sorted_boxes(dt_boxes)
+        dt_boxes = self._to_table_boxes(dt_boxes, h, w)
         logger.debug("dt_boxes num : {}, elapse : {}".format(len(dt_boxes), det_elapse))
         if dt_boxes is None:
             return None, None
@@ -148,94 +185,118 @@ class TableSystem(object):
 
 
 def to_excel(html_table, excel_path):
-    from tablepyxl import tablepyxl
+    with XlsxTableWriter(excel_path) as writer:
+        writer.add_table(html_table)
 
-    tablepyxl.document_to_xl(html_table, excel_path)
+
+def process_file(table_sys, image_file, args):
+    """
+    Predict the table in one image, save it as xlsx and draw the cell boxes.
+    return:
+        list with one record, empty if the image cannot be read
+    """
+    img, flag, _ = check_and_read(image_file)
+    excel_path = os.path.join(
+        args.output, os.path.basename(image_file).split(".")[0] + ".xlsx"
+    )
+    if not flag:
+        img = cv2.imread(image_file)
+    if img is None:
+        logger.error("error in loading image:{}".format(image_file))
+        return []
+    starttime = time.time()
+    pred_res, _ = table_sys(img)
+    pred_html = pred_res["html"]
+    logger.info(pred_html)
+    to_excel(pred_html, excel_path)
+    logger.info("excel saved to {}".format(excel_path))
+    elapse = time.time() - starttime
+    logger.info("Predict time : {:.3f}s".format(elapse))
+
+    if len(pred_res["cell_bbox"]) > 0 and len(pred_res["cell_bbox"][0]) == 4:
+        img = predict_strture.draw_rectangle(image_file, pred_res["cell_bbox"])
+    else:
+        img = utility.draw_boxes(img, pred_res["cell_bbox"])
+    img_save_path = os.path.join(args.output, os.path.basename(image_file))
+    cv2.imwrite(img_save_path, img)
+    return [{"file": image_file, "html": pred_html, "elapse": elapse}]
+
+
+def write_html_report(records, output):
+    html_path = os.path.join(output, "show.html")
+    with open(html_path, mode="w", encoding="utf-8") as f_html:
+        f_html.write("<html>\n<body>\n")
+        f_html.write('<table border="1">\n')
+        f_html.write(
+            '<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />'
+        )
+        f_html.write("<tr>\n")
+        f_html.write("<td>img name\n")
+        f_html.write("<td>ori image</td>")
+        f_html.write("<td>table html</td>")
+        f_html.write("<td>cell box</td>")
+        f_html.write("</tr>\n")
+        for record in records:
+            if "html" not in record:
+                continue
+            image_file, pred_html = record["file"], record["html"]
+            f_html.write("<tr>\n")
+            f_html.write(f"<td> {os.path.basename(image_file)} <br/>\n")
+            f_html.write(f'<td><img src="{image_file}" width=640></td>\n')
+            f_html.write(
+                '<td><table  border="1">'
+                + pred_html.replace("<html><body><table>", "").replace(
+                    "</table></body></html>", ""
+                )
+                + "</table></td>\n"
+            )
+            f_html.write(
+                f'<td><img src="{os.path.basename(image_file)}" width=640></td>\n'
+            )
+            f_html.write("</tr>\n")
+        f_html.write("</table>\n")
+
+
+def mp_init(args):
+    os.makedirs(args.output, exist_ok=True)
+    return TableSystem(args)
+
+
+def mp_process(table_sys, args, image_file):
+    """Process one file in a batch runner worker, see tools/infer/batch_runner.py."""
+    return process_file(table_sys, image_file, args)
 
 
 def main(args):
     image_file_list = get_image_file_list(args.image_dir)
     image_file_list = image_file_list[args.process_id :: args.total_process_num]
-    os.makedirs(args.output, exist_ok=True)
-
-    table_sys = TableSystem(args)
+    table_sys = mp_init(args)
     img_num = len(image_file_list)
 
-    f_html = open(os.path.join(args.output, "show.html"), mode="w", encoding="utf-8")
-    f_html.write("<html>\n<body>\n")
-    f_html.write('<table border="1">\n')
-    f_html.write(
-        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />'
-    )
-    f_html.write("<tr>\n")
-    f_html.write("<td>img name\n")
-    f_html.write("<td>ori image</td>")
-    f_html.write("<td>table html</td>")
-    f_html.write("<td>cell box</td>")
-    f_html.write("</tr>\n")
-
+    records = []
     for i, image_file in enumerate(image_file_list):
         logger.info("[{}/{}] {}".format(i, img_num, image_file))
-        img, flag, _ = check_and_read(image_file)
-        excel_path = os.path.join(
-            args.output, os.path.basename(image_file).split(".")[0] + ".xlsx"
-        )
-        if not flag:
-            img = cv2.imread(image_file)
-        if img is None:
-            logger.error("error in loading image:{}".format(image_file))
-            continue
-        starttime = time.time()
-        pred_res, _ = table_sys(img)
-        pred_html = pred_res["html"]
-        logger.info(pred_html)
-        to_excel(pred_html, excel_path)
-        logger.info("excel saved to {}".format(excel_path))
-        elapse = time.time() - starttime
-        logger.info("Predict time : {:.3f}s".format(elapse))
-
-        if len(pred_res["cell_bbox"]) > 0 and len(pred_res["cell_bbox"][0]) == 4:
-            img = predict_strture.draw_rectangle(image_file, pred_res["cell_bbox"])
-        else:
-            img = utility.draw_boxes(img, pred_res["cell_bbox"])
-        img_save_path = os.path.join(args.output, os.path.basename(image_file))
-        cv2.imwrite(img_save_path, img)
-
-        f_html.write("<tr>\n")
-        f_html.write(f"<td> {os.path.basename(image_file)} <br/>\n")
-        f_html.write(f'<td><img src="{image_file}" width=640></td>\n')
-        f_html.write(
-            '<td><table  border="1">'
-            + pred_html.replace("<html><body><table>", "").replace(
-                "</table></body></html>", ""
-            )
-            + "</table></td>\n"
-        )
-        f_html.write(f'<td><img src="{os.path.basename(image_file)}" width=640></td>\n')
-        f_html.write("</tr>\n")
-    f_html.write("</table>\n")
-    f_html.close()
+        records.extend(process_file(table_sys, image_file, args))
+    write_html_report(records, args.output)
 
     if args.benchmark:
-        table_sys.table_structurer.autolog.report()
+        table_sys.table_structurer.stage_timer.report(logger)
 
 
 if __name__ == "__main__":
     args = parse_args()
     if args.use_mp:
-        import subprocess
-
-        p_list = []
-        total_process_num = args.total_process_num
-        for process_id in range(total_process_num):
-            cmd = (
-                [sys.executable, "-u"]
-                + sys.argv
-                + ["--process_id={}".format(process_id), "--use_mp={}".format(False)]
-            )
-            p = subprocess.Popen(cmd, stdout=sys.stdout, stderr=sys.stdout)
-            p_list.append(p)
-        for p in p_list:
-            p.wait()
+        os.makedirs(args.output, exist_ok=True)
+        default_output = os.path.join(args.output, "table_results.jsonl")
+        run_batch(
+            mp_init,
+            mp_process,
+            args,
+            get_image_file_list(args.image_dir),
+            default_output=default_output,
+        )
+        with open(args.mp_output or default_output, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        write_html_report(records, args.output)
     else:
         main(args)
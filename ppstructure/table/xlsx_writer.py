@@ -0,0 +1,197 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Direct table structure -> xlsx writer.
+
+The tables predicted by TableMatch are plain <table> markup without any css, so
+instead of inlining styles and building an lxml tree (tablepyxl), the tokens
+are scanned once into cells with their spans and the rows are streamed into a
+write-only openpyxl workbook. The cell values, merged ranges and column widths
+are the ones tablepyxl produced.
+"""
+import html
+import re
+
+__all__ = ["parse_tables", "layout_table", "XlsxTableWriter"]
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_TOKEN_RE = re.compile(r"<(/?)([a-zA-Z]+)([^>]*)>|([^<]+)")
+_SPAN_RE = re.compile(r"(colspan|rowspan)\s*=\s*[\"']?(\d+)", re.I)
+
+
+def parse_tables(table):
+    """
+    args:
+        table: html string or the token list of TableMatch.get_pred_html
+    return:
+        list of tables, each a list of rows of (text, rowspan, colspan) cells
+    """
+    if not isinstance(table, str):
+        table = "".join(table)
+    table = _COMMENT_RE.sub("", table)
+    tables = []
+    rows = None
+    row = None
+    cell = None
+    for match in _TOKEN_RE.finditer(table):
+        closing, tag, attrs, text = match.groups()
+        if text is not None:
+            if cell is not None:
+                text = html.unescape(text).strip()
+                if text:
+                    cell[0].append(text)
+            continue
+        tag = tag.lower()
+        if tag == "table":
+            if not closing:
+                rows = []
+                tables.append(rows)
+            else:
+                rows = None
+        elif tag == "tr":
+            if not closing:
+                if rows is None:
+                    rows = []
+                    tables.append(rows)
+                row = []
+                rows.append(row)
+            else:
+                row = None
+        elif tag in ("td", "th"):
+            if not closing:
+                if row is None:
+                    continue
+                spans = {"colspan": 1, "rowspan": 1}
+                for name, value in _SPAN_RE.findall(attrs):
+                    spans[name.lower()] = max(1, int(value))
+                cell = ([], spans["rowspan"], spans["colspan"])
+                row.append(cell)
+            else:
+                cell = None
+    for rows in tables:
+        for row in rows:
+            row[:] = [
+                ("\n".join(texts), rowspan, colspan) for texts, rowspan, colspan in row
+            ]
+    return tables
+
+
+def layout_table(rows):
+    """
+    Place the cells on the sheet grid, cells covered by a rowspan are skipped.
+    return:
+        grid(list): row values, None for empty cells
+        merges(list): (row, col, end_row, end_col) of the merged ranges, 0-based
+        widths(dict): column index -> width
+    """
+    occupied = set()
+    grid = []
+    merges = []
+    widths = {}
+    for r, row in enumerate(rows):
+        values = []
+        c = 0
+        for text, rowspan, colspan in row:
+            while (r, c) in occupied:
+                c += 1
+            if rowspan > 1 or colspan > 1:
+                merges.append((r, c, r + rowspan - 1, c + colspan - 1))
+                for rr in range(r, r + rowspan):
+                    for cc in range(c, c + colspan):
+                        occupied.add((rr, cc))
+            if len(values) < c + 1:
+                values.extend([None] * (c + 1 - len(values)))
+            values[c] = text or None
+            if colspan == 1:
+                # columns start at the default width of openpyxl, like tablepyxl
+                widths[c] = max(widths.get(c, 13), len(text) + 2)
+            c += colspan
+        grid.append(values)
+    return grid, merges, widths
+
+
+def _sheet_value(sheet, value):
+    """
+    Value to append for a cell. openpyxl stores every string that starts with
+    "=" as a formula, so such text is written as a string cell, like tablepyxl
+    did: scanned content cannot inject formulas and invalid ones do not make
+    Excel repair the file.
+    """
+    if not (isinstance(value, str) and value.startswith("=")):
+        return value
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(sheet, value)
+    cell.data_type = "s"
+    return cell
+
+
+class XlsxTableWriter(object):
+    """
+    Streams tables into one workbook, one sheet per table.
+    args:
+        excel_path(str): path of the xlsx file, written on close
+    """
+
+    def __init__(self, excel_path):
+        from openpyxl import Workbook
+
+        self.excel_path = excel_path
+        self.workbook = Workbook(write_only=True)
+        self.num_sheets = 0
+
+    def add_table(self, table, title=None):
+        """
+        args:
+            table: html string or the token list of TableMatch.get_pred_html,
+                every <table> in it becomes a sheet
+            title(str): title of the sheets, openpyxl makes them unique
+        return:
+            number of sheets that were added
+        """
+        from openpyxl.utils import get_column_letter
+
+        tables = parse_tables(table)
+        for rows in tables:
+            grid, merges, widths = layout_table(rows)
+            sheet = self.workbook.create_sheet(title=title)
+            # the column layout is written before the first row
+            for c, width in widths.items():
+                sheet.column_dimensions[get_column_letter(c + 1)].width = width
+            for r, c, end_r, end_c in merges:
+                sheet.merged_cells.add(
+                    "{}{}:{}{}".format(
+                        get_column_letter(c + 1),
+                        r + 1,
+                        get_column_letter(end_c + 1),
+                        end_r + 1,
+                    )
+                )
+            for values in grid:
+                sheet.append([_sheet_value(sheet, value) for value in values])
+            self.num_sheets += 1
+        return len(tables)
+
+    def close(self):
+        if self.num_sheets == 0:
+            # a workbook needs at least one sheet
+            self.workbook.create_sheet()
+        self.workbook.save(self.excel_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
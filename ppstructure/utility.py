@@ -98,6 +98,14 @@ def init_args():
         default=True,
         help="In the forward, whether the table area uses table recognition",
     )
+    parser.add_argument(
+        "--table_reuse_page_ocr",
+        type=str2bool,
+        default=False,
+        help="Whether tables reuse the page ocr results instead of running det/rec "
+        "again, opt-in since the page ocr is filtered by drop_score and detected "
+        "at the page resolution, so the table cells can differ",
+    )
     parser.add_argument(
         "--formula",
         type=str2bool,
@@ -0,0 +1,314 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Process-pool batch runner used by --use_mp.
+
+Worker processes load their models once (init_fn) and pull input files from a
+shared work queue, so fast and slow files are balanced across workers. Every
+file produces a list of JSON records that the parent process appends to a
+single JSONL file as soon as they arrive. A worker that dies (segfault, OOM
+kill, ...) is restarted and the file it was working on is retried once before
+it is reported as failed.
+
+init_fn and process_fn must be module level functions so that they can be
+pickled for the "spawn" start method:
+
+    init_fn(args) -> state
+    process_fn(state, args, task) -> list of json serializable dicts
+"""
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+__all__ = ["BatchRunner", "run_batch"]
+
+
+def _worker_main(
+    worker_id, init_fn, process_fn, args, task_queue, result_queue, in_flight
+):
+    try:
+        state = init_fn(args)
+    except Exception:
+        result_queue.put(("init_error", worker_id, None, traceback.format_exc()))
+        return
+    result_queue.put(("ready", worker_id, None, os.getpid()))
+    while True:
+        item = task_queue.get()
+        if item is None:
+            break
+        task_id, task = item
+        # written synchronously (unlike the queue) so that the parent knows
+        # which task a worker was holding even if it dies immediately
+        in_flight[worker_id] = task_id
+        st = time.time()
+        try:
+            records = process_fn(state, args, task)
+        except Exception:
+            in_flight[worker_id] = -1
+            result_queue.put(("error", worker_id, task_id, traceback.format_exc()))
+            continue
+        in_flight[worker_id] = -1
+        result_queue.put(("done", worker_id, task_id, (records, time.time() - st)))
+
+
+class BatchRunner(object):
+    """
+    args:
+        init_fn: function that loads the models of a worker
+        process_fn: function that processes one task in a worker
+        args: arguments passed to both functions (must be picklable)
+        num_workers(int): number of worker processes
+        output_path(str): JSONL file the records are written to
+        max_restarts(int): how many crashed workers may be restarted in total
+        max_task_retries(int): how often a task is retried after it crashed
+            its worker
+        idle_timeout(float): seconds without any message from idle workers
+            after which unfinished tasks are considered lost and requeued
+    """
+
+    def __init__(
+        self,
+        init_fn,
+        process_fn,
+        args,
+        num_workers,
+        output_path,
+        max_restarts=3,
+        max_task_retries=1,
+        idle_timeout=30,
+    ):
+        self.init_fn = init_fn
+        self.process_fn = process_fn
+        self.args = args
+        self.num_workers = max(1, num_workers)
+        self.output_path = output_path
+        self.max_restarts = max_restarts
+        self.max_task_retries = max_task_retries
+        self.idle_timeout = idle_timeout
+        self.ctx = mp.get_context("spawn")
+
+    def _start_worker(self, worker_id, task_queue, result_queue, in_flight):
+        p = self.ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id,
+                self.init_fn,
+                self.process_fn,
+                self.args,
+                task_queue,
+                result_queue,
+                in_flight,
+            ),
+            daemon=True,
+        )
+        p.start()
+        return p
+
+    def run(self, tasks):
+        """
+        Process all tasks and return the aggregate statistics.
+        args:
+            tasks(list): json serializable task descriptions, usually file paths
+        """
+        tasks = list(tasks)
+        task_queue = self.ctx.Queue()
+        result_queue = self.ctx.Queue()
+        for task_id, task in enumerate(tasks):
+            task_queue.put((task_id, task))
+
+        in_flight = self.ctx.Array("l", [-1] * self.num_workers, lock=False)
+        workers = [
+            self._start_worker(i, task_queue, result_queue, in_flight)
+            for i in range(self.num_workers)
+        ]
+        ready = [False] * self.num_workers
+        retries = {}
+        worker_tasks = [0] * self.num_workers
+        restarts = 0
+        done = set()
+        last_activity = time.time()
+        finished, failed, records_num = 0, 0, 0
+        busy_time = 0.0
+
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        st = time.time()
+        with open(self.output_path, "w", encoding="utf-8") as fout:
+
+            def write_failure(task_id, message):
+                done.add(task_id)
+                fout.write(
+                    json.dumps(
+                        {"task": tasks[task_id], "error": message}, ensure_ascii=False
+                    )
+                    + "\n"
+                )
+                fout.flush()
+
+            while finished < len(tasks):
+                try:
+                    kind, worker_id, task_id, payload = result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    kind = None
+                else:
+                    last_activity = time.time()
+
+                if kind in ("done", "error") and task_id in done:
+                    # a requeued task that was finished by another worker
+                    pass
+                elif kind == "ready":
+                    ready[worker_id] = True
+                elif kind == "done":
+                    records, elapse = payload
+                    worker_tasks[worker_id] += 1
+                    busy_time += elapse
+                    for record in records:
+                        fout.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    fout.flush()
+                    records_num += len(records)
+                    done.add(task_id)
+                    finished += 1
+                elif kind == "error":
+                    worker_tasks[worker_id] += 1
+                    logger.error(
+                        "error in processing {}: {}".format(tasks[task_id], payload)
+                    )
+                    write_failure(task_id, payload)
+                    finished += 1
+                    failed += 1
+                elif kind == "init_error":
+                    logger.error(
+                        "worker {} failed to initialize: {}".format(worker_id, payload)
+                    )
+
+                # restart dead workers, retry or fail the task they were holding
+                for worker_id, p in enumerate(workers):
+                    if p.is_alive():
+                        continue
+                    task_id = in_flight[worker_id]
+                    in_flight[worker_id] = -1
+                    if task_id >= 0 and task_id not in done:
+                        retries[task_id] = retries.get(task_id, 0) + 1
+                        if retries[task_id] > self.max_task_retries:
+                            message = "worker crashed with exit code {}".format(
+                                p.exitcode
+                            )
+                            logger.error("{}: {}".format(tasks[task_id], message))
+                            write_failure(task_id, message)
+                            finished += 1
+                            failed += 1
+                        else:
+                            task_queue.put((task_id, tasks[task_id]))
+                    if finished >= len(tasks):
+                        break
+                    if restarts >= self.max_restarts:
+                        continue
+                    restarts += 1
+                    ready[worker_id] = False
+                    logger.warning(
+                        "worker {} exited with code {}, restarting ({}/{})".format(
+                            worker_id, p.exitcode, restarts, self.max_restarts
+                        )
+                    )
+                    workers[worker_id] = self._start_worker(
+                        worker_id, task_queue, result_queue, in_flight
+                    )
+
+                # the result of a worker that crashed right after finishing a
+                # task can get lost; once everybody idles, requeue what is left
+                if (
+                    kind is None
+                    and all(r or not p.is_alive() for r, p in zip(ready, workers))
+                    and all(task_id < 0 for task_id in in_flight)
+                    and time.time() - last_activity > self.idle_timeout
+                ):
+                    lost = [i for i in range(len(tasks)) if i not in done]
+                    logger.warning("requeueing {} unreported tasks".format(len(lost)))
+                    for task_id in lost:
+                        task_queue.put((task_id, tasks[task_id]))
+                    last_activity = time.time()
+
+                if not any(p.is_alive() for p in workers) and finished < len(tasks):
+                    logger.error(
+                        "all workers exited, {} of {} tasks were not processed".format(
+                            len(tasks) - finished, len(tasks)
+                        )
+                    )
+                    break
+
+        for _ in workers:
+            task_queue.put(None)
+        for p in workers:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+
+        wall_time = max(time.time() - st, 1e-6)
+        stats = {
+            "tasks": len(tasks),
+            "finished": finished,
+            "failed": failed,
+            "records": records_num,
+            "workers": self.num_workers,
+            "restarts": restarts,
+            "wall_time": wall_time,
+            "tasks_per_sec": finished / wall_time,
+            "records_per_sec": records_num / wall_time,
+            "worker_utilization": busy_time / (wall_time * self.num_workers),
+            "tasks_per_worker": worker_tasks,
+        }
+        self.log_stats(stats)
+        return stats
+
+    def log_stats(self, stats):
+        logger.info(
+            "batch runner: {} files ({} failed), {} results in {:.3f}s with {} workers "
+            "({} restarts): {:.3f} files/s, {:.3f} results/s, utilization: {:.1%}".format(
+                stats["finished"],
+                stats["failed"],
+                stats["records"],
+                stats["wall_time"],
+                stats["workers"],
+                stats["restarts"],
+                stats["tasks_per_sec"],
+                stats["records_per_sec"],
+                stats["worker_utilization"],
+            )
+        )
+        logger.info("files per worker: {}".format(stats["tasks_per_worker"]))
+        logger.info("results saved to {}".format(self.output_path))
+
+
+def run_batch(init_fn, process_fn, args, tasks, default_output):
+    """
+    Run tasks with the --total_process_num, --mp_output and --mp_max_restarts
+    settings of args.
+    """
+    runner = BatchRunner(
+        init_fn,
+        process_fn,
+        args,
+        num_workers=args.total_process_num,
+        output_path=args.mp_output or default_output,
+        max_restarts=args.mp_max_restarts,
+    )
+    return runner.run(tasks)
@@ -0,0 +1,118 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the DB postprocess score modes on synthetic dense probability maps
+(many small, slightly rotated text lines, as on receipts and forms), e.g.
+
+    python3 tools/infer/benchmark_db_postprocess.py --num_boxes=500 --repeat=20
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+import argparse
+import time
+import cv2
+import numpy as np
+
+from ppocr.postprocess.db_postprocess import DBPostProcess
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--map_size", type=int, default=960)
+    parser.add_argument("--num_boxes", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--thresh", type=float, default=0.3)
+    parser.add_argument("--box_thresh", type=float, default=0.6)
+    parser.add_argument("--unclip_ratio", type=float, default=1.5)
+    parser.add_argument(
+        "--score_modes", type=str, default="slow,fast,batch", help="comma separated"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def make_prob_map(map_size, num_boxes, seed):
+    rng = np.random.RandomState(seed)
+    pred = rng.uniform(0, 0.1, (map_size, map_size)).astype(np.float32)
+    for _ in range(num_boxes):
+        center = rng.uniform(16, map_size - 16, 2)
+        size = (rng.uniform(10, 120), rng.uniform(6, 20))
+        angle = rng.uniform(-10, 10)
+        points = cv2.boxPoints((tuple(center), size, angle)).astype(np.int32)
+        cv2.fillPoly(pred, [points], float(rng.uniform(0.5, 0.95)))
+    return pred
+
+
+def match_boxes(ref_boxes, boxes):
+    """Pair every reference box with the box whose center is nearest and
+    return the largest corner distance over the pairs."""
+    if len(ref_boxes) == 0 or len(boxes) == 0:
+        return 0.0
+    ref_centers = np.asarray(ref_boxes, dtype=np.float64).mean(axis=1)
+    centers = np.asarray(boxes, dtype=np.float64).mean(axis=1)
+    dist = np.abs(ref_centers[:, None] - centers[None]).sum(-1)
+    nearest = dist.argmin(axis=1)
+    diff = np.abs(np.asarray(ref_boxes, dtype=np.float64) - np.asarray(boxes)[nearest])
+    return float(diff.max())
+
+
+def main(args):
+    pred = make_prob_map(args.map_size, args.num_boxes, args.seed)
+    src_h, src_w = args.map_size * 2, args.map_size * 2
+    outs_dict = {"maps": pred[None, None]}
+    shape_list = np.array([[src_h, src_w, 0.5, 0.5]])
+
+    results = {}
+    for score_mode in args.score_modes.split(","):
+        post_op = DBPostProcess(
+            thresh=args.thresh,
+            box_thresh=args.box_thresh,
+            unclip_ratio=args.unclip_ratio,
+            score_mode=score_mode,
+        )
+        post_op(outs_dict, shape_list)
+        elapse_list = []
+        for _ in range(args.repeat):
+            st = time.time()
+            post_result = post_op(outs_dict, shape_list)
+            elapse_list.append(time.time() - st)
+        results[score_mode] = (post_result[0]["points"], float(np.median(elapse_list)))
+
+    base_mode = args.score_modes.split(",")[0]
+    base_boxes, base_time = results[base_mode]
+    for score_mode, (boxes, elapse) in results.items():
+        logger.info(
+            "score_mode: {}, boxes: {}, time: {:.2f}ms, speedup vs {}: {:.2f}x, "
+            "max corner diff vs {}: {:.0f}px".format(
+                score_mode,
+                len(boxes),
+                elapse * 1000,
+                base_mode,
+                base_time / elapse,
+                base_mode,
+                match_boxes(base_boxes, boxes),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,136 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the slice path of TextSystem with the tiled detection on a folder of
+large images (drawings, posters), e.g.
+
+    python3 tools/infer/benchmark_det_tiling.py --image_dir=./drawings \
+        --det_model_dir=... --use_gpu=False --det_limit_side_len=960 \
+        --det_tile_size=960 --det_batch_num=4 --repeat=3
+
+Every mode runs in its own process so that the peak RSS of each is reported
+separately.
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+os.environ["FLAGS_allocator_strategy"] = "auto_growth"
+
+import cv2
+import json
+import resource
+import subprocess
+import time
+import numpy as np
+
+import tools.infer.utility as utility
+from tools.infer.predict_system import TextSystem
+from ppocr.utils.utility import get_image_file_list
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+MODES = ["slice", "tiled"]
+
+
+def parse_args():
+    parser = utility.init_args()
+    parser.add_argument("--mode", type=str, default="all", choices=MODES + ["all"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--slice_horizontal_stride", type=int, default=300)
+    parser.add_argument("--slice_vertical_stride", type=int, default=500)
+    parser.add_argument("--slice_merge_x_thres", type=int, default=50)
+    parser.add_argument("--slice_merge_y_thres", type=int, default=35)
+    return parser.parse_args()
+
+
+def run_mode(args):
+    img_list = []
+    for image_file in get_image_file_list(args.image_dir):
+        img = cv2.imread(image_file)
+        if img is None:
+            logger.info("error in loading image:{}".format(image_file))
+            continue
+        img_list.append(img)
+    if args.mode == "slice":
+        args.det_tile_size = 0
+    text_sys = TextSystem(args)
+    slice = {}
+    if args.mode == "slice":
+        slice = {
+            "horizontal_stride": args.slice_horizontal_stride,
+            "vertical_stride": args.slice_vertical_stride,
+            "merge_x_thres": args.slice_merge_x_thres,
+            "merge_y_thres": args.slice_merge_y_thres,
+        }
+
+    # warm up so that predictor initialization is not measured
+    text_sys._detect(img_list[0], slice)
+    times = []
+    for _ in range(args.repeat):
+        st = time.time()
+        box_num = sum(len(text_sys._detect(img, slice)[0]) for img in img_list)
+        times.append(time.time() - st)
+    # ru_maxrss is in KB on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        json.dumps(
+            {
+                "mode": args.mode,
+                "images": len(img_list),
+                "boxes": box_num,
+                "time": float(np.median(times)),
+                "peak_rss_mb": peak_rss,
+            }
+        )
+    )
+
+
+def main(args):
+    if args.mode != "all":
+        run_mode(args)
+        return
+    stats = {}
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)]
+            + sys.argv[1:]
+            + ["--mode", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        stats[mode] = json.loads(output.strip().splitlines()[-1])
+    if args.det_tile_size <= 0:
+        logger.info("--det_tile_size is 0, the tiled mode measured the plain path")
+    for mode in MODES:
+        s = stats[mode]
+        logger.info(
+            "{}: {:.3f}s ({:.2f} img/s), boxes: {}, peak RSS: {:.0f} MB".format(
+                mode, s["time"], s["images"] / s["time"], s["boxes"], s["peak_rss_mb"]
+            )
+        )
+    logger.info(
+        "speedup of tiled over slice: {:.2f}x".format(
+            stats["slice"]["time"] / stats["tiled"]["time"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,153 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare per-image TextSystem calls with TextSystem.predict_many on a folder
+of (small) documents, e.g.
+
+    python3 tools/infer/benchmark_predict_many.py --image_dir=./receipts \
+        --det_model_dir=... --rec_model_dir=... --use_gpu=False \
+        --images_per_batch=8 --repeat=3
+
+predict_many has to return the boxes and texts of the per-image calls, the
+scores may only differ by --score_tol because the recognizer pads the crops
+of a batch to its widest crop. The exit code is 1 on any other difference.
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+os.environ["FLAGS_allocator_strategy"] = "auto_growth"
+
+import cv2
+import time
+import numpy as np
+
+import tools.infer.utility as utility
+from tools.infer.predict_system import TextSystem
+from ppocr.utils.utility import get_image_file_list
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+
+def parse_args():
+    parser = utility.init_args()
+    parser.add_argument("--images_per_batch", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--score_tol", type=float, default=1e-3)
+    return parser.parse_args()
+
+
+def run_per_image(text_sys, img_list):
+    return [text_sys(img) for img in img_list]
+
+
+def run_pooled(text_sys, img_list, images_per_batch):
+    results = []
+    for beg in range(0, len(img_list), images_per_batch):
+        results.extend(text_sys.predict_many(img_list[beg : beg + images_per_batch]))
+    return results
+
+
+def find_mismatches(ref_results, results, score_tol):
+    """
+    args:
+        ref_results(list): results of the per-image calls
+        results(list): results of predict_many for the same images
+        score_tol(float): largest accepted score difference of a text line
+    return:
+        list of (image index, reason)
+    """
+    mismatches = []
+    if len(ref_results) != len(results):
+        return [(-1, "{} vs {} results".format(len(ref_results), len(results)))]
+    for idx, (ref, res) in enumerate(zip(ref_results, results)):
+        ref_boxes, ref_rec_res = ref[0] or [], ref[1] or []
+        boxes, rec_res = res[0] or [], res[1] or []
+        if len(ref_boxes) != len(boxes) or any(
+            not np.array_equal(a, b) for a, b in zip(ref_boxes, boxes)
+        ):
+            mismatches.append((idx, "boxes differ"))
+            continue
+        ref_texts = [r[0] for r in ref_rec_res]
+        texts = [r[0] for r in rec_res]
+        if ref_texts != texts:
+            mismatches.append((idx, "texts differ"))
+            continue
+        score_diff = max(
+            [abs(float(a[1]) - float(b[1])) for a, b in zip(ref_rec_res, rec_res)],
+            default=0.0,
+        )
+        if score_diff > score_tol:
+            mismatches.append((idx, "scores differ by {:.2e}".format(score_diff)))
+    return mismatches
+
+
+def main(args):
+    image_file_list = get_image_file_list(args.image_dir)
+    img_list, img_names = [], []
+    for image_file in image_file_list:
+        img = cv2.imread(image_file)
+        if img is None:
+            logger.info("error in loading image:{}".format(image_file))
+            continue
+        img_list.append(img)
+        img_names.append(image_file)
+    text_sys = TextSystem(args)
+
+    # warm up both paths so that predictor initialization is not measured
+    run_per_image(text_sys, img_list[: args.images_per_batch])
+    run_pooled(text_sys, img_list[: args.images_per_batch], args.images_per_batch)
+
+    per_image_times, pooled_times = [], []
+    for _ in range(args.repeat):
+        st = time.time()
+        ref_results = run_per_image(text_sys, img_list)
+        per_image_times.append(time.time() - st)
+
+        st = time.time()
+        results = run_pooled(text_sys, img_list, args.images_per_batch)
+        pooled_times.append(time.time() - st)
+
+    crop_num = sum(len(r[1]) for r in ref_results if r[1] is not None)
+    per_image_time = float(np.median(per_image_times))
+    pooled_time = float(np.median(pooled_times))
+    logger.info(
+        "images: {}, recognized lines: {}, images_per_batch: {}".format(
+            len(img_list), crop_num, args.images_per_batch
+        )
+    )
+    logger.info(
+        "per-image: {:.3f}s ({:.2f} img/s), predict_many: {:.3f}s ({:.2f} img/s), speedup: {:.2f}x".format(
+            per_image_time,
+            len(img_list) / per_image_time,
+            pooled_time,
+            len(img_list) / pooled_time,
+            per_image_time / pooled_time,
+        )
+    )
+    mismatches = find_mismatches(ref_results, results, args.score_tol)
+    for idx, reason in mismatches:
+        logger.error("{}: {}".format(img_names[idx] if idx >= 0 else "all", reason))
+    logger.info(
+        "images whose results differ between the two paths: {}".format(len(mismatches))
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,417 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark suite of the det, rec, cls, table and layout predictors and of the
+OCR (system) and structure pipelines, e.g.
+
+    python3 tools/infer/benchmark_suite.py --use_gpu=False \
+        --det_model_dir=... --rec_model_dir=... --cls_model_dir=... \
+        --table_model_dir=... --layout_model_dir=... \
+        --bench_suite=det,rec,system --bench_json=./bench_new.json \
+        --bench_compare=./bench_old.json
+
+Without --image_dir the pages are synthetic and the same on every run. Every
+pipeline is warmed up and then run --bench_repeat times over all inputs; the
+report has the p50/p95/p99 latency of the calls and of every stage, the
+throughput and the peak RSS. Pipelines whose models are not given are
+skipped. The JSON of two revisions is compared with --bench_compare.
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+os.environ["FLAGS_allocator_strategy"] = "auto_growth"
+
+import json
+import platform
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from ppocr.utils.benchmark import (
+    PeakMemorySampler,
+    current_rss_mb,
+    latency_stats,
+)
+from ppocr.utils.logging import get_logger
+from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppstructure.utility import init_args
+
+logger = get_logger()
+
+ALL_PIPELINES = ["det", "rec", "cls", "table", "layout", "system", "structure"]
+
+# model arguments every pipeline needs
+REQUIRED_MODELS = {
+    "det": ["det_model_dir"],
+    "rec": ["rec_model_dir"],
+    "cls": ["cls_model_dir"],
+    "table": ["table_model_dir"],
+    "layout": ["layout_model_dir"],
+    "system": ["det_model_dir", "rec_model_dir"],
+    "structure": [
+        "layout_model_dir",
+        "table_model_dir",
+        "det_model_dir",
+        "rec_model_dir",
+    ],
+}
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog invoice total amount date 2024 "
+    "table figure section page number item price quantity 3.50 12 PaddleOCR"
+).split()
+
+
+def parse_args():
+    parser = init_args()
+    parser.add_argument(
+        "--bench_suite",
+        type=str,
+        default=",".join(ALL_PIPELINES),
+        help="Comma separated pipelines out of " + ",".join(ALL_PIPELINES),
+    )
+    parser.add_argument("--bench_warmup", type=int, default=2)
+    parser.add_argument("--bench_repeat", type=int, default=5)
+    parser.add_argument(
+        "--bench_pages", type=int, default=4, help="Number of synthetic pages"
+    )
+    parser.add_argument("--bench_json", type=str, default=None)
+    parser.add_argument(
+        "--bench_compare", type=str, default=None, help="JSON of an earlier run"
+    )
+    return parser.parse_args()
+
+
+def _put_words(img, rng, x, y, width, scale):
+    # as many words as fit into width
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    words = [rng.choice(WORDS)]
+    while True:
+        word = rng.choice(WORDS)
+        if cv2.getTextSize(" ".join(words + [word]), font, scale, 2)[0][0] > width:
+            break
+        words.append(word)
+    text = " ".join(words)
+    cv2.putText(img, text, (x, y), font, scale, (0, 0, 0), 2, cv2.LINE_AA)
+    (w, h), baseline = cv2.getTextSize(text, font, scale, 2)
+    return [x, y - h - 4, x + w, y + baseline + 4]
+
+
+def make_synthetic_page(seed, width=1240, height=1754):
+    """
+    An A4 page at 150 dpi with a title, paragraphs and a table.
+    return:
+        page, boxes of the text lines, box of the table
+    """
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    lines = [_put_words(page, rng, 100, 120, 700, 1.6)]
+    y = 220
+    for _ in range(3):
+        for _ in range(int(rng.integers(5, 9))):
+            lines.append(_put_words(page, rng, 100, y, 1000, 0.9))
+            y += 42
+        y += 40
+    table_top = y
+    rows, cols, cell_h, cell_w = 8, 4, 48, 260
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = 100 + c * cell_w, table_top + r * cell_h
+            cv2.rectangle(page, (x0, y0), (x0 + cell_w, y0 + cell_h), (0, 0, 0), 1)
+            lines.append(_put_words(page, rng, x0 + 10, y0 + 34, cell_w - 20, 0.7))
+    table_box = [
+        90,
+        table_top - 10,
+        100 + cols * cell_w + 10,
+        table_top + rows * cell_h + 10,
+    ]
+    return page, lines, table_box
+
+
+def load_inputs(args):
+    """
+    return:
+        pages, text line crops, table crops
+    """
+    pages, crops, tables = [], [], []
+    if args.image_dir:
+        for image_file in get_image_file_list(args.image_dir):
+            img, flag_gif, flag_pdf = check_and_read(image_file)
+            if not flag_gif and not flag_pdf:
+                img = cv2.imread(image_file)
+            if img is None:
+                logger.info("error in loading image:{}".format(image_file))
+                continue
+            pages.extend(img if flag_pdf else [img])
+        # without the boxes of the lines the whole pages stand in for tables
+        tables = list(pages)
+    for seed in range(args.bench_pages if not args.image_dir else 0):
+        page, lines, table_box = make_synthetic_page(seed)
+        pages.append(page)
+        crops.extend(page[y0:y1, x0:x1] for x0, y0, x1, y1 in lines)
+        x0, y0, x1, y1 = table_box
+        tables.append(page[y0:y1, x0:x1])
+    return pages, crops, tables
+
+
+def _stage_summaries(*predictors):
+    stages = {}
+    for predictor in predictors:
+        timer = getattr(predictor, "stage_timer", None)
+        if timer is None:
+            continue
+        summary = timer.summary()
+        for stage, stats in summary["stages"].items():
+            stages["{}.{}".format(summary["name"], stage)] = stats
+    return stages
+
+
+def _reset_timers(*predictors):
+    for predictor in predictors:
+        timer = getattr(predictor, "stage_timer", None)
+        if timer is not None:
+            timer.reset()
+
+
+def _predictor_run(predictor, copy=False):
+    def run(item):
+        # the classifier rotates the crops of the list it is given
+        predictor(list(item) if copy else item)
+
+    return run
+
+
+def build_pipeline(name, args):
+    """
+    return:
+        function that runs the pipeline on one input and returns its
+        time_dict (or None), the predictors with stage timers, the inputs
+    """
+    if name == "det":
+        from tools.infer.predict_det import TextDetector
+
+        det = TextDetector(args)
+        return _predictor_run(det), [det], "pages"
+    if name == "rec":
+        from tools.infer.predict_rec import TextRecognizer
+
+        rec = TextRecognizer(args)
+        return _predictor_run(rec), [rec], "crop_batches"
+    if name == "cls":
+        from tools.infer.predict_cls import TextClassifier
+
+        cls = TextClassifier(args)
+        return _predictor_run(cls, copy=True), [cls], "crop_batches"
+    if name == "table":
+        from ppstructure.table.predict_structure import TableStructurer
+
+        table = TableStructurer(args)
+        return _predictor_run(table), [table], "tables"
+    if name == "layout":
+        from ppstructure.layout.predict_layout import LayoutPredictor
+
+        layout = LayoutPredictor(args)
+        return _predictor_run(layout), [layout], "pages"
+    if name == "system":
+        from tools.infer.predict_system import TextSystem
+
+        text_sys = TextSystem(args)
+        predictors = [text_sys.text_detector, text_sys.text_recognizer]
+        if text_sys.use_angle_cls:
+            predictors.append(text_sys.text_classifier)
+        return lambda img: text_sys(img)[2], predictors, "pages"
+    from ppstructure.predict_system import StructureSystem
+
+    structure_sys = StructureSystem(args)
+    return lambda img: structure_sys(img)[1], [], "pages"
+
+
+def run_pipeline(name, args, inputs):
+    run, predictors, input_key = build_pipeline(name, args)
+    items = inputs[input_key]
+    if len(items) == 0:
+        return {"skipped": "no {}".format(input_key)}
+    for i in range(args.bench_warmup):
+        run(items[i % len(items)])
+    _reset_timers(*predictors)
+
+    latencies = []
+    pipeline_stages = {}
+    rss_before = current_rss_mb()
+    with PeakMemorySampler() as memory:
+        st = time.perf_counter()
+        for _ in range(args.bench_repeat):
+            for item in items:
+                call_st = time.perf_counter()
+                time_dict = run(item)
+                latencies.append(time.perf_counter() - call_st)
+                for stage, seconds in (time_dict or {}).items():
+                    if isinstance(seconds, (int, float)) and stage != "all":
+                        pipeline_stages.setdefault(stage, []).append(seconds)
+        elapse = time.perf_counter() - st
+
+    num_items = len(items) * args.bench_repeat
+    if input_key == "crop_batches":
+        num_items = sum(len(batch) for batch in items) * args.bench_repeat
+    stages = {stage: latency_stats(values) for stage, values in pipeline_stages.items()}
+    stages.update(_stage_summaries(*predictors))
+    return {
+        "inputs": input_key,
+        "calls": latency_stats(latencies),
+        "items": num_items,
+        "items_per_second": num_items / elapse,
+        "stages": stages,
+        "peak_rss_mb": memory.peak_mb,
+        "rss_growth_mb": (
+            None
+            if rss_before is None or memory.peak_mb is None
+            else memory.peak_mb - rss_before
+        ),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=__dir__,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(report, baseline):
+    logger.info(
+        "------------- compared with {} -------------".format(
+            baseline["meta"].get("revision")
+        )
+    )
+    for name, result in report["pipelines"].items():
+        base = baseline["pipelines"].get(name)
+        if not base or "calls" not in base or "calls" not in result:
+            continue
+        logger.info(
+            "{}: p50 {:.2f} -> {:.2f} ms ({:+.1%}), p95 {:.2f} -> {:.2f} ms ({:+.1%}), "
+            "throughput {:.2f} -> {:.2f} items/s".format(
+                name,
+                base["calls"]["p50"],
+                result["calls"]["p50"],
+                result["calls"]["p50"] / base["calls"]["p50"] - 1,
+                base["calls"]["p95"],
+                result["calls"]["p95"],
+                result["calls"]["p95"] / base["calls"]["p95"] - 1,
+                base["items_per_second"],
+                result["items_per_second"],
+            )
+        )
+
+
+def main(args):
+    args.benchmark = True
+    pages, crops, tables = load_inputs(args)
+    if not crops:
+        # the text lines of real pages are cut out by the detector
+        if args.det_model_dir:
+            from tools.infer.predict_det import TextDetector
+            from tools.infer.utility import get_rotate_crop_image
+
+            det = TextDetector(args)
+            for page in pages:
+                dt_boxes, _ = det(page)
+                crops.extend(get_rotate_crop_image(page, box) for box in dt_boxes)
+            del det
+    inputs = {
+        "pages": pages,
+        "tables": tables,
+        "crops": crops,
+        "crop_batches": [
+            crops[beg : beg + args.rec_batch_num * 4]
+            for beg in range(0, len(crops), args.rec_batch_num * 4)
+        ],
+    }
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "use_gpu": args.use_gpu,
+            "enable_mkldnn": args.enable_mkldnn,
+            "cpu_threads": args.cpu_threads,
+            "precision": args.precision,
+            "synthetic": not args.image_dir,
+            "pages": len(pages),
+            "crops": len(crops),
+            "warmup": args.bench_warmup,
+            "repeat": args.bench_repeat,
+        },
+        "pipelines": {},
+    }
+    for name in args.bench_suite.split(","):
+        name = name.strip()
+        if name not in ALL_PIPELINES:
+            logger.warning("unknown pipeline {}".format(name))
+            continue
+        missing = [key for key in REQUIRED_MODELS[name] if not getattr(args, key)]
+        if missing:
+            logger.info("skip {}, not set: {}".format(name, ", ".join(missing)))
+            report["pipelines"][name] = {"skipped": "not set: " + ", ".join(missing)}
+            continue
+        result = run_pipeline(name, args, inputs)
+        report["pipelines"][name] = result
+        if "calls" not in result:
+            continue
+        logger.info(
+            "{}: {} items, {:.2f} items/s, p50 {:.2f} ms, p95 {:.2f} ms, "
+            "p99 {:.2f} ms, peak rss {:.1f} MB".format(
+                name,
+                result["items"],
+                result["items_per_second"],
+                result["calls"]["p50"],
+                result["calls"]["p95"],
+                result["calls"]["p99"],
+                result["peak_rss_mb"] or 0,
+            )
+        )
+        for stage, stats in result["stages"].items():
+            if stats.get("count"):
+                logger.info(
+                    "    {}: p50 {:.2f} ms, p95 {:.2f} ms, p99 {:.2f} ms".format(
+                        stage, stats["p50"], stats["p95"], stats["p99"]
+                    )
+                )
+
+    if args.bench_json:
+        with open(args.bench_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        logger.info("report saved to {}".format(args.bench_json))
+    if args.bench_compare:
+        with open(args.bench_compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,183 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Report where the cold start of the inference modules goes. Every module is
+imported in a fresh interpreter with `python -X importtime`, the import time
+is split by top level package and the slowest modules are listed, e.g.
+
+    python3 tools/infer/import_profile.py --modules=tools.infer.predict_system
+    python3 tools/infer/import_profile.py --budget_ms=1500 --repeat=3
+
+With --budget_ms the exit code is 1 when a module takes longer to import.
+"""
+import os
+import sys
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(__dir__)
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
+
+import argparse
+import json
+import subprocess
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+ROOT = os.path.abspath(os.path.join(__dir__, "../.."))
+# printed to stderr between the startup of the interpreter and the import
+MARKER = "--- import_profile ---"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--modules",
+        type=str,
+        default="tools.infer.predict_system,ppstructure.predict_system",
+        help="comma separated",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget_ms", type=float, default=0)
+    parser.add_argument("--json", type=str, default=None)
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    """
+    args:
+        stderr(str): stderr of `python -X importtime`
+    return:
+        list of (module, depth, self_us, cumulative_us) in the order printed,
+        only the imports after MARKER
+    """
+    records = []
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1 :]
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # the header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((name.strip(), depth, int(fields[0]), int(fields[1].strip())))
+    return records
+
+
+def profile_module(module):
+    """
+    args:
+        module(str): dotted name of the module to import
+    return:
+        list of (module, depth, self_us, cumulative_us)
+    """
+    code = "import sys; print({!r}, file=sys.stderr, flush=True); import {}".format(
+        MARKER, module
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [ROOT] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(
+            "import {} failed:\n{}".format(module, proc.stderr.strip()[-2000:])
+        )
+    return parse_importtime(proc.stderr)
+
+
+def summarize(records, top):
+    """
+    args:
+        records(list): output of parse_importtime
+        top(int): number of slowest modules to keep
+    return:
+        dict with the total, the self time of every top level package and the
+        slowest modules, times in milliseconds
+    """
+    packages = {}
+    for name, _, self_us, _ in records:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    slowest = sorted(records, key=lambda record: record[2], reverse=True)[:top]
+    return {
+        "total_ms": sum(cum for _, depth, _, cum in records if depth == 0) / 1000,
+        "modules": len(records),
+        "packages": {
+            package: us / 1000
+            for package, us in sorted(
+                packages.items(), key=lambda item: item[1], reverse=True
+            )
+        },
+        "slowest": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cum / 1000}
+            for name, _, self_us, cum in slowest
+        ],
+    }
+
+
+def main(args):
+    report = {}
+    over_budget = []
+    for module in args.modules.split(","):
+        # the fastest run has the least noise of the disk cache and the machine
+        runs = [profile_module(module) for _ in range(max(args.repeat, 1))]
+        records = min(runs, key=lambda run: sum(cum for _, d, _, cum in run if d == 0))
+        summary = summarize(records, args.top)
+        report[module] = summary
+
+        logger.info("---------------- import {} ----------------".format(module))
+        logger.info(
+            "total: {:.1f} ms, modules: {}".format(
+                summary["total_ms"], summary["modules"]
+            )
+        )
+        for package, ms in list(summary["packages"].items())[: args.top]:
+            share = ms / summary["total_ms"] * 100 if summary["total_ms"] else 0
+            logger.info("package {}: {:.1f} ms ({:.0f}%)".format(package, ms, share))
+        for item in summary["slowest"]:
+            logger.info(
+                "module {}: self {:.1f} ms, cumulative {:.1f} ms".format(
+                    item["module"], item["self_ms"], item["cumulative_ms"]
+                )
+            )
+        if args.budget_ms > 0 and summary["total_ms"] > args.budget_ms:
+            over_budget.append(module)
+            logger.warning(
+                "import {} takes {:.1f} ms, over the budget of {:.1f} ms".format(
+                    module, summary["total_ms"], args.budget_ms
+                )
+            )
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,339 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pipelined execution of TextSystem: detection, angle classification and
+recognition run as separate stages connected by bounded queues, so that
+detection of image N+1 overlaps recognition of image N and the Python pre-
+and post-processing of one stage runs while another stage is inside its
+predictor.
+
+Every worker thread owns its own model instance (the first worker of a stage
+reuses the one of the wrapped TextSystem), because a paddle predictor must not
+be run from several threads at once.
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+
+import tools.infer.predict_cls as predict_cls
+import tools.infer.predict_det as predict_det
+import tools.infer.predict_rec as predict_rec
+import tools.infer.utility as utility
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+__all__ = ["TextSystemPipeline"]
+
+_END = object()
+
+
+class _Task(object):
+    __slots__ = (
+        "seq",
+        "item",
+        "img",
+        "ori_im",
+        "dt_boxes",
+        "crops",
+        "result",
+        "time_dict",
+        "start",
+        "error",
+    )
+
+    def __init__(self, seq, item, img):
+        self.seq = seq
+        self.item = item
+        self.img = img
+        self.ori_im = None
+        self.dt_boxes = None
+        self.crops = None
+        self.result = None
+        self.time_dict = {"det": 0, "crop": 0, "rec": 0, "cls": 0, "all": 0}
+        self.start = time.time()
+        self.error = None
+
+
+class _Stage(object):
+    def __init__(self, name, models, func, in_queue, out_queue, next_workers):
+        self.name = name
+        self.models = models
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.next_workers = next_workers
+        self.lock = threading.Lock()
+        self.finished_workers = 0
+        self.items = 0
+        self.busy_time = 0.0
+        self.queue_depths = []
+
+
+class TextSystemPipeline(object):
+    """
+    args:
+        text_system(TextSystem): the system whose models and settings are used
+        det_workers, cls_workers, rec_workers(int): worker threads per stage,
+            every extra worker loads another copy of the stage model
+        queue_size(int): capacity of the queues between the stages
+        cls(bool): run the angle classifier when the system has it enabled
+    """
+
+    def __init__(
+        self,
+        text_system,
+        det_workers=1,
+        cls_workers=1,
+        rec_workers=1,
+        queue_size=4,
+        cls=True,
+    ):
+        self.text_system = text_system
+        self.queue_size = max(1, queue_size)
+        args = text_system.args
+
+        self.det_models = [text_system.text_detector] + [
+            predict_det.TextDetector(args) for _ in range(det_workers - 1)
+        ]
+        self.use_cls = bool(text_system.use_angle_cls and cls)
+        self.cls_models = []
+        if self.use_cls:
+            self.cls_models = [text_system.text_classifier] + [
+                predict_cls.TextClassifier(args) for _ in range(cls_workers - 1)
+            ]
+        self.rec_models = [text_system.text_recognizer] + [
+            predict_rec.TextRecognizer(args) for _ in range(rec_workers - 1)
+        ]
+        self.stats = {}
+
+    def _run_det(self, detector, task):
+        text_system = self.text_system
+        if task.img is None:
+            logger.debug("no valid image provided")
+            task.result = (None, None, task.time_dict)
+            return
+        task.img = task.ori_im = utility.readonly_view(
+            task.img, text_system.debug_readonly_images
+        )
+        dt_boxes, elapse = detector(task.img)
+        task.time_dict["det"] = elapse
+        if dt_boxes is None:
+            task.result = (None, None, task.time_dict)
+            return
+        dt_boxes = text_system._sort_boxes(dt_boxes)
+        crop_start = time.time()
+        task.crops = text_system._get_crops(task.ori_im, dt_boxes)
+        task.time_dict["crop"] = time.time() - crop_start
+        task.dt_boxes = dt_boxes
+        task.ori_im = None
+
+    def _run_cls(self, classifier, task):
+        task.crops, _, elapse = classifier(task.crops)
+        task.time_dict["cls"] = elapse
+
+    def _run_rec(self, recognizer, task):
+        rec_res, elapse = recognizer(task.crops)
+        task.time_dict["rec"] = elapse
+        filter_boxes, filter_rec_res = self.text_system._filter_rec_res(
+            task.dt_boxes, rec_res
+        )
+        task.crops = None
+        task.result = (filter_boxes, filter_rec_res, task.time_dict)
+
+    def _build_stages(self):
+        specs = [("det", self.det_models, self._run_det)]
+        if self.use_cls:
+            specs.append(("cls", self.cls_models, self._run_cls))
+        specs.append(("rec", self.rec_models, self._run_rec))
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in specs]
+        queues.append(queue.Queue())
+        stages = []
+        for i, (name, models, func) in enumerate(specs):
+            next_workers = len(specs[i + 1][1]) if i + 1 < len(specs) else 1
+            stages.append(
+                _Stage(name, models, func, queues[i], queues[i + 1], next_workers)
+            )
+        return stages, queues[0], queues[-1]
+
+    def _put(self, q, obj, stop_event):
+        while not stop_event.is_set():
+            try:
+                q.put(obj, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(self, stage, model, stop_event):
+        while not stop_event.is_set():
+            try:
+                task = stage.in_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if task is _END:
+                with stage.lock:
+                    stage.finished_workers += 1
+                    last = stage.finished_workers == len(stage.models)
+                if last:
+                    for _ in range(stage.next_workers):
+                        self._put(stage.out_queue, _END, stop_event)
+                return
+            stage.queue_depths.append(stage.in_queue.qsize())
+            if task.error is None and task.result is None:
+                st = time.time()
+                try:
+                    stage.func(model, task)
+                except Exception as e:
+                    task.error = e
+                with stage.lock:
+                    stage.items += 1
+                    stage.busy_time += time.time() - st
+            if not self._put(stage.out_queue, task, stop_event):
+                return
+
+    def _feed(self, items, get_image, first_queue, workers, stop_event, feed_error):
+        try:
+            for seq, item in enumerate(items):
+                task = _Task(seq, item, get_image(item))
+                if not self._put(first_queue, task, stop_event):
+                    return
+        except Exception as e:
+            feed_error.append(e)
+        for _ in range(workers):
+            self._put(first_queue, _END, stop_event)
+
+    def imap(self, items, get_image=None):
+        """
+        Run the pipeline over an iterable and yield (item, result, latency) in
+        input order, where result is (filter_boxes, filter_rec_res, time_dict)
+        as returned by TextSystem.__call__ and latency is the time the item
+        spent in the pipeline.
+        args:
+            items: iterable of images, or of arbitrary payloads together with
+                get_image
+            get_image: function that returns the image of an item
+        """
+        get_image = get_image or (lambda item: item)
+        stages, first_queue, out_queue = self._build_stages()
+        stop_event = threading.Event()
+        feed_error = []
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(
+                    items,
+                    get_image,
+                    first_queue,
+                    len(stages[0].models),
+                    stop_event,
+                    feed_error,
+                ),
+                daemon=True,
+            )
+        ]
+        for stage in stages:
+            for model in stage.models:
+                threads.append(
+                    threading.Thread(
+                        target=self._worker,
+                        args=(stage, model, stop_event),
+                        daemon=True,
+                    )
+                )
+        start = time.time()
+        for t in threads:
+            t.start()
+
+        pending = {}
+        next_seq = 0
+        latencies = []
+        try:
+            while True:
+                task = out_queue.get()
+                if task is _END:
+                    break
+                task.time_dict["all"] = time.time() - task.start
+                pending[task.seq] = task
+                while next_seq in pending:
+                    task = pending.pop(next_seq)
+                    next_seq += 1
+                    if task.error is not None:
+                        raise task.error
+                    latencies.append(task.time_dict["all"])
+                    yield task.item, task.result, task.time_dict["all"]
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            stop_event.set()
+            self.stats = self._collect_stats(stages, time.time() - start, latencies)
+
+    def __call__(self, img_list):
+        """
+        Run the pipeline over a list of images and return the results of
+        TextSystem.__call__ in the same order.
+        """
+        return [result for _, result, _ in self.imap(img_list)]
+
+    def _collect_stats(self, stages, wall_time, latencies):
+        wall_time = max(wall_time, 1e-6)
+        stats = {
+            "items": len(latencies),
+            "wall_time": wall_time,
+            "throughput": len(latencies) / wall_time,
+            "latency_avg": float(np.mean(latencies)) if latencies else 0.0,
+            "latency_max": float(np.max(latencies)) if latencies else 0.0,
+            "stages": {},
+        }
+        for stage in stages:
+            depths = stage.queue_depths
+            stats["stages"][stage.name] = {
+                "workers": len(stage.models),
+                "items": stage.items,
+                "busy_time": stage.busy_time,
+                "utilization": stage.busy_time / (wall_time * len(stage.models)),
+                "queue_depth_avg": float(np.mean(depths)) if depths else 0.0,
+                "queue_depth_max": int(np.max(depths)) if depths else 0,
+            }
+        return stats
+
+    def log_stats(self):
+        stats = self.stats
+        if not stats:
+            return
+        logger.info(
+            "pipeline: {} images in {:.3f}s, {:.3f} img/s, latency avg: {:.3f}s, max: {:.3f}s".format(
+                stats["items"],
+                stats["wall_time"],
+                stats["throughput"],
+                stats["latency_avg"],
+                stats["latency_max"],
+            )
+        )
+        for name, stage in stats["stages"].items():
+            logger.info(
+                "  {}: workers: {}, items: {}, busy: {:.3f}s, utilization: {:.1%}, "
+                "input queue depth avg: {:.2f}, max: {}".format(
+                    name,
+                    stage["workers"],
+                    stage["items"],
+                    stage["busy_time"],
+                    stage["utilization"],
+                    stage["queue_depth_avg"],
+                    stage["queue_depth_max"],
+                )
+            )
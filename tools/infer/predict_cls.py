@@ -21,7 +21,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
 os.environ["FLAGS_allocator_strategy"] = "auto_growth"
 
 import cv2
-import copy
 import numpy as np
 import math
 import time
@@ -29,13 +28,16 @@ import traceback
 
 import tools.infer.utility as utility
 from ppocr.postprocess import build_post_process
+from ppocr.utils.benchmark import StageTimer
 from ppocr.utils.logging import get_logger
+from ppocr.utils.tracing import span
 from ppocr.utils.utility import get_image_file_list, check_and_read
+from tools.infer.predictor_pool import PooledPredictorMixin
 
 logger = get_logger()
 
 
-class TextClassifier(object):
+class TextClassifier(PooledPredictorMixin):
     def __init__(self, args):
         if os.path.exists(f"{args.cls_model_dir}/inference.yml"):
             model_config = utility.load_config(f"{args.cls_model_dir}/inference.yml")
@@ -56,13 +58,11 @@ class TextClassifier(object):
             "label_list": args.label_list,
         }
         self.postprocess_op = build_post_process(postprocess_params)
-        (
-            self.predictor,
-            self.input_tensor,
-            self.output_tensors,
-            _,
-        ) = utility.create_predictor(args, "cls", logger)
+        self.predictor_pool = utility.create_predictor_pool(args, "cls", logger)
         self.use_onnx = args.use_onnx
+        self.benchmark = args.benchmark
+        if args.benchmark:
+            self.stage_timer = StageTimer("cls")
 
     def resize_norm_img(self, img):
         imgC, imgH, imgW = self.cls_image_shape
@@ -87,7 +87,12 @@ class TextClassifier(object):
         return padding_im
 
     def __call__(self, img_list):
-        img_list = copy.deepcopy(img_list)
+        with span("cls.predict", crop_num=len(img_list)):
+            return self._predict(img_list)
+
+    def _predict(self, img_list):
+        # rotated crops replace the list entries, the images are not modified
+        img_list = list(img_list)
         img_num = len(img_list)
         # Calculate the aspect ratio of all text bars
         width_list = []
@@ -104,6 +109,8 @@ class TextClassifier(object):
             norm_img_batch = []
             max_wh_ratio = 0
             starttime = time.time()
+            if self.benchmark:
+                self.stage_timer.start()
             for ino in range(beg_img_no, end_img_no):
                 h, w = img_list[indices[ino]].shape[0:2]
                 wh_ratio = w * 1.0 / h
@@ -114,17 +121,24 @@ class TextClassifier(object):
                 norm_img_batch.append(norm_img)
             norm_img_batch = np.concatenate(norm_img_batch)
             norm_img_batch = norm_img_batch.copy()
-
-            if self.use_onnx:
-                input_dict = {}
-                input_dict[self.input_tensor.name] = norm_img_batch
-                outputs = self.predictor.run(self.output_tensors, input_dict)
-                prob_out = outputs[0]
-            else:
-                self.input_tensor.copy_from_cpu(norm_img_batch)
-                self.predictor.run()
-                prob_out = self.output_tensors[0].copy_to_cpu()
-                self.predictor.try_shrink_memory()
+            if self.benchmark:
+                self.stage_timer.stamp()
+
+            with span(
+                "cls.infer", shape=norm_img_batch.shape, batch_size=len(norm_img_batch)
+            ), self.borrow_predictor():
+                if self.use_onnx:
+                    input_dict = {}
+                    input_dict[self.input_tensor.name] = norm_img_batch
+                    outputs = self.predictor.run(self.output_tensors, input_dict)
+                    prob_out = outputs[0]
+                else:
+                    self.input_tensor.copy_from_cpu(norm_img_batch)
+                    self.predictor.run()
+                    prob_out = self.output_tensors[0].copy_to_cpu()
+                    self.predictor.try_shrink_memory()
+            if self.benchmark:
+                self.stage_timer.stamp()
             cls_result = self.postprocess_op(prob_out)
             elapse += time.time() - starttime
             for rno in range(len(cls_result)):
@@ -134,6 +148,8 @@ class TextClassifier(object):
                     img_list[indices[beg_img_no + rno]] = cv2.rotate(
                         img_list[indices[beg_img_no + rno]], 1
                     )
+            if self.benchmark:
+                self.stage_timer.end(stamp=True, items=end_img_no - beg_img_no)
         return img_list, cls_res, elapse
 
 
@@ -26,14 +26,17 @@ import time
 import sys
 
 import tools.infer.utility as utility
+from ppocr.utils.benchmark import StageTimer
 from ppocr.utils.logging import get_logger
+from ppocr.utils.tracing import span
 from ppocr.utils.utility import get_image_file_list, check_and_read
 from ppocr.data import create_operators, transform
 from ppocr.postprocess import build_post_process
+from tools.infer.predictor_pool import PooledPredictorMixin
 import json
 
 
-class TextDetector(object):
+class TextDetector(PooledPredictorMixin):
     def __init__(self, args, logger=None):
         if os.path.exists(f"{args.det_model_dir}/inference.yml"):
             model_config = utility.load_config(f"{args.det_model_dir}/inference.yml")
@@ -142,12 +145,8 @@ class TextDetector(object):
 
         self.preprocess_op = create_operators(pre_process_list)
         self.postprocess_op = build_post_process(postprocess_params)
-        (
-            self.predictor,
-            self.input_tensor,
-            self.output_tensors,
-            self.config,
-        ) = utility.create_predictor(args, "det", logger)
+        self.predictor_pool = utility.create_predictor_pool(args, "det", logger)
+        self.config = self.predictor_pool.config
 
         if self.use_onnx:
             img_h, img_w = self.input_tensor.shape[2:]
@@ -158,26 +157,13 @@ class TextDetector(object):
                     "DetResizeForTest": {"image_shape": [img_h, img_w]}
                 }
         self.preprocess_op = create_operators(pre_process_list)
+        self.batch_num = getattr(args, "det_batch_num", 1)
+        # resized shapes are multiples of 32, nearby shapes share a padded batch
+        self.bucket_step = 128
+        self.tile_merge_threshold = 10
 
         if args.benchmark:
-            import auto_log
-
-            pid = os.getpid()
-            gpu_id = utility.get_infer_gpuid()
-            self.autolog = auto_log.AutoLogger(
-                model_name="det",
-                model_precision=args.precision,
-                batch_size=1,
-                data_shape="dynamic",
-                save_path=None,  # not used if logger is not None
-                inference_config=self.config,
-                pids=pid,
-                process_name=None,
-                gpu_ids=gpu_id if args.use_gpu else None,
-                time_keys=["preprocess_time", "inference_time", "postprocess_time"],
-                warmup=2,
-                logger=logger,
-            )
+            self.stage_timer = StageTimer("det", warmup=2)
 
     def order_points_clockwise(self, pts):
         rect = np.zeros((4, 2), dtype="float32")
@@ -238,39 +224,23 @@ class TextDetector(object):
         dt_boxes = np.array(dt_boxes_new)
         return dt_boxes
 
-    def predict(self, img):
-        ori_im = img.copy()
-        data = {"image": img}
-
-        st = time.time()
-
-        if self.args.benchmark:
-            self.autolog.times.start()
-
-        data = transform(data, self.preprocess_op)
-        img, shape_list = data
-        if img is None:
-            return None, 0
-        img = np.expand_dims(img, axis=0)
-        shape_list = np.expand_dims(shape_list, axis=0)
-        img = img.copy()
-
-        if self.args.benchmark:
-            self.autolog.times.stamp()
-        if self.use_onnx:
-            input_dict = {}
-            input_dict[self.input_tensor.name] = img
-            outputs = self.predictor.run(self.output_tensors, input_dict)
-        else:
+    def _run_predictor(self, img):
+        with span(
+            "det.infer", shape=img.shape, batch_size=img.shape[0]
+        ), self.borrow_predictor():
+            if self.use_onnx:
+                input_dict = {}
+                input_dict[self.input_tensor.name] = img
+                return self.predictor.run(self.output_tensors, input_dict)
             self.input_tensor.copy_from_cpu(img)
             self.predictor.run()
             outputs = []
             for output_tensor in self.output_tensors:
                 output = output_tensor.copy_to_cpu()
                 outputs.append(output)
-            if self.args.benchmark:
-                self.autolog.times.stamp()
+            return outputs
 
+    def _outputs_to_preds(self, outputs):
         preds = {}
         if self.det_algorithm == "EAST":
             preds["f_geo"] = outputs[0]
@@ -290,20 +260,177 @@ class TextDetector(object):
             preds["score"] = outputs[1]
         else:
             raise NotImplementedError
+        return preds
 
+    def _postprocess(self, preds, shape_list, ori_shape):
         post_result = self.postprocess_op(preds, shape_list)
         dt_boxes = post_result[0]["points"]
 
         if self.args.det_box_type == "poly":
-            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_im.shape)
+            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_shape)
         else:
-            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_im.shape)
+            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_shape)
+        return dt_boxes
+
+    def predict(self, img):
+        with span("det.predict", shape=img.shape) as det_span:
+            dt_boxes, elapse = self._predict(img)
+            det_span.set(box_num=0 if dt_boxes is None else len(dt_boxes))
+        return dt_boxes, elapse
+
+    def _predict(self, img):
+        ori_shape = img.shape
+        data = {"image": img}
+
+        st = time.time()
 
         if self.args.benchmark:
-            self.autolog.times.end(stamp=True)
+            self.stage_timer.start()
+
+        data = transform(data, self.preprocess_op)
+        img, shape_list = data
+        if img is None:
+            return None, 0
+        img = np.expand_dims(img, axis=0)
+        shape_list = np.expand_dims(shape_list, axis=0)
+        img = np.ascontiguousarray(img)
+
+        if self.args.benchmark:
+            self.stage_timer.stamp()
+        outputs = self._run_predictor(img)
+        if self.args.benchmark:
+            self.stage_timer.stamp()
+
+        preds = self._outputs_to_preds(outputs)
+        dt_boxes = self._postprocess(preds, shape_list, ori_shape)
+
+        if self.args.benchmark:
+            self.stage_timer.end(stamp=True)
         et = time.time()
         return dt_boxes, et - st
 
+    def _supports_batch(self):
+        # the single map of these models can be cropped back to every image
+        # of a padded batch, the other heads are resized to the whole input
+        if self.det_algorithm not in ["DB", "PSE", "DB++"]:
+            return False
+        if self.use_onnx:
+            batch_dim = self.input_tensor.shape[0]
+            return not isinstance(batch_dim, int) or batch_dim != 1
+        return True
+
+    def predict_batch(self, img_list):
+        """
+        Detect text in several images with batched predictor calls. The images
+        are resized one by one like in predict, grouped into buckets of similar
+        resized shape and every bucket runs zero padded to its largest shape,
+        det_batch_num images per call. The prediction maps are cropped back to
+        the images before the postprocess. The padding changes the maps near
+        the borders of the smaller images, so their boxes can differ from those
+        of predict.
+        args:
+            img_list(list): images in BGR format
+        return:
+            list of dt_boxes (None for images that could not be resized), the
+            total elapse
+        """
+        if self.batch_num <= 1 or len(img_list) <= 1 or not self._supports_batch():
+            results = [self.predict(img) for img in img_list]
+            return [res[0] for res in results], sum(res[1] for res in results)
+
+        st = time.time()
+        dt_boxes_list = [None] * len(img_list)
+        buckets = {}
+        for i, img in enumerate(img_list):
+            pre_st = time.perf_counter()
+            norm_img, shape = transform({"image": img}, self.preprocess_op)
+            if norm_img is None:
+                continue
+            h, w = norm_img.shape[1:]
+            key = (-(-h // self.bucket_step), -(-w // self.bucket_step))
+            pre_time = time.perf_counter() - pre_st
+            buckets.setdefault(key, []).append((i, norm_img, shape, pre_time))
+
+        for bucket in buckets.values():
+            for beg in range(0, len(bucket), self.batch_num):
+                items = bucket[beg : beg + self.batch_num]
+                if self.args.benchmark:
+                    # the resize of the images counts towards their batch
+                    self.stage_timer.start(sum(item[3] for item in items))
+                pad_h = max(item[1].shape[1] for item in items)
+                pad_w = max(item[1].shape[2] for item in items)
+                batch = np.zeros(
+                    (len(items), items[0][1].shape[0], pad_h, pad_w),
+                    dtype=np.float32,
+                )
+                for k, (_, norm_img, _, _) in enumerate(items):
+                    batch[k, :, : norm_img.shape[1], : norm_img.shape[2]] = norm_img
+                if self.args.benchmark:
+                    self.stage_timer.stamp()
+                maps = self._outputs_to_preds(self._run_predictor(batch))["maps"]
+                if self.args.benchmark:
+                    self.stage_timer.stamp()
+                map_h, map_w = maps.shape[2:]
+                for k, (i, norm_img, shape, _) in enumerate(items):
+                    h = int(np.ceil(norm_img.shape[1] * map_h / pad_h))
+                    w = int(np.ceil(norm_img.shape[2] * map_w / pad_w))
+                    preds = {"maps": maps[k : k + 1, :, :h, :w]}
+                    dt_boxes_list[i] = self._postprocess(
+                        preds, np.expand_dims(shape, axis=0), img_list[i].shape
+                    )
+                if self.args.benchmark:
+                    self.stage_timer.end(stamp=True, items=len(items))
+        return dt_boxes_list, time.time() - st
+
+    def detect_tiled(self, img, tile_size, overlap):
+        """
+        Detect text in a large image (engineering drawings, posters scanned at
+        a high dpi) at full resolution. The image is cut into overlapping
+        tiles that are detected in batches, the boxes of all tiles are then
+        combined by utility.merge_tile_boxes.
+        args:
+            img: image in BGR format
+            tile_size(int): side of the tiles, should not exceed
+                det_limit_side_len so that the tiles are not downscaled
+            overlap(int): overlap of neighbouring tiles, should exceed the
+                height of the largest text line
+        return:
+            dt_boxes, elapse
+        """
+        img_h, img_w = img.shape[:2]
+        tiles = list(utility.tile_generator(img, tile_size, overlap))
+        with span("det.tiles", shape=img.shape, tile_num=len(tiles)):
+            dt_boxes_list, elapse = self.predict_batch([tile for tile, _, _ in tiles])
+        # a few pixels of slack for boxes that end right at the tile border
+        margin = 2
+        all_boxes = []
+        cut = []
+        for (tile, v_start, h_start), dt_boxes in zip(tiles, dt_boxes_list):
+            if dt_boxes is None or len(dt_boxes) == 0:
+                continue
+            tile_h, tile_w = tile.shape[:2]
+            for box in dt_boxes:
+                x0, y0 = box.min(axis=0)
+                x1, y1 = box.max(axis=0)
+                # only the borders shared with another tile cut a box
+                cut.append(
+                    (h_start > 0 and x0 <= margin)
+                    or (h_start + tile_w < img_w and x1 >= tile_w - 1 - margin)
+                    or (v_start > 0 and y0 <= margin)
+                    or (v_start + tile_h < img_h and y1 >= tile_h - 1 - margin)
+                )
+                all_boxes.append(box + np.array([h_start, v_start], dtype=np.float32))
+        with span("det.merge", box_num=len(all_boxes)) as merge_span:
+            dt_boxes = utility.merge_tile_boxes(
+                all_boxes, cut, tolerance=self.tile_merge_threshold
+            )
+            merge_span.set(merged_num=len(dt_boxes))
+        if self.args.det_box_type == "poly":
+            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, img.shape)
+        else:
+            dt_boxes = self.filter_tag_det_res(dt_boxes, img.shape)
+        return dt_boxes, elapse
+
     def __call__(self, img, use_slice=False):
         # For image like poster with one side much greater than the other side,
         # splitting recursively and processing with overlap to enhance performance.
@@ -498,4 +625,4 @@ if __name__ == "__main__":
         f.writelines(save_results)
         f.close()
     if args.benchmark:
-        text_detector.autolog.report()
+        text_detector.stage_timer.report(logger)
@@ -26,17 +26,19 @@ import numpy as np
 import math
 import time
 import traceback
-import paddle
 
 import tools.infer.utility as utility
 from ppocr.postprocess import build_post_process
+from ppocr.utils.benchmark import StageTimer
 from ppocr.utils.logging import get_logger
+from ppocr.utils.tracing import span, record_span
 from ppocr.utils.utility import get_image_file_list, check_and_read
+from tools.infer.predictor_pool import PooledPredictorMixin
 
 logger = get_logger()
 
 
-class TextRecognizer(object):
+class TextRecognizer(PooledPredictorMixin):
     def __init__(self, args, logger=None):
         if os.path.exists(f"{args.rec_model_dir}/inference.yml"):
             model_config = utility.load_config(f"{args.rec_model_dir}/inference.yml")
@@ -70,6 +72,12 @@ class TextRecognizer(object):
         self.rec_image_shape = [int(v) for v in args.rec_image_shape.split(",")]
         self.rec_batch_num = args.rec_batch_num
         self.rec_algorithm = args.rec_algorithm
+        self.rec_width_buckets = sorted(
+            int(v)
+            for v in getattr(args, "rec_width_buckets", "").split(",")
+            if v.strip()
+        )
+        self.batch_stats = []
         postprocess_params = {
             "name": "CTCLabelDecode",
             "character_dict_path": args.rec_char_dict_path,
@@ -173,33 +181,12 @@ class TextRecognizer(object):
             }
         self.postprocess_op = build_post_process(postprocess_params)
         self.postprocess_params = postprocess_params
-        (
-            self.predictor,
-            self.input_tensor,
-            self.output_tensors,
-            self.config,
-        ) = utility.create_predictor(args, "rec", logger)
+        self.predictor_pool = utility.create_predictor_pool(args, "rec", logger)
+        self.config = self.predictor_pool.config
         self.benchmark = args.benchmark
         self.use_onnx = args.use_onnx
         if args.benchmark:
-            import auto_log
-
-            pid = os.getpid()
-            gpu_id = utility.get_infer_gpuid()
-            self.autolog = auto_log.AutoLogger(
-                model_name="rec",
-                model_precision=args.precision,
-                batch_size=args.rec_batch_num,
-                data_shape="dynamic",
-                save_path=None,  # not used if logger is not None
-                inference_config=self.config,
-                pids=pid,
-                process_name=None,
-                gpu_ids=gpu_id if args.use_gpu else None,
-                time_keys=["preprocess_time", "inference_time", "postprocess_time"],
-                warmup=0,
-                logger=logger,
-            )
+            self.stage_timer = StageTimer("rec")
         self.return_word_box = args.return_word_box
 
     def resize_norm_img(self, img, max_wh_ratio):
@@ -577,7 +564,119 @@ class TextRecognizer(object):
         img = img.astype("float32")
         return img
 
+    _fixed_width_algorithms = [
+        "SRN",
+        "SAR",
+        "NRTR",
+        "ViTSTR",
+        "RFL",
+        "RARE",
+        "SVTR",
+        "SATRN",
+        "ParseQ",
+        "CPPD",
+        "CPPDPadding",
+        "VisionLAN",
+        "PREN",
+        "SPIN",
+        "ABINet",
+        "RobustScanner",
+        "CAN",
+        "LaTeXOCR",
+    ]
+
+    def _use_width_buckets(self):
+        # only the default resize_norm_img path pads to a dynamic batch width
+        return (
+            len(self.rec_width_buckets) > 0
+            and self.rec_algorithm not in self._fixed_width_algorithms
+        )
+
+    def snap_width_bucket(self, wh_ratio):
+        """
+        Return the smallest configured bucket width that fits a crop with the
+        given aspect ratio, or None if the crop is wider than every bucket.
+        """
+        imgH = self.rec_image_shape[1]
+        width = math.ceil(imgH * wh_ratio)
+        for bucket in self.rec_width_buckets:
+            if bucket >= width:
+                return bucket
+        return None
+
+    def get_batch_ranges(self, sorted_wh_ratios, batch_num):
+        """
+        Split crops sorted by aspect ratio into (begin, end, wh_ratio) batches.
+        Without width buckets this is the plain rec_batch_num split and wh_ratio
+        is None, i.e. the batch is padded to its widest crop. With buckets a batch
+        never spans two buckets and is padded to the bucket width, so the
+        predictor only ever sees len(rec_width_buckets) input widths. Crops wider
+        than the largest bucket fall back to per-batch padding.
+        """
+        img_num = len(sorted_wh_ratios)
+        if not self._use_width_buckets():
+            return [
+                (beg, min(img_num, beg + batch_num), None)
+                for beg in range(0, img_num, batch_num)
+            ]
+        imgH = self.rec_image_shape[1]
+        buckets = [self.snap_width_bucket(r) for r in sorted_wh_ratios]
+        batch_ranges = []
+        beg = 0
+        while beg < img_num:
+            end = beg + 1
+            while (
+                end < img_num and end - beg < batch_num and buckets[end] == buckets[beg]
+            ):
+                end += 1
+            bucket_wh_ratio = (
+                None if buckets[beg] is None else buckets[beg] * 1.0 / imgH
+            )
+            batch_ranges.append((beg, end, bucket_wh_ratio))
+            beg = end
+        return batch_ranges
+
+    def _record_batch_stats(self, wh_ratio_list, max_wh_ratio):
+        imgH = self.rec_image_shape[1]
+        input_width = int(imgH * max_wh_ratio)
+        used_width = sum(
+            min(math.ceil(imgH * wh_ratio), input_width) for wh_ratio in wh_ratio_list
+        )
+        total_width = input_width * len(wh_ratio_list)
+        self.batch_stats.append(
+            {
+                "batch_size": len(wh_ratio_list),
+                "input_width": input_width,
+                "padding_ratio": 1.0 - used_width / float(max(total_width, 1)),
+            }
+        )
+
+    def get_padding_stats(self):
+        """
+        Summarize the batches of the last call: number of batches, distinct input
+        widths (each one is a new shape for the predictor) and the fraction of
+        the batched input that is padding.
+        """
+        if not self.batch_stats:
+            return {"batch_num": 0, "input_widths": [], "padding_ratio": 0.0}
+        total = sum(b["batch_size"] * b["input_width"] for b in self.batch_stats)
+        padding = sum(
+            b["batch_size"] * b["input_width"] * b["padding_ratio"]
+            for b in self.batch_stats
+        )
+        return {
+            "batch_num": len(self.batch_stats),
+            "input_widths": sorted(set(b["input_width"] for b in self.batch_stats)),
+            "padding_ratio": padding / total,
+        }
+
     def __call__(self, img_list):
+        # the whole call runs on one borrowed predictor, some algorithms
+        # rebind its input tensors
+        with span("rec.predict", crop_num=len(img_list)), self.borrow_predictor():
+            return self._predict(img_list)
+
+    def _predict(self, img_list):
         img_num = len(img_list)
         # Calculate the aspect ratio of all text bars
         width_list = []
@@ -588,10 +687,13 @@ class TextRecognizer(object):
         rec_res = [["", 0.0]] * img_num
         batch_num = self.rec_batch_num
         st = time.time()
-        if self.benchmark:
-            self.autolog.times.start()
-        for beg_img_no in range(0, img_num, batch_num):
-            end_img_no = min(img_num, beg_img_no + batch_num)
+        self.batch_stats = []
+        batch_ranges = self.get_batch_ranges(
+            [width_list[idx] for idx in indices], batch_num
+        )
+        for beg_img_no, end_img_no, bucket_wh_ratio in batch_ranges:
+            if self.benchmark:
+                self.stage_timer.start()
             norm_img_batch = []
             if self.rec_algorithm == "SRN":
                 encoder_word_pos_list = []
@@ -608,6 +710,9 @@ class TextRecognizer(object):
                 wh_ratio = w * 1.0 / h
                 max_wh_ratio = max(max_wh_ratio, wh_ratio)
                 wh_ratio_list.append(wh_ratio)
+            if bucket_wh_ratio is not None:
+                max_wh_ratio = bucket_wh_ratio
+            self._record_batch_stats(wh_ratio_list, max_wh_ratio)
             for ino in range(beg_img_no, end_img_no):
                 if self.rec_algorithm == "SAR":
                     norm_img, _, _, valid_ratio = self.resize_norm_img_sar(
@@ -692,7 +797,8 @@ class TextRecognizer(object):
             norm_img_batch = np.concatenate(norm_img_batch)
             norm_img_batch = norm_img_batch.copy()
             if self.benchmark:
-                self.autolog.times.stamp()
+                self.stage_timer.stamp()
+            infer_st = time.perf_counter()
 
             if self.rec_algorithm == "SRN":
                 encoder_word_pos_list = np.concatenate(encoder_word_pos_list)
@@ -722,8 +828,6 @@ class TextRecognizer(object):
                     for output_tensor in self.output_tensors:
                         output = output_tensor.copy_to_cpu()
                         outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
                     preds = {"predict": outputs[2]}
             elif self.rec_algorithm == "SAR":
                 valid_ratios = np.concatenate(valid_ratios)
@@ -746,8 +850,6 @@ class TextRecognizer(object):
                     for output_tensor in self.output_tensors:
                         output = output_tensor.copy_to_cpu()
                         outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
                     preds = outputs[0]
             elif self.rec_algorithm == "RobustScanner":
                 valid_ratios = np.concatenate(valid_ratios)
@@ -769,8 +871,6 @@ class TextRecognizer(object):
                     for output_tensor in self.output_tensors:
                         output = output_tensor.copy_to_cpu()
                         outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
                     preds = outputs[0]
             elif self.rec_algorithm == "CAN":
                 norm_img_mask_batch = np.concatenate(norm_img_mask_batch)
@@ -794,8 +894,6 @@ class TextRecognizer(object):
                     for output_tensor in self.output_tensors:
                         output = output_tensor.copy_to_cpu()
                         outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
                     preds = outputs
             elif self.rec_algorithm == "LaTeXOCR":
                 inputs = [norm_img_batch]
@@ -817,8 +915,6 @@ class TextRecognizer(object):
                     for output_tensor in self.output_tensors:
                         output = output_tensor.copy_to_cpu()
                         outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
                     preds = outputs
             else:
                 if self.use_onnx:
@@ -833,12 +929,18 @@ class TextRecognizer(object):
                     for output_tensor in self.output_tensors:
                         output = output_tensor.copy_to_cpu()
                         outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
                     if len(outputs) != 1:
                         preds = outputs
                     else:
                         preds = outputs[0]
+            record_span(
+                "rec.infer",
+                time.perf_counter() - infer_st,
+                shape=norm_img_batch.shape,
+                batch_size=end_img_no - beg_img_no,
+            )
+            if self.benchmark:
+                self.stage_timer.stamp()
             if self.postprocess_params["name"] == "CTCLabelDecode":
                 rec_result = self.postprocess_op(
                     preds,
@@ -854,7 +956,7 @@ class TextRecognizer(object):
             for rno in range(len(rec_result)):
                 rec_res[indices[beg_img_no + rno]] = rec_result[rno]
             if self.benchmark:
-                self.autolog.times.end(stamp=True)
+                self.stage_timer.end(stamp=True, items=end_img_no - beg_img_no)
         return rec_res, time.time() - st
 
 
@@ -905,8 +1007,11 @@ def main(args):
         logger.info(
             "Predicts of {}:{}".format(valid_image_file_list[ino], rec_res[ino])
         )
+    logger.info(
+        "rec batch padding stats: {}".format(text_recognizer.get_padding_stats())
+    )
     if args.benchmark:
-        text_recognizer.autolog.report()
+        text_recognizer.stage_timer.report(logger)
 
 
 if __name__ == "__main__":
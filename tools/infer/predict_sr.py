@@ -30,6 +30,7 @@ import paddle
 
 import tools.infer.utility as utility
 from ppocr.postprocess import build_post_process
+from ppocr.utils.benchmark import StageTimer
 from ppocr.utils.logging import get_logger
 from ppocr.utils.utility import get_image_file_list, check_and_read
 
@@ -57,24 +58,7 @@ class TextSR(object):
         ) = utility.create_predictor(args, "sr", logger)
         self.benchmark = args.benchmark
         if args.benchmark:
-            import auto_log
-
-            pid = os.getpid()
-            gpu_id = utility.get_infer_gpuid()
-            self.autolog = auto_log.AutoLogger(
-                model_name="sr",
-                model_precision=args.precision,
-                batch_size=args.sr_batch_num,
-                data_shape="dynamic",
-                save_path=None,  # args.save_log_path,
-                inference_config=self.config,
-                pids=pid,
-                process_name=None,
-                gpu_ids=gpu_id if args.use_gpu else None,
-                time_keys=["preprocess_time", "inference_time", "postprocess_time"],
-                warmup=0,
-                logger=logger,
-            )
+            self.stage_timer = StageTimer("sr")
 
     def resize_norm_img(self, img):
         imgC, imgH, imgW = self.sr_image_shape
@@ -90,7 +74,7 @@ class TextSR(object):
         st = time.time()
         all_result = [] * img_num
         if self.benchmark:
-            self.autolog.times.start()
+            self.stage_timer.start()
         for beg_img_no in range(0, img_num, batch_num):
             end_img_no = min(img_num, beg_img_no + batch_num)
             norm_img_batch = []
@@ -103,7 +87,7 @@ class TextSR(object):
             norm_img_batch = np.concatenate(norm_img_batch)
             norm_img_batch = norm_img_batch.copy()
             if self.benchmark:
-                self.autolog.times.stamp()
+                self.stage_timer.stamp()
             self.input_tensor.copy_from_cpu(norm_img_batch)
             self.predictor.run()
             outputs = []
@@ -116,7 +100,7 @@ class TextSR(object):
                 preds = outputs[0]
             all_result.append(outputs)
         if self.benchmark:
-            self.autolog.times.end(stamp=True)
+            self.stage_timer.end(stamp=True)
         return all_result, time.time() - st
 
 
@@ -166,7 +150,7 @@ def main(args):
         logger.info(E)
         exit()
     if args.benchmark:
-        text_recognizer.autolog.report()
+        text_recognizer.stage_timer.report(logger)
 
 
 if __name__ == "__main__":
@@ -13,7 +13,6 @@
 # limitations under the License.
 import os
 import sys
-import subprocess
 
 __dir__ = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(__dir__)
@@ -22,7 +21,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
 os.environ["FLAGS_allocator_strategy"] = "auto_growth"
 
 import cv2
-import copy
 import numpy as np
 import json
 import time
@@ -32,12 +30,17 @@ import tools.infer.utility as utility
 import tools.infer.predict_rec as predict_rec
 import tools.infer.predict_det as predict_det
 import tools.infer.predict_cls as predict_cls
-from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppocr.utils.utility import get_image_file_list, check_and_read, PdfPageSource
 from ppocr.utils.logging import get_logger
+from ppocr.utils.reading_order import sort_boxes
+from ppocr.utils.tracing import span, configure_tracing
+from tools.infer.pipeline import TextSystemPipeline
+from tools.infer.batch_runner import run_batch
 from tools.infer.utility import (
     draw_ocr_box_txt,
-    get_rotate_crop_image,
+    get_rotate_crop_images,
     get_minarea_rect_crop,
+    readonly_view,
     slice_generator,
     merge_fragmented,
 )
@@ -49,16 +52,22 @@ class TextSystem(object):
     def __init__(self, args):
         if not args.show_log:
             logger.setLevel(logging.INFO)
+        configure_tracing(args)
 
         self.text_detector = predict_det.TextDetector(args)
         self.text_recognizer = predict_rec.TextRecognizer(args)
         self.use_angle_cls = args.use_angle_cls
         self.drop_score = args.drop_score
+        self.use_column_reading_order = getattr(args, "use_column_reading_order", False)
+        self.debug_readonly_images = getattr(args, "debug_readonly_images", False)
+        self.det_tile_size = getattr(args, "det_tile_size", 0)
+        self.det_tile_overlap = getattr(args, "det_tile_overlap", 160)
         if self.use_angle_cls:
             self.text_classifier = predict_cls.TextClassifier(args)
 
         self.args = args
         self.crop_image_res_index = 0
+        self.crop_target_height = self._get_crop_target_height()
 
     def draw_crop_rec_res(self, output_dir, img_crop_list, rec_res):
         os.makedirs(output_dir, exist_ok=True)
@@ -73,15 +82,7 @@ class TextSystem(object):
             logger.debug(f"{bno}, {rec_res[bno]}")
         self.crop_image_res_index += bbox_num
 
-    def __call__(self, img, cls=True, slice={}):
-        time_dict = {"det": 0, "rec": 0, "cls": 0, "all": 0}
-
-        if img is None:
-            logger.debug("no valid image provided")
-            return None, None, time_dict
-
-        start = time.time()
-        ori_im = img.copy()
+    def _detect(self, img, slice={}):
         if slice:
             slice_gen = slice_generator(
                 img,
@@ -105,9 +106,103 @@ class TextSystem(object):
                 y_threshold=slice["merge_y_thres"],
             )
             elapse = sum(elapsed)
+        elif self._use_tiles(img):
+            dt_boxes, elapse = self.text_detector.detect_tiled(
+                img, self.det_tile_size, self.det_tile_overlap
+            )
         else:
             dt_boxes, elapse = self.text_detector(img)
+        return dt_boxes, elapse
+
+    def predictor_stats(self):
+        """
+        return:
+            dict of model name -> PredictorPool.stats()
+        """
+        stats = {
+            "det": self.text_detector.predictor_pool.stats(),
+            "rec": self.text_recognizer.predictor_pool.stats(),
+        }
+        if self.use_angle_cls:
+            stats["cls"] = self.text_classifier.predictor_pool.stats()
+        return stats
+
+    def _use_tiles(self, img):
+        return self.det_tile_size > 0 and max(img.shape[:2]) > self.det_tile_size
+
+    def _detect_many(self, img_list):
+        """
+        Detect text in several images, the images that are not tiled share
+        batched detector calls.
+        return:
+            list of (dt_boxes, elapse), one per image
+        """
+        results = [None] * len(img_list)
+        batch_ids = []
+        for i, img in enumerate(img_list):
+            if self._use_tiles(img):
+                results[i] = self._detect(img)
+            else:
+                batch_ids.append(i)
+        if batch_ids:
+            dt_boxes_list, elapse = self.text_detector.predict_batch(
+                [img_list[i] for i in batch_ids]
+            )
+            for i, dt_boxes in zip(batch_ids, dt_boxes_list):
+                results[i] = (dt_boxes, elapse / len(batch_ids))
+        return results
+
+    def _sort_boxes(self, dt_boxes):
+        return sorted_boxes(dt_boxes, use_columns=self.use_column_reading_order)
+
+    def _get_crop_target_height(self):
+        # crops only need the resolution that cls/rec resize them to; fixed-size
+        # recognizers resize without keeping the aspect ratio, so leave them alone
+        if (
+            self.text_recognizer.rec_algorithm
+            in predict_rec.TextRecognizer._fixed_width_algorithms
+        ):
+            return None
+        target_height = self.text_recognizer.rec_image_shape[1]
+        if self.use_angle_cls:
+            target_height = max(target_height, self.text_classifier.cls_image_shape[1])
+        return target_height
+
+    def _get_crops(self, ori_im, dt_boxes):
+        if self.args.det_box_type == "quad":
+            return get_rotate_crop_images(
+                ori_im, dt_boxes, target_height=self.crop_target_height
+            )
+        return [get_minarea_rect_crop(ori_im, box) for box in dt_boxes]
+
+    def _filter_rec_res(self, dt_boxes, rec_res):
+        filter_boxes, filter_rec_res = [], []
+        for box, rec_result in zip(dt_boxes, rec_res):
+            text, score = rec_result[0], rec_result[1]
+            if score >= self.drop_score:
+                filter_boxes.append(box)
+                filter_rec_res.append(rec_result)
+        return filter_boxes, filter_rec_res
+
+    def __call__(self, img, cls=True, slice={}):
+        time_dict = {"det": 0, "sort": 0, "crop": 0, "rec": 0, "cls": 0, "all": 0}
 
+        if img is None:
+            logger.debug("no valid image provided")
+            return None, None, time_dict
+
+        with span("ocr.page", shape=img.shape) as page_span:
+            filter_boxes, filter_rec_res, time_dict = self._predict(
+                img, cls, slice, time_dict
+            )
+            page_span.set(text_num=len(filter_boxes or []))
+        return filter_boxes, filter_rec_res, time_dict
+
+    def _predict(self, img, cls, slice, time_dict):
+        start = time.time()
+        # detection and cropping only read the page, so it is not copied
+        ori_im = img = readonly_view(img, self.debug_readonly_images)
+        dt_boxes, elapse = self._detect(img, slice)
         time_dict["det"] = elapse
 
         if dt_boxes is None:
@@ -119,17 +214,16 @@ class TextSystem(object):
             logger.debug(
                 "dt_boxes num : {}, elapsed : {}".format(len(dt_boxes), elapse)
             )
-        img_crop_list = []
 
-        dt_boxes = sorted_boxes(dt_boxes)
+        sort_start = time.time()
+        with span("ocr.sort", box_num=len(dt_boxes)):
+            dt_boxes = self._sort_boxes(dt_boxes)
+        time_dict["sort"] = time.time() - sort_start
+        crop_start = time.time()
+        with span("ocr.crop", box_num=len(dt_boxes)):
+            img_crop_list = self._get_crops(ori_im, dt_boxes)
+        time_dict["crop"] = time.time() - crop_start
 
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
-            if self.args.det_box_type == "quad":
-                img_crop = get_rotate_crop_image(ori_im, tmp_box)
-            else:
-                img_crop = get_minarea_rect_crop(ori_im, tmp_box)
-            img_crop_list.append(img_crop)
         if self.use_angle_cls and cls:
             img_crop_list, angle_list, elapse = self.text_classifier(img_crop_list)
             time_dict["cls"] = elapse
@@ -146,40 +240,217 @@ class TextSystem(object):
         logger.debug("rec_res num  : {}, elapsed : {}".format(len(rec_res), elapse))
         if self.args.save_crop_res:
             self.draw_crop_rec_res(self.args.crop_res_save_dir, img_crop_list, rec_res)
-        filter_boxes, filter_rec_res = [], []
-        for box, rec_result in zip(dt_boxes, rec_res):
-            text, score = rec_result[0], rec_result[1]
-            if score >= self.drop_score:
-                filter_boxes.append(box)
-                filter_rec_res.append(rec_result)
+        filter_boxes, filter_rec_res = self._filter_rec_res(dt_boxes, rec_res)
         end = time.time()
         time_dict["all"] = end - start
         return filter_boxes, filter_rec_res, time_dict
 
+    def predict_many(self, img_list, cls=True):
+        """
+        Run the system on several images, sharing recognition batches between them.
+        Detection runs per image (in padded batches with det_batch_num > 1), then
+        the crops of all images are pooled so that the recognizer (which sorts
+        crops by aspect ratio) can fill rec_batch_num even when every single image
+        only has a handful of text lines.
+        args:
+            img_list(list): images in BGR format, None entries are skipped
+            cls(bool): whether to run the angle classifier when it is enabled
+        return:
+            list of (filter_boxes, filter_rec_res, time_dict), one per input image,
+            in the same format as __call__. The pooled cls/rec time is shared
+            among the images in proportion to their number of crops. Boxes and
+            texts equal those of __call__, the scores can differ slightly since
+            a batch pads its crops to the widest one, see
+            tools/infer/benchmark_predict_many.py. With det_batch_num > 1 the
+            boxes of images that were padded for detection can differ as well.
+        """
+        with span("ocr.batch", image_num=len(img_list)) as batch_span:
+            results = self._predict_many(img_list, cls)
+            batch_span.set(text_num=sum(len(result[0] or []) for result in results))
+        return results
+
+    def _predict_many(self, img_list, cls):
+        results = [None] * len(img_list)
+        all_boxes = [None] * len(img_list)
+        crop_list = []
+        crop_owner = []
+        valid_ids = [i for i, img in enumerate(img_list) if img is not None]
+        det_results = dict(
+            zip(valid_ids, self._detect_many([img_list[i] for i in valid_ids]))
+        )
+        for i, img in enumerate(img_list):
+            time_dict = {"det": 0, "sort": 0, "crop": 0, "rec": 0, "cls": 0, "all": 0}
+            if img is None:
+                logger.debug("no valid image provided")
+                results[i] = (None, None, time_dict)
+                continue
+            dt_boxes, elapse = det_results[i]
+            # the detection already ran batched, its share counts towards all
+            start = time.time() - elapse
+            time_dict["det"] = elapse
+            if dt_boxes is None:
+                logger.debug("no dt_boxes found, elapsed : {}".format(elapse))
+                time_dict["all"] = time.time() - start
+                results[i] = (None, None, time_dict)
+                continue
+            sort_start = time.time()
+            with span("ocr.sort", page=i, box_num=len(dt_boxes)):
+                dt_boxes = self._sort_boxes(dt_boxes)
+            time_dict["sort"] = time.time() - sort_start
+            crop_start = time.time()
+            with span("ocr.crop", page=i, box_num=len(dt_boxes)):
+                crops = self._get_crops(img, dt_boxes)
+            time_dict["crop"] = time.time() - crop_start
+            crop_list.extend(crops)
+            crop_owner.extend([i] * len(crops))
+            all_boxes[i] = dt_boxes
+            time_dict["all"] = time.time() - start
+            results[i] = ([], [], time_dict)
+
+        owner_crop_num = np.bincount(
+            np.array(crop_owner, dtype=np.int64), minlength=len(img_list)
+        )
+        total_crop_num = max(len(crop_list), 1)
+
+        start = time.time()
+        cls_elapse = 0
+        if self.use_angle_cls and cls and crop_list:
+            crop_list, angle_list, cls_elapse = self.text_classifier(crop_list)
+        rec_res, rec_elapse = self.text_recognizer(crop_list)
+        shared_elapse = time.time() - start
+        logger.debug(
+            "pooled rec_res num  : {} from {} images, elapsed : {}".format(
+                len(rec_res), len(img_list), rec_elapse
+            )
+        )
+        if self.args.save_crop_res:
+            self.draw_crop_rec_res(self.args.crop_res_save_dir, crop_list, rec_res)
+
+        per_image_rec_res = [[] for _ in img_list]
+        for owner, rec_result in zip(crop_owner, rec_res):
+            per_image_rec_res[owner].append(rec_result)
 
-def sorted_boxes(dt_boxes):
+        for i, dt_boxes in enumerate(all_boxes):
+            if dt_boxes is None:
+                continue
+            share = owner_crop_num[i] / total_crop_num
+            time_dict = results[i][2]
+            time_dict["cls"] = cls_elapse * share
+            time_dict["rec"] = rec_elapse * share
+            time_dict["all"] += shared_elapse * share
+            filter_boxes, filter_rec_res = self._filter_rec_res(
+                dt_boxes, per_image_rec_res[i]
+            )
+            results[i] = (filter_boxes, filter_rec_res, time_dict)
+        return results
+
+
+def sorted_boxes(dt_boxes, use_columns=False):
     """
     Sort text boxes in order from top to bottom, left to right
     args:
         dt_boxes(array):detected text boxes with shape [4, 2]
+        use_columns(bool):read multi-column pages column by column
     return:
         sorted boxes(array) with shape [4, 2]
     """
-    num_boxes = dt_boxes.shape[0]
-    sorted_boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
-    _boxes = list(sorted_boxes)
-
-    for i in range(num_boxes - 1):
-        for j in range(i, -1, -1):
-            if abs(_boxes[j + 1][0][1] - _boxes[j][0][1]) < 10 and (
-                _boxes[j + 1][0][0] < _boxes[j][0][0]
-            ):
-                tmp = _boxes[j]
-                _boxes[j] = _boxes[j + 1]
-                _boxes[j + 1] = tmp
-            else:
-                break
-    return _boxes
+    return sort_boxes(dt_boxes, use_columns=use_columns)
+
+
+def iter_pages(image_file_list, args):
+    """
+    Yield (idx, image_file, index, img, page_count, flag_gif, flag_pdf) for
+    every page of every input file.
+    """
+    for idx, image_file in enumerate(image_file_list):
+        if os.path.basename(image_file)[-3:].lower() == "pdf":
+            # pages are rendered lazily in the background while the previous
+            # page is being detected and recognized
+            flag_gif, flag_pdf = False, True
+            imgs = PdfPageSource(
+                image_file, page_num=args.page_num, prefetch_num=args.pdf_prefetch_num
+            )
+        else:
+            img, flag_gif, flag_pdf = check_and_read(image_file)
+            if not flag_gif:
+                img = cv2.imread(image_file)
+            if img is None:
+                logger.debug("error in loading image:{}".format(image_file))
+                continue
+            imgs = [img]
+        page_count = len(imgs)
+        for index, img in enumerate(imgs):
+            yield idx, image_file, index, img, page_count, flag_gif, flag_pdf
+
+
+def run_pages(text_sys, pages):
+    for page in pages:
+        starttime = time.time()
+        result = text_sys(page[3])
+        yield page, result, time.time() - starttime
+
+
+def format_ocr_res(dt_boxes, rec_res):
+    return [
+        {
+            "transcription": rec_res[i][0],
+            "points": np.array(dt_boxes[i]).astype(np.int32).tolist(),
+        }
+        for i in range(len(dt_boxes))
+    ]
+
+
+def save_visualization(
+    img, dt_boxes, rec_res, image_file, index, flag_gif, flag_pdf, args
+):
+    image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    txts = [rec_res[i][0] for i in range(len(rec_res))]
+    scores = [rec_res[i][1] for i in range(len(rec_res))]
+
+    draw_img = draw_ocr_box_txt(
+        image,
+        dt_boxes,
+        txts,
+        scores,
+        drop_score=args.drop_score,
+        font_path=args.vis_font_path,
+    )
+    if flag_gif:
+        save_file = image_file[:-3] + "png"
+    elif flag_pdf:
+        save_file = image_file.replace(".pdf", "_" + str(index) + ".png")
+    else:
+        save_file = image_file
+    save_path = os.path.join(args.draw_img_save_dir, os.path.basename(save_file))
+    cv2.imwrite(save_path, draw_img[:, :, ::-1])
+    logger.debug("The visualized image saved in {}".format(save_path))
+
+
+def mp_init(args):
+    return TextSystem(args)
+
+
+def mp_process(text_sys, args, image_file):
+    """Process one file in a batch runner worker, see tools/infer/batch_runner.py."""
+    records = []
+    for page, (dt_boxes, rec_res, time_dict), elapse in run_pages(
+        text_sys, iter_pages([image_file], args)
+    ):
+        _, image_file, index, img, page_count, flag_gif, flag_pdf = page
+        if dt_boxes is None:
+            dt_boxes, rec_res = [], []
+        records.append(
+            {
+                "file": image_file,
+                "page": index,
+                "elapse": elapse,
+                "res": format_ocr_res(dt_boxes, rec_res),
+            }
+        )
+        save_visualization(
+            img, dt_boxes, rec_res, image_file, index, flag_gif, flag_pdf, args
+        )
+    return records
 
 
 def main(args):
@@ -187,8 +458,6 @@ def main(args):
     image_file_list = image_file_list[args.process_id :: args.total_process_num]
     text_sys = TextSystem(args)
     is_visualize = True
-    font_path = args.vis_font_path
-    drop_score = args.drop_score
     draw_img_save_dir = args.draw_img_save_dir
     os.makedirs(draw_img_save_dir, exist_ok=True)
     save_results = []
@@ -208,98 +477,80 @@ def main(args):
     cpu_mem, gpu_mem, gpu_util = 0, 0, 0
     _st = time.time()
     count = 0
-    for idx, image_file in enumerate(image_file_list):
-        img, flag_gif, flag_pdf = check_and_read(image_file)
-        if not flag_gif and not flag_pdf:
-            img = cv2.imread(image_file)
-        if not flag_pdf:
-            if img is None:
-                logger.debug("error in loading image:{}".format(image_file))
-                continue
-            imgs = [img]
+    page_latencies = []
+    pages = iter_pages(image_file_list, args)
+    if args.use_pipeline:
+        # det of the next page overlaps cls/rec of the current one
+        pipeline = TextSystemPipeline(
+            text_sys,
+            det_workers=args.pipeline_det_workers,
+            cls_workers=args.pipeline_cls_workers,
+            rec_workers=args.pipeline_rec_workers,
+            queue_size=args.pipeline_queue_size,
+        )
+        results = pipeline.imap(pages, get_image=lambda page: page[3])
+    else:
+        results = run_pages(text_sys, pages)
+    for page, (dt_boxes, rec_res, time_dict), elapse in results:
+        idx, image_file, index, img, page_count, flag_gif, flag_pdf = page
+        total_time += elapse
+        page_latencies.append(elapse)
+        if page_count > 1:
+            logger.debug(
+                str(idx)
+                + "_"
+                + str(index)
+                + "  Predict time of %s: %.3fs" % (image_file, elapse)
+            )
         else:
-            page_num = args.page_num
-            if page_num > len(img) or page_num == 0:
-                page_num = len(img)
-            imgs = img[:page_num]
-        for index, img in enumerate(imgs):
-            starttime = time.time()
-            dt_boxes, rec_res, time_dict = text_sys(img)
-            elapse = time.time() - starttime
-            total_time += elapse
-            if len(imgs) > 1:
-                logger.debug(
-                    str(idx)
-                    + "_"
-                    + str(index)
-                    + "  Predict time of %s: %.3fs" % (image_file, elapse)
-                )
-            else:
-                logger.debug(
-                    str(idx) + "  Predict time of %s: %.3fs" % (image_file, elapse)
-                )
-            for text, score in rec_res:
-                logger.debug("{}, {:.3f}".format(text, score))
-
-            res = [
-                {
-                    "transcription": rec_res[i][0],
-                    "points": np.array(dt_boxes[i]).astype(np.int32).tolist(),
-                }
-                for i in range(len(dt_boxes))
-            ]
-            if len(imgs) > 1:
-                save_pred = (
-                    os.path.basename(image_file)
-                    + "_"
-                    + str(index)
-                    + "\t"
-                    + json.dumps(res, ensure_ascii=False)
-                    + "\n"
-                )
-            else:
-                save_pred = (
-                    os.path.basename(image_file)
-                    + "\t"
-                    + json.dumps(res, ensure_ascii=False)
-                    + "\n"
-                )
-            save_results.append(save_pred)
-
-            if is_visualize:
-                image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-                boxes = dt_boxes
-                txts = [rec_res[i][0] for i in range(len(rec_res))]
-                scores = [rec_res[i][1] for i in range(len(rec_res))]
-
-                draw_img = draw_ocr_box_txt(
-                    image,
-                    boxes,
-                    txts,
-                    scores,
-                    drop_score=drop_score,
-                    font_path=font_path,
-                )
-                if flag_gif:
-                    save_file = image_file[:-3] + "png"
-                elif flag_pdf:
-                    save_file = image_file.replace(".pdf", "_" + str(index) + ".png")
-                else:
-                    save_file = image_file
-                cv2.imwrite(
-                    os.path.join(draw_img_save_dir, os.path.basename(save_file)),
-                    draw_img[:, :, ::-1],
-                )
-                logger.debug(
-                    "The visualized image saved in {}".format(
-                        os.path.join(draw_img_save_dir, os.path.basename(save_file))
-                    )
-                )
-
-    logger.info("The predict total time is {}".format(time.time() - _st))
+            logger.debug(
+                str(idx) + "  Predict time of %s: %.3fs" % (image_file, elapse)
+            )
+        for text, score in rec_res:
+            logger.debug("{}, {:.3f}".format(text, score))
+
+        res = format_ocr_res(dt_boxes, rec_res)
+        if page_count > 1:
+            save_pred = (
+                os.path.basename(image_file)
+                + "_"
+                + str(index)
+                + "\t"
+                + json.dumps(res, ensure_ascii=False)
+                + "\n"
+            )
+        else:
+            save_pred = (
+                os.path.basename(image_file)
+                + "\t"
+                + json.dumps(res, ensure_ascii=False)
+                + "\n"
+            )
+        save_results.append(save_pred)
+
+        if is_visualize:
+            save_visualization(
+                img, dt_boxes, rec_res, image_file, index, flag_gif, flag_pdf, args
+            )
+
+    wall_time = time.time() - _st
+    logger.info("The predict total time is {}".format(wall_time))
+    if page_latencies:
+        latencies = np.array(page_latencies)
+        logger.info(
+            "pages: {}, pages/sec: {:.3f}, per-page latency avg: {:.3f}s, p50: {:.3f}s, max: {:.3f}s".format(
+                len(latencies),
+                len(latencies) / wall_time,
+                latencies.mean(),
+                np.percentile(latencies, 50),
+                latencies.max(),
+            )
+        )
+    if args.use_pipeline:
+        pipeline.log_stats()
     if args.benchmark:
-        text_sys.text_detector.autolog.report()
-        text_sys.text_recognizer.autolog.report()
+        text_sys.text_detector.stage_timer.report(logger)
+        text_sys.text_recognizer.stage_timer.report(logger)
 
     with open(
         os.path.join(draw_img_save_dir, "system_results.txt"), "w", encoding="utf-8"
@@ -310,17 +561,13 @@ def main(args):
 if __name__ == "__main__":
     args = utility.parse_args()
     if args.use_mp:
-        p_list = []
-        total_process_num = args.total_process_num
-        for process_id in range(total_process_num):
-            cmd = (
-                [sys.executable, "-u"]
-                + sys.argv
-                + ["--process_id={}".format(process_id), "--use_mp={}".format(False)]
-            )
-            p = subprocess.Popen(cmd, stdout=sys.stdout, stderr=sys.stdout)
-            p_list.append(p)
-        for p in p_list:
-            p.wait()
+        os.makedirs(args.draw_img_save_dir, exist_ok=True)
+        run_batch(
+            mp_init,
+            mp_process,
+            args,
+            get_image_file_list(args.image_dir),
+            default_output=os.path.join(args.draw_img_save_dir, "system_results.jsonl"),
+        )
     else:
         main(args)
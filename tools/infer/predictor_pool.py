@@ -0,0 +1,233 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pool of predictor clones that share the weights of one loaded model.
+
+A Paddle predictor is not thread safe, but predictor.clone() creates another
+one on the same weights. Onnxruntime sessions can be run from several threads,
+so all handles of an onnx pool share the session. Threads borrow a handle for
+the duration of an inference and return it afterwards, so concurrent requests
+of a server run in parallel on up to size handles without loading the model
+size times.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+__all__ = ["PredictorHandle", "PredictorPool", "PooledPredictorMixin"]
+
+
+def _current_rss():
+    # resident set size in bytes, None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import resource
+
+    return pages * resource.getpagesize()
+
+
+def _rss_growth(rss):
+    if rss is None:
+        return None
+    return max(0, _current_rss() - rss)
+
+
+class PredictorHandle(object):
+    """
+    One predictor of a pool with its input and output tensors.
+    args:
+        index(int): position in the pool
+        load_bytes(int): growth of the resident memory while it was created
+    """
+
+    def __init__(
+        self, predictor, input_tensor, output_tensors, index=0, load_bytes=None
+    ):
+        self.predictor = predictor
+        self.input_tensor = input_tensor
+        self.output_tensors = output_tensors
+        self.index = index
+        self.load_bytes = load_bytes
+        self.runs = 0
+        self.busy_time = 0.0
+
+
+class PredictorPool(object):
+    """
+    args:
+        handles(list): PredictorHandle objects, the first one owns the weights
+        config: inference config of the first predictor, None for onnx
+    """
+
+    def __init__(self, handles, config=None):
+        assert len(handles) > 0, "a predictor pool needs at least one handle"
+        self.handles = handles
+        self.config = config
+        self.created = time.time()
+        self._idle = queue.LifoQueue()
+        for handle in handles:
+            self._idle.put(handle)
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_time = 0.0
+
+    @classmethod
+    def create(cls, load_fn, size, io_fn):
+        """
+        Load a model and clone it into a pool.
+        args:
+            load_fn: returns (predictor, input_tensor, output_tensors, config),
+                config is None for onnx sessions
+            size(int): number of handles
+            io_fn: returns (input_tensor, output_tensors) of a cloned paddle
+                predictor
+        """
+        rss = _current_rss()
+        predictor, input_tensor, output_tensors, config = load_fn()
+        handles = [
+            PredictorHandle(
+                predictor, input_tensor, output_tensors, 0, _rss_growth(rss)
+            )
+        ]
+        for index in range(1, max(1, size)):
+            if config is None:
+                # onnxruntime sessions are thread safe, the handles share one
+                handles.append(
+                    PredictorHandle(predictor, input_tensor, output_tensors, index, 0)
+                )
+                continue
+            rss = _current_rss()
+            clone = predictor.clone()
+            clone_input, clone_outputs = io_fn(clone)
+            handles.append(
+                PredictorHandle(
+                    clone, clone_input, clone_outputs, index, _rss_growth(rss)
+                )
+            )
+        return cls(handles, config)
+
+    @property
+    def size(self):
+        return len(self.handles)
+
+    def acquire(self, timeout=None):
+        """Borrow an idle handle, waits for one if all are in use."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        st = time.time()
+        handle = self._idle.get(timeout=timeout)
+        with self._lock:
+            self.waits += 1
+            self.wait_time += time.time() - st
+        return handle
+
+    def release(self, handle, busy_time=0.0):
+        with self._lock:
+            handle.runs += 1
+            handle.busy_time += busy_time
+        self._idle.put(handle)
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        handle = self.acquire(timeout)
+        st = time.time()
+        try:
+            yield handle
+        finally:
+            self.release(handle, time.time() - st)
+
+    def stats(self):
+        """
+        return:
+            dict with the waits for a free handle and, per handle, the number
+            of runs, the busy time, the utilization since the pool was created
+            and the memory it took to create (the weights for the first one)
+        """
+        elapsed = max(time.time() - self.created, 1e-9)
+        with self._lock:
+            handles = [
+                {
+                    "index": handle.index,
+                    "runs": handle.runs,
+                    "busy_time": handle.busy_time,
+                    "utilization": handle.busy_time / elapsed,
+                    "load_mb": (
+                        None
+                        if handle.load_bytes is None
+                        else handle.load_bytes / (1024 * 1024)
+                    ),
+                }
+                for handle in self.handles
+            ]
+            return {
+                "size": self.size,
+                "idle": self._idle.qsize(),
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "handles": handles,
+            }
+
+
+class _BorrowedAttribute(object):
+    # resolves to the attribute of the handle borrowed by the current thread
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj._current_handle(), self.name)
+
+    def __set__(self, obj, value):
+        setattr(obj._current_handle(), self.name, value)
+
+
+class PooledPredictorMixin(object):
+    """
+    Makes predictor, input_tensor and output_tensors of the predictor classes
+    resolve to the handle that the current thread borrowed from
+    self.predictor_pool, so that the inference code can keep using them.
+    Outside of borrow_predictor they resolve to the first handle.
+    """
+
+    predictor = _BorrowedAttribute("predictor")
+    input_tensor = _BorrowedAttribute("input_tensor")
+    output_tensors = _BorrowedAttribute("output_tensors")
+
+    def _current_handle(self):
+        local = self.__dict__.get("_borrowed")
+        handle = getattr(local, "handle", None) if local is not None else None
+        if handle is None:
+            handle = self.predictor_pool.handles[0]
+        return handle
+
+    @contextmanager
+    def borrow_predictor(self):
+        local = self.__dict__.setdefault("_borrowed", threading.local())
+        if getattr(local, "handle", None) is not None:
+            # nested calls of the same thread keep their handle
+            yield local.handle
+            return
+        with self.predictor_pool.borrow() as handle:
+            local.handle = handle
+            try:
+                yield handle
+            finally:
+                local.handle = None
@@ -17,14 +17,14 @@ import os
 import sys
 import cv2
 import numpy as np
-import paddle
 import PIL
 from PIL import Image, ImageDraw, ImageFont
 import math
-from paddle import inference
 import random
 import yaml
 from ppocr.utils.logging import get_logger
+from ppocr.utils.spatial_index import GridIndex, boxes_to_rects
+from tools.infer.predictor_pool import PredictorPool
 
 
 def str2bool(v):
@@ -55,15 +55,47 @@ def init_args():
     parser.add_argument("--precision", type=str, default="fp32")
     parser.add_argument("--gpu_mem", type=int, default=500)
     parser.add_argument("--gpu_id", type=int, default=0)
+    parser.add_argument(
+        "--predictor_pool_size",
+        type=int,
+        default=1,
+        help="Number of predictor clones per model that threads can run concurrently",
+    )
 
     # params for text detector
     parser.add_argument("--image_dir", type=str)
     parser.add_argument("--page_num", type=int, default=0)
+    parser.add_argument(
+        "--pdf_prefetch_num",
+        type=int,
+        default=2,
+        help="Number of pdf pages rendered ahead of inference on a background thread, 0 renders pages synchronously",
+    )
     parser.add_argument("--det_algorithm", type=str, default="DB")
     parser.add_argument("--det_model_dir", type=str)
     parser.add_argument("--det_limit_side_len", type=float, default=960)
     parser.add_argument("--det_limit_type", type=str, default="max")
     parser.add_argument("--det_box_type", type=str, default="quad")
+    parser.add_argument(
+        "--det_batch_num",
+        type=int,
+        default=1,
+        help="Number of images or tiles detected in one predictor call. Images "
+        "of a batch are zero-padded to a common shape, which can change the "
+        "boxes near their borders, so batching is opt-in",
+    )
+    parser.add_argument(
+        "--det_tile_size",
+        type=int,
+        default=0,
+        help="Detect images larger than this in overlapping tiles at full resolution, 0 disables tiling",
+    )
+    parser.add_argument(
+        "--det_tile_overlap",
+        type=int,
+        default=160,
+        help="Overlap of neighbouring tiles, should exceed the height of the largest text line",
+    )
 
     # DB params
     parser.add_argument("--det_db_thresh", type=float, default=0.3)
@@ -100,6 +132,12 @@ def init_args():
     parser.add_argument("--rec_image_inverse", type=str2bool, default=True)
     parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
     parser.add_argument("--rec_batch_num", type=int, default=6)
+    parser.add_argument(
+        "--rec_width_buckets",
+        type=str,
+        default="",
+        help="Comma separated input widths, e.g. '320,480,640,960'. Recognition batches are split by bucket and padded to the bucket width instead of the widest crop of the batch",
+    )
     parser.add_argument("--max_text_length", type=int, default=25)
     parser.add_argument(
         "--rec_char_dict_path", type=str, default="./ppocr/utils/ppocr_keys_v1.txt"
@@ -107,6 +145,14 @@ def init_args():
     parser.add_argument("--use_space_char", type=str2bool, default=True)
     parser.add_argument("--vis_font_path", type=str, default="./doc/fonts/simfang.ttf")
     parser.add_argument("--drop_score", type=float, default=0.5)
+    parser.add_argument("--use_column_reading_order", type=str2bool, default=False)
+
+    # pipelined det/cls/rec
+    parser.add_argument("--use_pipeline", type=str2bool, default=False)
+    parser.add_argument("--pipeline_det_workers", type=int, default=1)
+    parser.add_argument("--pipeline_cls_workers", type=int, default=1)
+    parser.add_argument("--pipeline_rec_workers", type=int, default=1)
+    parser.add_argument("--pipeline_queue_size", type=int, default=4)
 
     # params for e2e
     parser.add_argument("--e2e_algorithm", type=str, default="PGNet")
@@ -149,8 +195,24 @@ def init_args():
     parser.add_argument("--use_mp", type=str2bool, default=False)
     parser.add_argument("--total_process_num", type=int, default=1)
     parser.add_argument("--process_id", type=int, default=0)
+    parser.add_argument("--mp_output", type=str, default="")
+    parser.add_argument("--mp_max_restarts", type=int, default=3)
 
     parser.add_argument("--benchmark", type=str2bool, default=False)
+    parser.add_argument(
+        "--trace_file",
+        type=str,
+        default=None,
+        help="Append the tracing spans of every page as json lines to this file",
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=0,
+        help="Serve the metrics in the Prometheus text format at this port, 0 disables",
+    )
+    # pass pages as read-only views so that in-place writes raise
+    parser.add_argument("--debug_readonly_images", type=str2bool, default=False)
     parser.add_argument("--save_log_path", type=str, default="./log_output/")
 
     parser.add_argument("--show_log", type=str2bool, default=True)
@@ -238,6 +300,9 @@ def create_predictor(args, mode, logger):
         )
 
     else:
+        import paddle
+        from paddle import inference
+
         file_names = ["model", "inference"]
         for file_name in file_names:
             params_file_path = f"{model_dir}/{file_name}.pdiparams"
@@ -423,18 +488,30 @@ def create_predictor(args, mode, logger):
 
         # create predictor
         predictor = inference.create_predictor(config)
-        input_names = predictor.get_input_names()
-        if mode in ["ser", "re"]:
-            input_tensor = []
-            for name in input_names:
-                input_tensor.append(predictor.get_input_handle(name))
-        else:
-            for name in input_names:
-                input_tensor = predictor.get_input_handle(name)
+        input_tensor = get_input_tensor(mode, predictor)
         output_tensors = get_output_tensors(args, mode, predictor)
         return predictor, input_tensor, output_tensors, config
 
 
+def create_predictor_pool(args, mode, logger, size=None):
+    """
+    Load a model once and clone it into a PredictorPool, so that several
+    threads can run it at the same time.
+    args:
+        size(int): number of predictors, args.predictor_pool_size by default
+    """
+    if size is None:
+        size = getattr(args, "predictor_pool_size", 1)
+    return PredictorPool.create(
+        lambda: create_predictor(args, mode, logger),
+        size,
+        lambda clone: (
+            get_input_tensor(mode, clone),
+            get_output_tensors(args, mode, clone),
+        ),
+    )
+
+
 def _convert_trt(
     trt_cfg_setting,
     pp_model_file,
@@ -444,6 +521,7 @@ def _convert_trt(
     dynamic_shapes,
     dynamic_shape_input_data,
 ):
+    from paddle import inference
     from paddle.tensorrt.export import Input, TensorRTConfig, convert
 
     def _set_trt_config():
@@ -515,6 +593,8 @@ def _convert_trt(
 
 
 def _pd_dtype_to_np_dtype(pd_dtype):
+    from paddle import inference
+
     if pd_dtype == inference.DataType.FLOAT64:
         return np.float64
     elif pd_dtype == inference.DataType.FLOAT32:
@@ -540,6 +620,18 @@ def load_config(file_path):
     return config
 
 
+def get_input_tensor(mode, predictor):
+    input_names = predictor.get_input_names()
+    if mode in ["ser", "re"]:
+        input_tensor = []
+        for name in input_names:
+            input_tensor.append(predictor.get_input_handle(name))
+    else:
+        for name in input_names:
+            input_tensor = predictor.get_input_handle(name)
+    return input_tensor
+
+
 def get_output_tensors(args, mode, predictor):
     output_names = predictor.get_output_names()
     output_tensors = []
@@ -565,6 +657,8 @@ def get_infer_gpuid():
     Returns:
         int: The GPU ID to be used for inference.
     """
+    import paddle
+
     logger = get_logger()
     if not paddle.device.is_compiled_with_rocm:
         gpu_id_str = os.environ.get("CUDA_VISIBLE_DEVICES", "0")
@@ -862,6 +956,22 @@ def draw_boxes(image, boxes, scores=None, drop_score=0.5):
     return image
 
 
+def readonly_view(img, enable=True):
+    """
+    The inference stack passes pages and crops around without copying them and
+    every stage that needs to modify an image has to copy it first. With
+    enable (--debug_readonly_images) this returns a read-only view of img, so
+    that an accidental in-place write raises "assignment destination is
+    read-only" instead of silently changing the caller's image; otherwise img
+    is returned unchanged.
+    """
+    if not enable or not isinstance(img, np.ndarray):
+        return img
+    view = img.view()
+    view.flags.writeable = False
+    return view
+
+
 def get_rotate_crop_image(img, points):
     """
     img_height, img_width = img.shape[0:2]
@@ -906,6 +1016,100 @@ def get_rotate_crop_image(img, points):
     return dst_img
 
 
+def get_rotate_crop_images(img, boxes, target_height=None, axis_aligned_tol=1.0):
+    """
+    Batched get_rotate_crop_image for the det -> rec handoff.
+    args:
+        img(array): the full image
+        boxes(array): quadrilaterals with shape [N, 4, 2], clockwise from top left
+        target_height(int): when given, rotated crops taller than this are warped
+            straight to this height so that the recognizer does not resample them
+            a second time
+        axis_aligned_tol(float): corners may be this many pixels off an upright
+            rectangle for the box to be sliced instead of warped
+    return:
+        list of crops. Axis-aligned crops are views into img (no copy), so img
+        must not be modified while the crops are in use.
+    """
+    if len(boxes) == 0:
+        return []
+    img_height, img_width = img.shape[0:2]
+    pts = np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2)
+    x, y = pts[:, :, 0], pts[:, :, 1]
+    axis_aligned = (
+        (np.abs(y[:, 0] - y[:, 1]) <= axis_aligned_tol)
+        & (np.abs(y[:, 3] - y[:, 2]) <= axis_aligned_tol)
+        & (np.abs(x[:, 0] - x[:, 3]) <= axis_aligned_tol)
+        & (np.abs(x[:, 1] - x[:, 2]) <= axis_aligned_tol)
+    )
+    left = np.round(x.min(axis=1)).astype(np.int64)
+    right = np.round(x.max(axis=1)).astype(np.int64)
+    top = np.round(y.min(axis=1)).astype(np.int64)
+    bottom = np.round(y.max(axis=1)).astype(np.int64)
+    # slicing cannot replicate the border like the warp does
+    axis_aligned &= (
+        (left >= 0)
+        & (top >= 0)
+        & (right <= img_width)
+        & (bottom <= img_height)
+        & (right - left > 0)
+        & (bottom - top > 0)
+    )
+
+    img_crop_list = []
+    for i in range(len(pts)):
+        if axis_aligned[i]:
+            dst_img = img[top[i] : bottom[i], left[i] : right[i]]
+            if dst_img.shape[0] * 1.0 / dst_img.shape[1] >= 1.5:
+                dst_img = np.rot90(dst_img)
+        else:
+            dst_img = _warp_crop(img, pts[i], target_height)
+        img_crop_list.append(dst_img)
+    return img_crop_list
+
+
+def _warp_crop(img, points, target_height=None):
+    img_crop_width = int(
+        max(
+            np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])
+        )
+    )
+    img_crop_height = int(
+        max(
+            np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])
+        )
+    )
+    if (
+        target_height is not None
+        and img_crop_height > target_height
+        and img_crop_height * 1.0 / max(img_crop_width, 1) < 1.5
+    ):
+        scale = target_height / img_crop_height
+        img_crop_width = max(1, int(round(img_crop_width * scale)))
+        img_crop_height = target_height
+    if img_crop_width == 0 or img_crop_height == 0:
+        return get_rotate_crop_image(img, points)
+    pts_std = np.float32(
+        [
+            [0, 0],
+            [img_crop_width, 0],
+            [img_crop_width, img_crop_height],
+            [0, img_crop_height],
+        ]
+    )
+    M = cv2.getPerspectiveTransform(points, pts_std)
+    dst_img = cv2.warpPerspective(
+        img,
+        M,
+        (img_crop_width, img_crop_height),
+        borderMode=cv2.BORDER_REPLICATE,
+        flags=cv2.INTER_CUBIC,
+    )
+    if img_crop_height * 1.0 / img_crop_width >= 1.5:
+        dst_img = np.rot90(dst_img)
+    return dst_img
+
+
 def get_minarea_rect_crop(img, points):
     bounding_box = cv2.minAreaRect(np.array(points).astype(np.int32))
     points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda x: x[0])
@@ -969,6 +1173,67 @@ def slice_generator(image, horizontal_stride, vertical_stride, maximum_slices=50
             yield (horizontal_slice, v_start, h_start)
 
 
+def tile_generator(image, tile_size, overlap):
+    """
+    Split an image into tiles of at most tile_size x tile_size that are evenly
+    spread and overlap by at least overlap pixels.
+    return:
+        generator of (tile, v_start, h_start), the tiles are views of image
+    """
+    image_h, image_w = image.shape[:2]
+    stride = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        num = (length - tile_size + stride - 1) // stride + 1
+        return [round(i * (length - tile_size) / (num - 1)) for i in range(num)]
+
+    for v_start in starts(image_h):
+        for h_start in starts(image_w):
+            yield (
+                image[v_start : v_start + tile_size, h_start : h_start + tile_size],
+                v_start,
+                h_start,
+            )
+
+
+def _union_find(num):
+    parent = list(range(num))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            return False
+        parent[root_j] = root_i
+        return True
+
+    return find, union
+
+
+def _group_boxes(boxes, rects, find):
+    groups = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    merged = []
+    for members in groups.values():
+        if len(members) == 1:
+            merged.append(boxes[members[0]])
+            continue
+        x0, y0 = rects[members, :2].min(axis=0)
+        x1, y1 = rects[members, 2:].max(axis=0)
+        merged.append(
+            np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float32)
+        )
+    return merged
+
+
 def calculate_box_extents(box):
     min_x = box[0][0]
     max_x = box[1][0]
@@ -1001,36 +1266,138 @@ def merge_boxes(box1, box2, x_threshold, y_threshold):
 
 
 def merge_fragmented(boxes, x_threshold=10, y_threshold=10):
-    merged_boxes = []
-    visited = set()
-
-    for i, box1 in enumerate(boxes):
-        if i in visited:
-            continue
+    """
+    Merge text boxes of one line that were cut apart by slicing. Every box in
+    turn absorbs the later boxes that merge_boxes joins to it, in order, and
+    this repeats until nothing merges any more. The boxes that can join a box
+    start within the thresholds of its top right corner, so they are looked up
+    by their top left corner in a grid index instead of scanning all later
+    boxes; the merge order and the result are those of the full scan.
+    args:
+        boxes: boxes with shape (N, 4, 2)
+    return:
+        array of the merged boxes
+    """
+    while True:
+        starts = [(box[0][0], box[0][1]) for box in boxes]
+        index = GridIndex(
+            [[x, y, x, y] for x, y in starts],
+            cell_size=2 * max(x_threshold, y_threshold, 1),
+        )
+        merged_boxes = []
+        visited = set()
+
+        for i, box1 in enumerate(boxes):
+            if i in visited:
+                continue
+
+            merged_box = [point[:] for point in box1]
+            last = i
+            while True:
+                _, max_x, min_y, _ = calculate_box_extents(merged_box)
+                # one pixel wider than the thresholds against rounding,
+                # merge_boxes makes the decision
+                window = [
+                    max_x - x_threshold - 1,
+                    min_y - y_threshold - 1,
+                    max_x + x_threshold + 1,
+                    min_y + y_threshold + 1,
+                ]
+                # the first later box that merges, as the full scan would find
+                merged_result = None
+                for j in index.query(window):
+                    if j <= last or j in visited:
+                        continue
+                    merged_result = merge_boxes(
+                        merged_box,
+                        boxes[j],
+                        x_threshold=x_threshold,
+                        y_threshold=y_threshold,
+                    )
+                    if merged_result:
+                        break
+                if not merged_result:
+                    break
+                merged_box = merged_result
+                visited.add(j)
+                last = j
 
-        merged_box = [point[:] for point in box1]
+            merged_boxes.append(merged_box)
 
-        for j, box2 in enumerate(boxes[i + 1 :], start=i + 1):
-            if j not in visited:
-                merged_result = merge_boxes(
-                    merged_box, box2, x_threshold=x_threshold, y_threshold=y_threshold
-                )
-                if merged_result:
-                    merged_box = merged_result
-                    visited.add(j)
+        if len(merged_boxes) == len(boxes):
+            return np.array(merged_boxes)
+        boxes = merged_boxes
 
-        merged_boxes.append(merged_box)
 
-    if len(merged_boxes) == len(boxes):
-        return np.array(merged_boxes)
-    else:
-        return merge_fragmented(merged_boxes, x_threshold, y_threshold)
+def merge_tile_boxes(boxes, cut, tolerance=10):
+    """
+    Combine the boxes detected in overlapping tiles. A line that fits into a
+    tile is detected whole by it, and once more by every other tile that
+    contains it. A longer line is cut by the tile borders into pieces that
+    overlap where the tiles do. So whole boxes found twice are kept once, the
+    pieces of a line are joined and pieces that lie within another box are
+    dropped. Candidates come from a grid index, which keeps this near-linear
+    in the number of boxes.
+    args:
+        boxes: boxes in image coordinates with shape (N, K, 2)
+        cut(list): whether a box touches an inner border of its tile
+        tolerance(int): pixels by which the boxes of one line may differ
+    return:
+        list of the boxes
+    """
+    if len(boxes) == 0:
+        return []
+    margin = np.array([-tolerance, -tolerance, tolerance, tolerance])
+    rects = boxes_to_rects(boxes)
+    index = GridIndex(rects + margin)
+    whole = []
+    duplicate = set()
+    for i in range(len(boxes)):
+        if cut[i] or i in duplicate:
+            continue
+        whole.append(i)
+        for j in index.query(rects[i] + margin):
+            if j > i and not cut[j] and np.abs(rects[i] - rects[j]).max() <= tolerance:
+                duplicate.add(j)
+    pieces = [i for i in range(len(boxes)) if cut[i]]
+    piece_rects = rects[pieces]
+    piece_index = GridIndex(piece_rects)
+    find, union = _union_find(len(pieces))
+    for a, rect in enumerate(piece_rects):
+        for b in piece_index.query(rect):
+            if (
+                b > a
+                and abs(rect[1] - piece_rects[b][1]) <= tolerance
+                and abs(rect[3] - piece_rects[b][3]) <= tolerance
+            ):
+                union(a, b)
+
+    merged = [boxes[i] for i in whole]
+    merged += _group_boxes([boxes[i] for i in pieces], piece_rects, find)
+    rects = boxes_to_rects(merged)
+    areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+    search = rects + margin
+    index = GridIndex(search)
+    result = merged[: len(whole)]
+    for a in range(len(whole), len(merged)):
+        for b in index.query(rects[a]):
+            if b == a or areas[b] < areas[a] or (areas[b] == areas[a] and b > a):
+                continue
+            if np.all(rects[a][:2] >= search[b][:2]) and np.all(
+                rects[a][2:] <= search[b][2:]
+            ):
+                break
+        else:
+            result.append(merged[a])
+    return result
 
 
 def check_gpu(use_gpu):
-    if use_gpu and (
-        not paddle.is_compiled_with_cuda() or paddle.device.get_device() == "cpu"
-    ):
+    if not use_gpu:
+        return use_gpu
+    import paddle
+
+    if not paddle.is_compiled_with_cuda() or paddle.device.get_device() == "cpu":
         use_gpu = False
     return use_gpu
 
@@ -11,7 +11,9 @@ try:
     # Add the ocr_tool directory to the path
     ocr_tool_path = os.path.join(parent_dir, "ocr_tool")
     sys.path.insert(0, ocr_tool_path)
-    from local_ocr_engine import LocalOCREngine
+    from local_ocr_engine import LocalOCREngine, tracing
+    from engine_registry import get_engine, warm_up_engines
+    get_metrics_registry = tracing.get_registry
 except Exception as e:
     st.error(f"OCR Engine not found in sibling directory: {e}")
     LocalOCREngine = None
@@ -251,10 +253,26 @@ def get_designer_v2(ocr_data, img_b64, w, h):
 if 'v2_state' not in st.session_state:
     st.session_state['v2_state'] = 'welcome'
 
+# Load the engine once per process instead of on every analysis click
+if LocalOCREngine is not None:
+    warm_up_engines([('ch', False, 'PP-OCRv4')])
+    with st.sidebar.expander("Metrics"):
+        span_stats = get_metrics_registry().span_summary()
+        if not span_stats:
+            st.caption("No document analyzed yet.")
+        for name, stats in span_stats.items():
+            st.caption(f"{name}: {stats['count']} calls, mean {stats['mean'] * 1000:.0f} ms")
+        st.download_button(
+            "Export (Prometheus)",
+            get_metrics_registry().to_prometheus(),
+            file_name="vizan_metrics.prom",
+            mime="text/plain",
+        )
+
 def process_file(img):
     with st.spinner("AI is processing..."):
         try:
-            engine = LocalOCREngine(use_gpu=False)
+            engine = get_engine(use_gpu=False)
             results = engine.process_image(img)
             
             _, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), 75])